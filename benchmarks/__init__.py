@@ -0,0 +1,13 @@
+"""Quiz taking flow benchmarks
+
+Generates a synthetic dataset of configurable scale in a throwaway test
+database, drives the exam views through the django test client (the same
+WSGI handler as in quiz/wsgi.py) and reports latency percentiles, queries
+per request and throughput. Results can be saved as JSON baselines and
+compared against each other to spot regressions between commits.
+
+Run from the project root, i.e.:
+    python -m benchmarks.run --users 50 --quizzes 10 --questions 100 \\
+        --output baseline.json
+    python -m benchmarks.run ... --compare baseline.json
+"""
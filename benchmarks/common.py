@@ -0,0 +1,177 @@
+"""Benchmarks shared helpers: arguments, test databases and reports"""
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+
+def percentile(values, percent):
+    """Nearest rank percentile of sorted values"""
+    if not values:
+        return 0
+    rank = max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(latencies, queries):
+    """Scenario report out of per request latencies (s) and query counts"""
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': total / len(latencies) * 1000 if latencies else 0,
+        'queries_per_request': sum(queries) / len(queries) if queries else 0,
+        'max_queries': max(queries) if queries else 0,
+        'throughput_rps': len(latencies) / total if total else 0,
+    }
+
+
+def get_revision():
+    """Current git revision, if available"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, tolerance):
+    """Print differences against baseline, returns amount of regressions
+
+    Any growth of queries per request is a regression, latency is allowed
+    to grow by tolerance fraction, since it is noisy. p99 is reported, but
+    is too noisy to fail on"""
+    regressions = 0
+    print('{:<16} {:<20} {:>12} {:>12} {:>8}'.format(
+        'scenario', 'metric', 'baseline', 'current', 'change'))
+    for name, report in sorted(current['scenarios'].items()):
+        old_report = baseline.get('scenarios', {}).get(name)
+        if old_report is None:
+            continue
+        for metric in (
+                'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request',
+                'throughput_rps'):
+            if metric not in report or metric not in old_report:
+                continue
+            old, new = old_report[metric], report[metric]
+            change = (new - old) / old if old else 0
+            if metric == 'queries_per_request':
+                regressed = new > old
+            elif metric == 'throughput_rps':
+                regressed = change < -tolerance
+            elif metric == 'p99_ms':
+                regressed = False
+            else:
+                regressed = change > tolerance
+            regressions += regressed
+            print('{:<16} {:<20} {:>12.2f} {:>12.2f} {:>+7.0%}{}'.format(
+                name, metric, old, new, change, ' !' if regressed else ''))
+    return regressions
+
+
+def add_dataset_arguments(parser):
+    """Settings and dataset scale arguments, shared by benchmark runners"""
+    parser.add_argument('--settings', default='quiz.settings',
+                        help='Settings module to benchmark, i.e. '
+                             'quiz.settings_fast_auth')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--quizzes', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=20,
+                        help='Questions per quiz')
+    parser.add_argument('--options', type=int, default=4,
+                        help='Options per question')
+    parser.add_argument('--started', type=float, default=0.4,
+                        help='Fraction of user/quiz pairs with a take in '
+                             'progress')
+    parser.add_argument('--completed', type=float, default=0.3,
+                        help='Fraction of user/quiz pairs with a completed '
+                             'take')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def add_report_arguments(parser):
+    """Baseline saving and comparison arguments, shared by benchmark runners"""
+    parser.add_argument('--output', help='Save report as JSON baseline')
+    parser.add_argument('--compare', help='Compare against JSON baseline, '
+                                          'exit with 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Allowed latency growth when comparing')
+
+
+def get_scale(args):
+    """Dataset scale out of parsed arguments"""
+    from . import dataset
+
+    return dataset.Scale(
+        users=args.users,
+        quizzes=args.quizzes,
+        questions=args.questions,
+        options=args.options,
+        started=args.started,
+        completed=args.completed,
+    )
+
+
+def get_meta(scale, **details):
+    """Report metadata, to tell apart what was measured"""
+    import django
+
+    retval = {
+        'revision': get_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'settings': os.environ['DJANGO_SETTINGS_MODULE'],
+        'scale': scale._asdict(),
+    }
+    retval.update(details)
+    return retval
+
+
+@contextmanager
+def test_databases(settings_module, file_backed=False):
+    """Throwaway test databases for the duration of the block
+
+    SQLite test database is in memory by default, file_backed one is needed
+    when it is accessed from several threads at once"""
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.runner import DiscoverRunner
+
+    database_file = None
+    if file_backed and connection.vendor == 'sqlite':
+        handle, database_file = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connection.settings_dict['TEST']['NAME'] = database_file
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    runner.setup_test_environment()
+    old_config = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(old_config)
+        runner.teardown_test_environment()
+        if database_file and os.path.exists(database_file):
+            os.remove(database_file)
+
+
+def save_and_compare(args, result):
+    """Print, save and compare report as requested, returns exit code"""
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(result, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(baseline, result, args.tolerance):
+            return 1
+    return 0
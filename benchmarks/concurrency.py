@@ -0,0 +1,280 @@
+"""Concurrent takers benchmark
+
+Many takers answer questions at the same time, the way a class does at the
+end of a timed exam. Every taker posts an answer and loads the next
+question, over and over, against two deployments with the same amount of
+threads processing requests:
+* wsgi - WSGI application behind a server with a fixed pool of workers
+* asgi - quiz.asgi application, WSGI one in a thread pool of the same size
+
+Reports per request latency percentiles (including time spent waiting for
+a free worker), throughput and failed requests of both. Database is file
+backed for SQLite, so threads see each other's writes.
+
+Run from the project root, i.e.:
+    python -m benchmarks.concurrency --takers 100 --workers 8
+"""
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from . import common
+
+
+# unsalted 32 character secret is accepted by the csrf middleware
+CSRF_TOKEN = 'benchmark' * 3 + 'bench'
+
+
+class Taker:
+    """Scripted requests of a single take in progress"""
+
+    def __init__(self, cookie, link, option_ids):
+        self.cookie = cookie
+        self.link = link
+        self.option_ids = option_ids  # to choose, in order of questions
+
+    def get_scope(self, method, content_type=None):
+        """ASGI http scope of a request to the quiz page"""
+        headers = [(b'cookie', self.cookie.encode('latin1'))]
+        if content_type:
+            headers.append((b'content-type', content_type.encode('latin1')))
+        return {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': self.link,
+            'root_path': '',
+            'query_string': b'',
+            'headers': headers,
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+
+    def requests(self):
+        """(scope, body, expected status) of every request, in order"""
+        from quiz.apps.exam.forms import RadioQuestionForm
+
+        for option_id in self.option_ids:
+            body = urlencode({
+                'csrfmiddlewaretoken': CSRF_TOKEN,
+                RadioQuestionForm.RADIO_OPTIONS: option_id,
+            }).encode()
+            content_type = 'application/x-www-form-urlencoded'
+            yield self.get_scope('POST', content_type), body, 302
+            yield self.get_scope('GET'), b'', 200
+
+
+def get_cookie(environment, user_id):
+    """Cookie header of logged in user, with csrf token"""
+    from django.conf import settings
+
+    client = environment.get_client(user_id)
+    return '{}={}; {}={}'.format(
+        settings.SESSION_COOKIE_NAME,
+        client.cookies[settings.SESSION_COOKIE_NAME].value,
+        settings.CSRF_COOKIE_NAME,
+        CSRF_TOKEN,
+    )
+
+
+def get_takers(environment, amount, answers):
+    """Takers of in progress takes, each answers up to answers questions"""
+    from django.urls import reverse
+
+    from quiz.apps.exam import content
+    from quiz.apps.exam.models import Answer
+
+    retval = []
+    for user_id, quiz_id in environment.takes(False)[:amount]:
+        quiz = content.get_compiled_quiz(quiz_id)
+        answered = set(
+            Answer.objects
+            .filter(take__user_id=user_id, take__quiz_id=quiz_id)
+            .values_list('question_id', flat=True)
+        )
+        option_ids = [
+            environment.rng.choice(question.options).id
+            for question in quiz.questions
+            if question.id not in answered and question.options
+        ][:answers]
+        link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+        retval.append(
+            Taker(get_cookie(environment, user_id), link, option_ids))
+    return retval
+
+
+def call_wsgi(application, scope, body):
+    """Perform request through WSGI application, returns status"""
+    from quiz.asgi_handler import build_environ
+
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        """Record response status"""
+        # pylint: disable = unused-argument
+        statuses.append(int(status.split(' ', 1)[0]))
+
+    response = application(build_environ(scope, body), start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return statuses[-1]
+
+
+def run_wsgi(takers, workers):
+    """Every taker in its own thread, requests processed by workers pool"""
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    measurements = []
+    lock = threading.Lock()
+
+    def take(taker):
+        """Perform requests of the taker, one by one"""
+        for scope, body, expected in taker.requests():
+            start = time.perf_counter()
+            status = server.submit(call_wsgi, application, scope, body).result()
+            elapsed = time.perf_counter() - start
+            with lock:
+                measurements.append((elapsed, status == expected))
+
+    with ThreadPoolExecutor(max_workers=workers) as server:
+        with ThreadPoolExecutor(max_workers=len(takers)) as clients:
+            start = time.perf_counter()
+            list(clients.map(take, takers))
+            wall = time.perf_counter() - start
+    return measurements, wall
+
+
+def run_asgi(takers, workers):
+    """Every taker in its own task, requests processed by quiz.asgi"""
+    from django.core.wsgi import get_wsgi_application
+
+    from quiz.asgi_handler import WsgiToAsgi
+
+    application = WsgiToAsgi(get_wsgi_application(), max_workers=workers)
+    measurements = []
+
+    async def call_asgi(scope, body):
+        """Perform request through ASGI application, returns status"""
+        messages = [{'type': 'http.request', 'body': body}]
+        statuses = []
+
+        async def receive():
+            """Request, client stays till the response is complete"""
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            """Record response status"""
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await application(scope, receive, send)
+        return statuses[-1]
+
+    async def take(taker):
+        """Perform requests of the taker, one by one"""
+        for scope, body, expected in taker.requests():
+            start = time.perf_counter()
+            status = await call_asgi(scope, body)
+            elapsed = time.perf_counter() - start
+            measurements.append((elapsed, status == expected))
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        start = time.perf_counter()
+        loop.run_until_complete(
+            asyncio.gather(*(take(taker) for taker in takers)))
+        wall = time.perf_counter() - start
+    finally:
+        application.executor.shutdown()
+        loop.close()
+    return measurements, wall
+
+
+def restore(last_answer_id):
+    """Drop answers given during the run, bring progress back"""
+    from quiz.apps.exam.models import Answer, Take
+
+    answers = Answer.objects.filter(pk__gt=last_answer_id)
+    take_ids = set(answers.values_list('take_id', flat=True))
+    answers.delete()
+    for take in Take.objects.filter(pk__in=take_ids):
+        take.refresh_progress()
+
+
+def report(measurements, wall):
+    """Latency report of concurrent run"""
+    retval = common.summarize([elapsed for elapsed, _ in measurements], [])
+    for metric in ('queries_per_request', 'max_queries'):
+        del retval[metric]
+    retval['failed'] = sum(not success for _, success in measurements)
+    retval['wall_s'] = wall
+    retval['throughput_rps'] = len(measurements) / wall if wall else 0
+    return retval
+
+
+def parse_args(argv):
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    common.add_dataset_arguments(parser)
+    parser.add_argument('--takers', type=int, default=50,
+                        help='Simultaneous takers, at most one per take in '
+                             'progress')
+    parser.add_argument('--answers', type=int, default=5,
+                        help='Questions answered by every taker')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Threads processing requests in both modes')
+    parser.add_argument('--modes', nargs='*', default=['wsgi', 'asgi'],
+                        choices=['wsgi', 'asgi'])
+    common.add_report_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Generate dataset in a test database, run modes one by one, report"""
+    args = parse_args(argv)
+    runners = {'wsgi': run_wsgi, 'asgi': run_asgi}
+    with common.test_databases(args.settings, file_backed=True):
+        from quiz.apps.exam.models import Answer
+
+        from . import dataset, scenarios
+
+        scale = common.get_scale(args)
+        dataset.generate(scale, seed=args.seed)
+        environment = scenarios.Environment(seed=args.seed)
+        takers = get_takers(environment, args.takers, args.answers)
+        if not takers:
+            print('no takes in progress, nothing to run on')
+            return 1
+        last_answer = Answer.objects.order_by('-pk').first()
+        reports = {}
+        for mode in args.modes:
+            measurements, wall = runners[mode](takers, args.workers)
+            reports[mode] = report(measurements, wall)
+            restore(last_answer.pk if last_answer else 0)
+
+    return common.save_and_compare(args, {
+        'meta': common.get_meta(
+            scale,
+            takers=len(takers),
+            answers=args.answers,
+            workers=args.workers,
+        ),
+        'scenarios': reports,
+    })
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Synthetic dataset generation"""
+import random
+from collections import namedtuple
+
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+
+from quiz.apps.exam import content, stats
+from quiz.apps.exam.models import Quiz, Question, Option, Take, Answer
+
+
+Scale = namedtuple(
+    'Scale', 'users quizzes questions options started completed')
+
+PASSWORD = 'benchmark_very_secure_pass'
+
+
+def _create_content(scale):
+    """Create quizzes, their questions and options
+
+    Returns quizzes, question ids by quiz id and option ids by question id,
+    correct option is the first one"""
+    Quiz.objects.bulk_create(
+        Quiz(name='quiz_{}'.format(i)) for i in range(scale.quizzes))
+    quizzes = list(Quiz.objects.order_by('pk'))
+    Question.objects.bulk_create(
+        Question(question_text='question {}'.format(i), quiz=quiz)
+        for quiz in quizzes
+        for i in range(scale.questions)
+    )
+    questions = list(Question.objects.order_by('pk'))
+    Option.objects.bulk_create(
+        Option(
+            option_text='option {}'.format(i),
+            is_correct=i == 0,
+            question=question,
+        )
+        for question in questions
+        for i in range(scale.options)
+    )
+
+    options = {}  # question id -> option ids, correct one is first
+    for option_id, question_id in Option.objects.order_by('pk').values_list(
+            'pk', 'question_id'):
+        options.setdefault(question_id, []).append(option_id)
+    quiz_questions = {}
+    for question in questions:
+        quiz_questions.setdefault(question.quiz_id, []).append(question.pk)
+    return quizzes, quiz_questions, options
+
+
+def _draw_takes(scale, rng, quizzes, quiz_questions, options):
+    """Unsaved takes of users, with stored progress of their answers
+
+    Returns takes and (question id, option id) answers by take position"""
+    takes = []
+    answered = {}  # take position -> answers
+    for user in User.objects.filter(username__startswith='user_'):
+        for quiz in quizzes:
+            roll = rng.random()
+            if roll >= scale.started + scale.completed:
+                continue
+            question_ids = quiz_questions[quiz.pk]
+            amount = (
+                len(question_ids)
+                if roll < scale.completed
+                else rng.randrange(len(question_ids) or 1)
+            )
+            answers = [
+                (question_id, rng.choice(options[question_id]))
+                for question_id in question_ids[:amount]
+            ]
+            answered[len(takes)] = answers
+            takes.append(Take(
+                user=user,
+                quiz=quiz,
+                questions_count=len(question_ids),
+                answered_count=amount,
+                correct_count=sum(
+                    option_id == options[question_id][0]
+                    for question_id, option_id in answers
+                ),
+                current_question_id=(
+                    question_ids[amount]
+                    if amount < len(question_ids)
+                    else None
+                ),
+            ))
+    return takes, answered
+
+
+def generate(scale, seed=0):
+    """Fill the database with users, quizzes and takes
+
+    started and completed are fractions of user/quiz pairs with a take,
+    started takes have a random amount of answered questions, completed
+    ones have all of them answered. Everything is written with bulk create,
+    stored take progress is calculated along the way"""
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username='user_{}'.format(i), password=password)
+        for i in range(scale.users)
+    )
+    quizzes, quiz_questions, options = _create_content(scale)
+    takes, answered = _draw_takes(
+        scale, rng, quizzes, quiz_questions, options)
+    Take.objects.bulk_create(takes)
+    take_ids = Take.objects.order_by('pk').values_list('pk', flat=True)
+    Answer.objects.bulk_create(
+        Answer(
+            take_id=take_id,
+            question_id=question_id,
+            chosen_option_id=option_id,
+            correct=option_id == options[question_id][0],
+        )
+        for position, take_id in enumerate(take_ids)
+        for question_id, option_id in answered[position]
+    )
+
+    # bulk create sends no signals
+    content.bump_catalogue_version()
+    for quiz in quizzes:
+        content.bump_quiz_version(quiz.pk)
+        stats.rebuild(quiz.pk)
@@ -0,0 +1,81 @@
+"""Benchmarks runner, see package docstring"""
+import argparse
+import sys
+import time
+
+from .common import (
+    add_dataset_arguments,
+    add_report_arguments,
+    get_meta,
+    get_scale,
+    save_and_compare,
+    summarize,
+    test_databases,
+)
+
+
+def run_scenario(scenario, iterations, warmup):
+    """Run scenario sequentially, returns its report"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies = []
+    queries = []
+    for iteration in range(warmup + iterations):
+        perform = scenario.prepare()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = perform()
+            elapsed = time.perf_counter() - start
+        if response.status_code != scenario.expected_status:
+            raise RuntimeError('{}: unexpected status {}'.format(
+                scenario.name, response.status_code))
+        scenario.restore()
+        if iteration >= warmup:
+            latencies.append(elapsed)
+            queries.append(len(context.captured_queries))
+    return summarize(latencies, queries)
+
+
+def parse_args(argv):
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_dataset_arguments(parser)
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20,
+                        help='Not measured requests per scenario')
+    parser.add_argument('--scenarios', nargs='*',
+                        help='Names of scenarios to run, all by default')
+    add_report_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Generate dataset in a test database, run scenarios, report"""
+    args = parse_args(argv)
+    with test_databases(args.settings):
+        from . import dataset, scenarios
+
+        scale = get_scale(args)
+        dataset.generate(scale, seed=args.seed)
+        environment = scenarios.Environment(seed=args.seed)
+        reports = {}
+        for scenario_class in scenarios.SCENARIOS:
+            if args.scenarios and scenario_class.name not in args.scenarios:
+                continue
+            scenario = scenario_class(environment)
+            if not scenario.is_available():
+                print('{}: nothing to run on, skipped'.format(scenario.name))
+                continue
+            reports[scenario.name] = run_scenario(
+                scenario, args.iterations, args.warmup)
+
+    return save_and_compare(args, {
+        'meta': get_meta(scale, iterations=args.iterations),
+        'scenarios': reports,
+    })
+
+
+if __name__ == '__main__':
+    sys.exit(main())
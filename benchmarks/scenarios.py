@@ -0,0 +1,189 @@
+"""Benchmark scenarios, one per step of the quiz taking flow
+
+Every scenario prepares a request out of the current database state (not
+measured), performs it (measured) and restores state if the request
+changed it (not measured), so scenarios can be repeated any amount of
+times on the same dataset.
+"""
+import random
+
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+
+from quiz.apps.exam import content, fragments
+from quiz.apps.exam.forms import RadioQuestionForm
+from quiz.apps.exam.models import Response, Take
+
+
+class Environment:
+    """Shared state of scenarios: logged in clients and randomness"""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self._clients = {}
+
+    def get_client(self, user_id):
+        """Client logged in as the user"""
+        if user_id not in self._clients:
+            client = Client()
+            client.force_login(User.objects.get(pk=user_id))
+            self._clients[user_id] = client
+        return self._clients[user_id]
+
+    @staticmethod
+    def takes(completed):
+        """(user id, quiz id) pairs of completed or in progress takes"""
+        return list(
+            Take.objects
+            .filter(current_question__isnull=completed)
+            .order_by('pk')
+            .values_list('user_id', 'quiz_id')
+        )
+
+    @staticmethod
+    def complete_take(user_id, quiz_id):
+        """Answer all remaining questions of a take"""
+        quiz = content.get_compiled_quiz(quiz_id)
+        take = Take.get_or_create(user=User(pk=user_id), quiz=quiz)
+        answered = set(take.answer_set.values_list('question_id', flat=True))
+        take.record_answers(
+            (question.id, Response(question.options[0].id), True)
+            for question in quiz.questions
+            if question.id not in answered and question.options
+        )
+
+
+class Scenario:
+    """Base scenario"""
+    name = None
+    expected_status = 200
+
+    def __init__(self, environment):
+        self.environment = environment
+
+    def is_available(self):
+        """Does dataset contain anything to run the scenario on"""
+        return bool(getattr(self, 'takes', True))
+
+    def prepare(self):
+        """Returns callable performing the request"""
+        raise NotImplementedError
+
+    def restore(self):
+        """Bring database back to the state before the request"""
+
+
+class IndexScenario(Scenario):
+    """Catalogue page"""
+    name = 'index'
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self.takes = environment.takes(False) + environment.takes(True)
+
+    def prepare(self):
+        user_id, _ = self.environment.rng.choice(self.takes)
+        client = self.environment.get_client(user_id)
+        return lambda: client.get(reverse('exam:index'))
+
+
+class QuestionScenario(Scenario):
+    """Current question of a take in progress"""
+    name = 'quiz_get'
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self.takes = environment.takes(False)
+
+    def prepare(self):
+        user_id, quiz_id = self.environment.rng.choice(self.takes)
+        client = self.environment.get_client(user_id)
+        link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+        return lambda: client.get(link)
+
+
+class ColdQuestionScenario(QuestionScenario):
+    """Current question of a take in progress, question form not cached
+
+    Compared to quiz_get shows the cost of rendering question forms, which
+    grows with amount of options (see --options)"""
+    name = 'quiz_get_cold'
+
+    def prepare(self):
+        fragments.fragment_cache.clear()
+        return super().prepare()
+
+
+class AnswerScenario(Scenario):
+    """Answer submission for current question of a take in progress"""
+    name = 'quiz_post'
+    expected_status = 302
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self.takes = environment.takes(False)
+        self.answered = None
+
+    def prepare(self):
+        user_id, quiz_id = self.environment.rng.choice(self.takes)
+        quiz = content.get_compiled_quiz(quiz_id)
+        take = Take.get_or_create(user=User(pk=user_id), quiz=quiz)
+        question = quiz.get_question(take.current_question_id)
+        self.answered = take, question
+        option = self.environment.rng.choice(question.options)
+        client = self.environment.get_client(user_id)
+        link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+        return lambda: client.post(
+            link, {RadioQuestionForm.RADIO_OPTIONS: option.id})
+
+    def restore(self):
+        take, question = self.answered
+        take.answer_set.filter(question_id=question.id).delete()
+        take.refresh_progress()
+
+
+class ResultsScenario(Scenario):
+    """Results of a completed take"""
+    name = 'results'
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self.takes = environment.takes(True)
+
+    def prepare(self):
+        user_id, quiz_id = self.environment.rng.choice(self.takes)
+        client = self.environment.get_client(user_id)
+        link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+        return lambda: client.get(link)
+
+
+class ClearScenario(Scenario):
+    """Retake of a completed take, starts a new attempt"""
+    name = 'clear'
+    expected_status = 302
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        self.takes = environment.takes(True)
+        self.cleared = None
+
+    def prepare(self):
+        self.cleared = self.environment.rng.choice(self.takes)
+        user_id, quiz_id = self.cleared
+        client = self.environment.get_client(user_id)
+        link = reverse('exam:clear', kwargs={'quiz_id': quiz_id})
+        return lambda: client.get(link)
+
+    def restore(self):
+        self.environment.complete_take(*self.cleared)
+
+
+SCENARIOS = (
+    IndexScenario,
+    QuestionScenario,
+    ColdQuestionScenario,
+    AnswerScenario,
+    ResultsScenario,
+    ClearScenario,
+)
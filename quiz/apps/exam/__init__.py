@@ -1 +1,3 @@
 """This is an exam app that provides creation of and participation in quizzes"""
+
+default_app_config = 'quiz.apps.exam.apps.ExamConfig'  # pylint: disable=C0103
@@ -5,9 +5,14 @@
 # pylint: disable = too-few-public-methods
 
 import nested_admin
+from django.conf import settings
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
 
+from . import results
 from .models import Quiz, Question, Option
+from .stats import get_quiz_summary
 
 
 class OptionInLine(nested_admin.NestedTabularInline):
@@ -23,6 +28,39 @@ class QuestionInLine(nested_admin.NestedStackedInline):
 
 class QuizAdmin(nested_admin.NestedModelAdmin):
     inlines = [QuestionInLine]
+    readonly_fields = ['statistics']
+    actions = ['export_take_results', 'export_answer_results']
+
+    @staticmethod
+    def statistics(obj):
+        # out of materialized aggregates and indexes, see stats module
+        if obj.pk is None:
+            return '-'
+        return render_to_string('exam/stats_summary.html', {
+            'stats': get_quiz_summary(obj.pk),
+            'pass_score': getattr(settings, 'EXAM_PASS_PERCENTAGE', 50),
+        })
+
+    @staticmethod
+    def _export_results(kind, queryset):
+        # streamed out of a single query, see results module
+        response = StreamingHttpResponse(
+            results.stream_csv(
+                kind, list(queryset.values_list('pk', flat=True))),
+            content_type='text/csv',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="{}.csv"'.format(kind))
+        return response
+
+    def export_take_results(self, _request, queryset):
+        return self._export_results(results.KIND_TAKES, queryset)
+    export_take_results.short_description = 'Export results by take (csv)'
+
+    def export_answer_results(self, _request, queryset):
+        return self._export_results(results.KIND_ANSWERS, queryset)
+    export_answer_results.short_description = (
+        'Export results by answer (csv)')
 
 
 admin.site.register(Quiz, QuizAdmin)
@@ -0,0 +1,189 @@
+"""Exam app JSON API
+
+Lets clients take a quiz without a page per question: the whole quiz is
+fetched by a single request and answers are submitted in batches.
+Same session authentication (and CSRF protection) as for the web ui is used.
+"""
+import json
+import math
+
+from django.db import IntegrityError
+from django.http import JsonResponse
+
+from .models import Answer, Question, Response
+from .views import GenericQuizView
+
+
+class GenericApiView(GenericQuizView):
+    """Generic API view, responds with 403 instead of login redirect"""
+    raise_exception = True
+
+    @staticmethod
+    def get_results(take):
+        """Results payload out of take stored progress"""
+        total, correct, incorrect, percentage = take.get_stored_results()
+        return {
+            'total_questions': total,
+            'right_answers': correct,
+            'wrong_answers': incorrect,
+            'right_percentage': percentage,
+            'completed': take.current_question_id is None,
+            'deadline': take.deadline,
+        }
+
+
+class QuizApiView(GenericApiView):
+    """Whole quiz content, without correctness, and user progress in it"""
+
+    def get(self, request, quiz_id):
+        """Process get request"""
+        quiz = self.get_quiz(quiz_id)
+        self.sync_pending(request, quiz_id)
+        take = self.get_take(request, quiz_id, quiz)
+        self.finalize_if_expired(request, quiz_id, take)
+        answered = Answer.objects.filter(take=take).values_list(
+            'question_id', flat=True)
+        return JsonResponse({
+            'id': quiz.id,
+            'name': quiz.name,
+            'questions': [
+                {
+                    'id': question.id,
+                    'text': question.question_text,
+                    'type': question.question_type,
+                    'options': [
+                        {'id': option.id, 'text': option.option_text}
+                        for option in question.get_options()
+                    ],
+                }
+                for question in quiz.get_take_questions(take)
+            ],
+            'answered': list(answered),
+            'results': self.get_results(take),
+        })
+
+
+class AnswersApiView(GenericApiView):
+    """Batch answers submission, written completely or not at all
+
+    Request body is {"answers": [{"question": id, "option": id}, ...]}, or
+    "options": [id, ...] or "value": number instead of option, by question
+    type. Batch is validated as a whole, empty ones, ones out of question
+    order of the take or past its deadline are rejected"""
+
+    @staticmethod
+    def parse_response(answer):
+        """Get response out of an answer of request body"""
+        if 'option' in answer:
+            return Response(option_id=int(answer['option']))
+        if 'options' in answer:
+            return Response(option_ids=sorted(
+                {int(option_id) for option_id in answer['options']}))
+        return Response(value=float(answer['value']))
+
+    @classmethod
+    def parse_answers(cls, body):
+        """Get (question id, response) pairs out of request body"""
+        data = json.loads(body.decode('utf-8'))
+        return [
+            (int(answer['question']), cls.parse_response(answer))
+            for answer in data['answers']
+        ]
+
+    @staticmethod
+    def get_response_error(question, response):
+        """Why response doesn't fit the question, None if it does"""
+        if question.question_type == Question.RADIO:
+            option_ids = (
+                None if response.option_id is None else [response.option_id])
+        elif question.question_type == Question.MULTIPLE:
+            option_ids = response.option_ids
+        else:
+            option_ids = []
+            if response.value is None or not math.isfinite(response.value):
+                return 'Question {} is answered by a number'.format(
+                    question.id)
+            if (question.question_type == Question.TRUE_FALSE
+                    and response.value not in (0, 1)):
+                return 'Question {} is answered by 1 or 0'.format(
+                    question.id)
+        if option_ids is None:
+            return 'Question {} is answered by options'.format(question.id)
+        for option_id in option_ids:
+            if question.get_option(option_id) is None:
+                return 'Option {} is not in question {}'.format(
+                    option_id, question.id)
+        return None
+
+    @classmethod
+    def validate_answers(cls, quiz, take, answers):
+        """Grade answers, returns graded answers and list of errors"""
+        errors = []
+        graded = []
+        question_ids = {question_id for question_id, _ in answers}
+        answered = set(
+            Answer.objects
+            .filter(take=take, question_id__in=question_ids)
+            .values_list('question_id', flat=True)
+        )
+        seen = set()
+        question_ids = take.get_question_order()
+        if question_ids is not None:
+            next_ids = iter(question_ids[take.answered_count:])
+            question_ids = set(question_ids)
+        for question_id, response in answers:
+            question = quiz.get_question(question_id)
+            if question is None or (
+                    question_ids is not None
+                    and question_id not in question_ids):
+                errors.append('Question {} is not in the quiz'.format(
+                    question_id))
+            elif question_id in answered or question_id in seen:
+                errors.append('Question {} is already answered'.format(
+                    question_id))
+            elif (question_ids is not None
+                  and next(next_ids, None) != question_id):
+                errors.append('Question {} is answered out of order'.format(
+                    question_id))
+            else:
+                error = cls.get_response_error(question, response)
+                if error:
+                    errors.append(error)
+                else:
+                    graded.append((
+                        question_id,
+                        response,
+                        quiz.grade(question_id, response),
+                    ))
+            seen.add(question_id)
+        return graded, errors
+
+    def post(self, request, quiz_id):
+        """Process post request"""
+        quiz = self.get_quiz(quiz_id)
+        try:
+            answers = self.parse_answers(request.body)
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {'errors': ['Malformed request body']}, status=400)
+        if not answers:
+            return JsonResponse({'errors': ['No answers given']}, status=400)
+
+        self.sync_pending(request, quiz_id)
+        take = self.get_take(request, quiz_id, quiz)
+        if take.is_expired():
+            self.finalize_if_expired(request, quiz_id, take)
+            return JsonResponse({
+                'errors': ['Time is up'],
+                'results': self.get_results(take),
+            }, status=403)
+        graded, errors = self.validate_answers(quiz, take, answers)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+        try:
+            take.record_answers(graded)
+        except IntegrityError:
+            # same questions were answered concurrently
+            return JsonResponse(
+                {'errors': ['Questions are already answered']}, status=409)
+        return JsonResponse({'results': self.get_results(take)})
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 
 class ExamConfig(AppConfig):
     """Exam app config"""
-    name = 'exam'
+    name = 'quiz.apps.exam'
+    label = 'exam'
+
+    def ready(self):
+        from . import signals  # pylint: disable = unused-variable
@@ -0,0 +1,80 @@
+"""Exam app take attempts pruning
+
+Retaking a quiz used to delete the take, and deleting a take loads all of
+its answers into memory (to cascade them) and holds the write lock while
+they are deleted, which is spiky for long quizzes. Now a retake starts a
+new attempt instead (see Take.retake), a single INSERT, and previous
+attempts are kept for history and statistics.
+
+To keep the amount of stored answers bounded, attempts of each user and
+quiz older than the latest EXAM_ATTEMPTS_KEPT ones are pruned off the
+request path by prune_attempts management command. Answers are deleted in
+batches by short transactions, each of them withdraws its answers from
+option statistics, then the take row itself is deleted (withdrawing it
+from the rest of statistics and the leaderboard, see signals module).
+"""
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery
+
+from .models import Answer, OptionStats, Take
+
+
+def get_stale_takes(keep):
+    """Takes with at least keep later attempts of the same user and quiz
+
+    Retakes number attempts sequentially, so those are takes with attempt
+    number lower than the latest one by keep or more"""
+    latest = (
+        Take.objects
+        .filter(user_id=OuterRef('user_id'), quiz_id=OuterRef('quiz_id'))
+        .order_by('-attempt')
+        .values('attempt')[:1]
+    )
+    return (
+        Take.objects
+        .annotate(latest_attempt=Subquery(
+            latest, output_field=IntegerField()))
+        .filter(attempt__lte=F('latest_attempt') - keep)
+    )
+
+
+def prune_take(take, batch_size):
+    """Delete take, its answers in batches, keeping statistics in sync"""
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Answer.objects
+                .filter(take_id=take.pk)
+                .order_by('pk')
+                .values_list(
+                    'pk', 'chosen_option_id', 'chosen_option_ids'
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            Answer.objects.filter(
+                pk__in=[answer_id for answer_id, _, _ in batch]).delete()
+            # answers of a take are to different questions, so each option
+            # is picked by a batch once at most
+            OptionStats.record_picks(
+                [
+                    picked
+                    for _, option_id, option_ids in batch
+                    for picked in Answer.picked_option_ids(
+                        option_id, option_ids)
+                ],
+                -1,
+            )
+    take.delete()
+
+
+def prune(keep, batch_size, limit=None):
+    """Prune stale attempts, returns amount of pruned takes"""
+    takes = get_stale_takes(keep).order_by('pk')
+    if limit is not None:
+        takes = takes[:limit]
+    pruned = 0
+    for take in list(takes):
+        prune_take(take, batch_size)
+        pruned += 1
+    return pruned
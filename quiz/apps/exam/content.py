@@ -0,0 +1,430 @@
+"""Exam app compiled quiz content
+
+Quiz content (quiz, its questions and their options) is almost never changed,
+so instead of querying it on every request it is compiled into a compact
+immutable snapshot. Snapshots are kept in a per-process LRU cache, backed by
+the shared django cache. Cache keys contain quiz content version, which is
+bumped by signals on every content change (see signals module), so stale
+snapshots are never served, they are simply evicted eventually.
+
+Versions bumped by other processes (management commands, other workers)
+are seen only through a shared cache backend. With a per process one
+(i.e. the default LocMemCache) set EXAM_CONTENT_VERSION_TIMEOUT, so
+versions expire and stale content is served for that long at most.
+
+Content is compiled out of read replicas (see quiz.routers), unless it was
+changed recently: version tokens carry time of the change, and content
+younger than DATABASE_REPLICA_LAG is read from the primary, so a lagging
+replica doesn't get stale content cached under a new version. Same goes
+for pages of the quizzes catalogue.
+
+Answers are graded by snapshots when saved and their grades are stored,
+so changing an answer key of a quiz with takes leaves those grades stale,
+they are graded again by current content with regrade (see
+rebuild_take_progress management command).
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from .models import Answer, Option, Question, Quiz, Response, unpack_ids
+
+
+CACHE_VERSION_KEY = 'exam:quiz:{quiz_id}:version'
+CACHE_CONTENT_KEY = 'exam:quiz:{quiz_id}:content:{version}'
+CACHE_CATALOGUE_VERSION_KEY = 'exam:catalogue:version'
+CACHE_CATALOGUE_PAGE_KEY = 'exam:catalogue:{version}:{before}:{size}:{search}'
+CACHE_TIMEOUT = None  # versioned content never becomes stale
+# seconds versions are kept for, see module docstring, forever by default
+CACHE_VERSION_TIMEOUT = None
+CACHE_CATALOGUE_TIMEOUT = 60 * 60  # searches are many, let them expire
+REGRADE_BATCH_SIZE = 500  # answers updated by a single UPDATE
+# hints of reads which have to see latest writes, see quiz.routers
+PRIMARY = {'primary': True}
+
+
+CompiledOption = namedtuple('CompiledOption', 'id option_text is_correct')
+CatalogueQuiz = namedtuple('CatalogueQuiz', 'id name')
+
+
+class CompiledQuestion(namedtuple(
+        'CompiledQuestion',
+        'id question_text options correct_option_ids '
+        'question_type correct_value tolerance')):
+    """Question snapshot, quacks like Question model where it matters
+
+    Contains everything needed to grade an answer of any question type,
+    so grading takes no queries"""
+    __slots__ = ()
+
+    def __new__(  # pylint: disable = too-many-arguments
+            cls, id, question_text, options, correct_option_ids,
+            question_type=Question.RADIO, correct_value=None, tolerance=0):
+        # pylint: disable = redefined-builtin
+        return super().__new__(
+            cls, id, question_text, options, correct_option_ids,
+            question_type, correct_value, tolerance)
+
+    def __str__(self):
+        return self.question_text
+
+    def get_options(self):
+        """Get question options"""
+        return self.options
+
+    def get_option(self, option_id):
+        """Get question option by id, None if there is no such option"""
+        for option in self.options:
+            if option.id == option_id:
+                return option
+        return None
+
+    def grade(self, response):
+        """Is response a correct answer for the question"""
+        if self.question_type == Question.RADIO:
+            return response.option_id in self.correct_option_ids
+        if self.question_type == Question.MULTIPLE:
+            return frozenset(response.option_ids or ()) == (
+                self.correct_option_ids)
+        if response.value is None or self.correct_value is None:
+            return False
+        return abs(response.value - self.correct_value) <= self.tolerance
+
+
+class CompiledQuiz:  # pylint: disable = too-many-instance-attributes
+    """Quiz snapshot, contains ordered questions and correct options map"""
+    __slots__ = (
+        'id', 'name', 'version', 'questions', 'shuffle_questions',
+        'questions_per_take', 'time_limit', '_question_index',
+    )
+
+    def __init__(  # pylint: disable = too-many-arguments
+            self, quiz_id, name, version, questions,
+            shuffle_questions=False, questions_per_take=None,
+            time_limit=None):
+        self.id = quiz_id  # pylint: disable = invalid-name
+        self.name = name
+        self.version = version
+        self.questions = tuple(questions)  # ordered by id
+        self.shuffle_questions = shuffle_questions
+        self.questions_per_take = questions_per_take
+        self.time_limit = time_limit  # minutes
+        self._question_index = {
+            question.id: position
+            for position, question in enumerate(self.questions)
+        }
+
+    def __str__(self):
+        return self.name
+
+    def __getstate__(self):
+        return (
+            self.id, self.name, self.version, self.questions,
+            self.shuffle_questions, self.questions_per_take,
+            self.time_limit,
+        )
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    @property
+    def pk(self):  # pylint: disable = invalid-name
+        """Same as id, like in models"""
+        return self.id
+
+    def get_question(self, question_id):
+        """Get question by id, None if there is no such question"""
+        position = self._question_index.get(question_id)
+        return None if position is None else self.questions[position]
+
+    def get_take_questions(self, take):
+        """Questions of a take, in its delivery order"""
+        question_ids = take.get_question_order()
+        if question_ids is None:
+            return self.questions
+        questions = (
+            self.get_question(question_id) for question_id in question_ids)
+        return tuple(question for question in questions if question)
+
+    def get_correct_option_ids(self, question_id):
+        """Ids of correct options of a question"""
+        question = self.get_question(question_id)
+        return question.correct_option_ids if question else frozenset()
+
+    def is_correct(self, question_id, option_id):
+        """Is option a correct answer for a question"""
+        return option_id in self.get_correct_option_ids(question_id)
+
+    def grade(self, question_id, response):
+        """Is response a correct answer for a question"""
+        question = self.get_question(question_id)
+        return question.grade(response) if question else False
+
+
+class LRUCache:
+    """Simple thread safe least recently used cache"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get value by key, None if there is no such key"""
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        """Set value for key, evicting least recently used ones if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop everything"""
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(  # pylint: disable = invalid-name
+    getattr(settings, 'EXAM_CONTENT_CACHE_SIZE', 128))
+
+
+def _get_version_timeout():
+    return getattr(
+        settings, 'EXAM_CONTENT_VERSION_TIMEOUT', CACHE_VERSION_TIMEOUT)
+
+
+def _new_version():
+    """New version token, time of its creation and a random part"""
+    return '{:.3f}:{}'.format(time.time(), uuid.uuid4().hex)
+
+
+def _get_version(key):
+    """Current version token stored under the key
+
+    Version is a random token rather than a counter, so if shared cache
+    loses it, a new one is generated instead of reusing an old one"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), _get_version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def get_read_hints(version):
+    """Database hints for reads of content of a version
+
+    Content is read from replicas, unless its version is younger than
+    replica lag, or there is no version at all"""
+    try:
+        created_at = float(version.split(':', 1)[0])
+    except (AttributeError, ValueError):
+        return PRIMARY
+    lag = getattr(settings, 'DATABASE_REPLICA_LAG', 60)
+    return PRIMARY if time.time() - created_at < lag else {}
+
+
+def _bump_version(key):
+    """Replace version token stored under the key
+
+    Version is bumped right away and once more after commit, otherwise a
+    concurrent request could cache not yet committed data under the new
+    version"""
+    def bump():
+        """Replace the version token"""
+        cache.set(key, _new_version(), _get_version_timeout())
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_quiz_version(quiz_id):
+    """Current content version of a quiz"""
+    return _get_version(CACHE_VERSION_KEY.format(quiz_id=quiz_id))
+
+
+def bump_quiz_version(quiz_id):
+    """Mark quiz content as changed, so snapshots are compiled again"""
+    _bump_version(CACHE_VERSION_KEY.format(quiz_id=quiz_id))
+
+
+def bump_catalogue_version():
+    """Mark list of quizzes as changed, so cached pages are dropped"""
+    _bump_version(CACHE_CATALOGUE_VERSION_KEY)
+
+
+def _compile_options(quiz_id, hints):
+    """Options of questions of a quiz by question id, ordered by id"""
+    options = {}
+    for option_id, question_id, option_text, is_correct in (
+            Option.objects.db_manager(hints=hints)
+            .filter(question__quiz_id=quiz_id)
+            .order_by('pk')
+            .values_list('id', 'question_id', 'option_text', 'is_correct')):
+        options.setdefault(question_id, []).append(
+            CompiledOption(option_id, option_text, is_correct))
+    return options
+
+
+def compile_quiz(quiz_id, version):
+    """Build quiz snapshot out of the database, raises Quiz.DoesNotExist
+
+    Content of no version (None) is read from the primary database"""
+    hints = get_read_hints(version)
+    name, shuffle_questions, questions_per_take, time_limit = (
+        Quiz.objects.db_manager(hints=hints)
+        .values_list(
+            'name', 'shuffle_questions', 'questions_per_take', 'time_limit')
+        .get(pk=quiz_id)
+    )
+    options = _compile_options(quiz_id, hints)
+    questions = []
+    for (question_id, question_text, question_type, correct_value,
+         tolerance) in (
+             Question.objects.db_manager(hints=hints)
+             .filter(quiz_id=quiz_id)
+             .order_by('pk')
+             .values_list(
+                 'id', 'question_text', 'question_type', 'correct_value',
+                 'tolerance')):
+        question_options = tuple(options.get(question_id, ()))
+        questions.append(CompiledQuestion(
+            question_id,
+            question_text,
+            question_options,
+            frozenset(
+                option.id for option in question_options if option.is_correct
+            ),
+            question_type,
+            correct_value,
+            tolerance,
+        ))
+    return CompiledQuiz(
+        quiz_id, name, version, questions,
+        shuffle_questions, questions_per_take, time_limit,
+    )
+
+
+def get_stale_grades(quiz_id):
+    """Answers of the quiz graded differently by its current content
+
+    Yields (answer id, take id, is correct) tuples, is correct is the grade
+    by current content"""
+    compiled_quiz = compile_quiz(quiz_id, None)
+    for (answer_id, take_id, question_id, option_id, option_ids, value,
+         correct) in (
+             Answer.objects
+             .filter(question__quiz_id=quiz_id)
+             .order_by('pk')
+             .values_list(
+                 'pk', 'take_id', 'question_id', 'chosen_option_id',
+                 'chosen_option_ids', 'value', 'correct')
+             .iterator()):
+        response = Response(
+            option_id,
+            None if option_ids is None else unpack_ids(option_ids),
+            value,
+        )
+        is_correct = compiled_quiz.grade(question_id, response)
+        if is_correct != correct:
+            yield answer_id, take_id, is_correct
+
+
+def regrade(quiz_id):
+    """Store grades of answers of the quiz by its current content
+
+    Only answers with stale grades are updated. Stored progress of their
+    takes is not, returns ids of those takes"""
+    answer_ids = {True: [], False: []}
+    take_ids = set()
+    for answer_id, take_id, is_correct in get_stale_grades(quiz_id):
+        answer_ids[is_correct].append(answer_id)
+        take_ids.add(take_id)
+    for is_correct, ids in answer_ids.items():
+        for start in range(0, len(ids), REGRADE_BATCH_SIZE):
+            Answer.objects.filter(
+                pk__in=ids[start:start + REGRADE_BATCH_SIZE],
+            ).update(correct=is_correct)
+    return take_ids
+
+
+def get_compiled_quiz(quiz_id):
+    """Get quiz snapshot, from the cache if possible
+
+    Raises Quiz.DoesNotExist if there is no such quiz"""
+    quiz_id = int(quiz_id)
+    version = get_quiz_version(quiz_id)
+    local_key = (quiz_id, version)
+    compiled_quiz = local_cache.get(local_key)
+    if compiled_quiz is not None:
+        return compiled_quiz
+
+    shared_key = CACHE_CONTENT_KEY.format(quiz_id=quiz_id, version=version)
+    compiled_quiz = cache.get(shared_key)
+    if compiled_quiz is None:
+        compiled_quiz = compile_quiz(quiz_id, version)
+        cache.set(shared_key, compiled_quiz, CACHE_TIMEOUT)
+    local_cache.set(local_key, compiled_quiz)
+    return compiled_quiz
+
+
+def get_compiled_quiz_or_404(quiz_id):
+    """Get quiz snapshot, raise Http404 if there is no such quiz"""
+    try:
+        return get_compiled_quiz(quiz_id)
+    except Quiz.DoesNotExist:
+        raise Http404('No quiz matches the given query.')
+
+
+def get_catalogue_page(search='', before=None, size=50):
+    """Page of quizzes list, newest first, from the cache if possible
+
+    Keyset pagination - page contains quizzes with id lower than before,
+    so every page is a cheap index range scan, however deep it is.
+    Search is a case sensitive name prefix, it is expressed as a range
+    too, so name index is used. Returns tuple of quizzes and value of
+    before for the next page, None if it is the last one"""
+    version = _get_version(CACHE_CATALOGUE_VERSION_KEY)
+    key = CACHE_CATALOGUE_PAGE_KEY.format(
+        version=version,
+        before=before,
+        size=size,
+        search=hashlib.md5(search.encode('utf-8')).hexdigest(),
+    )
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    quizzes = (
+        Quiz.objects.db_manager(hints=get_read_hints(version))
+        .order_by('-pk')
+    )
+    if search:
+        quizzes = quizzes.filter(
+            name__gte=search,
+            name__lt=search + chr(0x10ffff),
+            name__startswith=search,  # range is not exact for all collations
+        )
+    if before is not None:
+        quizzes = quizzes.filter(pk__lt=before)
+    quizzes = [
+        CatalogueQuiz(*row)
+        for row in quizzes.values_list('id', 'name')[:size + 1]
+    ]
+    next_before = quizzes[size - 1].id if len(quizzes) > size else None
+    page = tuple(quizzes[:size]), next_before
+    cache.set(key, page, CACHE_CATALOGUE_TIMEOUT)
+    return page
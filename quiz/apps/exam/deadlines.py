@@ -0,0 +1,86 @@
+"""Exam app deadlines of timed takes
+
+Takes of quizzes with time limit get a deadline on creation (see
+Take.create_attempt). Deadline is a column of the take row, which views
+read anyway, so enforcing it adds no queries: answers submitted after the
+deadline are rejected and the take is finalized right away, showing its
+results (see views).
+
+Finalizing clears the cursor of the take, so it counts as completed, with
+unanswered questions as incorrect, and accounts it in score buckets and
+on the leaderboard, like a take completed by its last answer.
+
+Takes abandoned before their deadline are finalized off the request path
+by expire_takes management command, a batched sweep over a partial index
+of timed takes in progress. The sweep leaves takes expired less than
+EXAM_DEADLINE_GRACE seconds ago, so answers submitted right before the
+deadline are not raced. Answers still queued for writing (see ingest) once
+the take is finalized are dropped, finalized takes are never reopened.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import leaderboard
+from .models import ScoreBucket, Take
+
+
+def get_expired_takes(now):
+    """Takes in progress with deadline before now, by deadline"""
+    return (
+        Take.objects
+        .filter(deadline__lt=now, current_question__isnull=False)
+        .order_by('deadline')
+    )
+
+
+def finalize(take_ids, now=None):
+    """Finalize takes out of take ids, which have expired by now
+
+    A single transaction, returns amount of finalized takes"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = list(
+            Take.objects
+            .select_for_update()
+            .filter(
+                pk__in=take_ids,
+                deadline__lte=now,
+                current_question__isnull=False,
+            )
+            .values_list('pk', flat=True)
+        )
+        if not expired:
+            return 0
+        Take.objects.filter(pk__in=expired).update(current_question=None)
+        completed = list(
+            ScoreBucket.take_scores()
+            .filter(pk__in=expired)
+            .values_list('pk', 'quiz_id', 'user_id', 'score')
+        )
+        buckets = Counter(
+            (quiz_id, score) for _, quiz_id, _, score in completed)
+        for (quiz_id, score), amount in buckets.items():
+            ScoreBucket.objects.filter(quiz_id=quiz_id, score=score).update(
+                takes_count=F('takes_count') + amount)
+        leaderboard.record_many(completed)
+    return len(expired)
+
+
+def sweep(batch_size, grace=0, limit=None):
+    """Finalize takes expired more than grace seconds ago, in batches
+
+    Returns amount of finalized takes"""
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    swept = 0
+    while limit is None or swept < limit:
+        size = batch_size if limit is None else min(batch_size, limit - swept)
+        batch = list(
+            get_expired_takes(cutoff).values_list('pk', flat=True)[:size])
+        if not batch:
+            break
+        swept += finalize(batch, cutoff)
+    return swept
@@ -1,33 +1,139 @@
-"""Exam app forms"""
+"""Exam app forms
+
+There is a form per question type, get_question_form picks one. Every form
+returns what was answered as a Response, which is graded by compiled quiz
+without extra queries"""
 
 from django import forms
 
-from .models import Option
+from .models import Question, Response
 
 
-class RadioQuestionForm(forms.Form):
-    """Form for question with radio options"""
+class QuestionForm(forms.Form):
+    """Base form for a question
 
-    RADIO_OPTIONS = 'radio_options'
+    Question might be a model or a compiled one"""
 
     def __init__(self, question, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.question = question
 
-        options = tuple(
-            (option.id, option.option_text)
+    def get_response(self):
+        """Get what was answered, as a response"""
+        raise NotImplementedError
+
+
+class RadioQuestionForm(QuestionForm):
+    """Form for question with radio options
+
+    Options are loaded once and the chosen one is returned out of them,
+    without extra queries"""
+
+    RADIO_OPTIONS = 'radio_options'
+
+    def __init__(self, question, *args, **kwargs):
+        super().__init__(question, *args, **kwargs)
+
+        self.options = {
+            option.id: option
             for option in question.get_options()
+        }
+        choices = tuple(
+            (option.id, option.option_text)
+            for option in self.options.values()
         )
 
-        self.fields[self.RADIO_OPTIONS] = forms.ChoiceField(
+        self.fields[self.RADIO_OPTIONS] = forms.TypedChoiceField(
             label=question.question_text,
             widget=forms.RadioSelect,
-            choices=options,
+            choices=choices,
+            coerce=int,
         )
 
     def get_chosen_option(self):
         """Get chosen option object"""
         answer = self.cleaned_data[self.RADIO_OPTIONS]
-        # AFAIU there should not be a KeyError
-        answer = Option.objects.get(pk=answer)  # might make sense to hide
-        # all django orm related stuff in models
-        return answer
+        # only existing choices pass validation, so there is no KeyError
+        return self.options[answer]
+
+    def get_response(self):
+        """Get chosen option, as a response"""
+        return Response(option_id=self.get_chosen_option().id)
+
+
+class MultipleChoiceQuestionForm(QuestionForm):
+    """Form for question with any amount of options to choose
+
+    Choosing none of options is an answer too"""
+
+    OPTIONS = 'options'
+
+    def __init__(self, question, *args, **kwargs):
+        super().__init__(question, *args, **kwargs)
+
+        self.fields[self.OPTIONS] = forms.TypedMultipleChoiceField(
+            label=question.question_text,
+            widget=forms.CheckboxSelectMultiple,
+            choices=tuple(
+                (option.id, option.option_text)
+                for option in question.get_options()
+            ),
+            coerce=int,
+            required=False,
+        )
+
+    def get_response(self):
+        """Get chosen option ids, as a response"""
+        return Response(
+            option_ids=sorted(set(self.cleaned_data[self.OPTIONS])))
+
+
+class TrueFalseQuestionForm(QuestionForm):
+    """Form for true or false question"""
+
+    VALUE = 'value'
+    CHOICES = ((1, 'True'), (0, 'False'))
+
+    def __init__(self, question, *args, **kwargs):
+        super().__init__(question, *args, **kwargs)
+
+        self.fields[self.VALUE] = forms.TypedChoiceField(
+            label=question.question_text,
+            widget=forms.RadioSelect,
+            choices=self.CHOICES,
+            coerce=int,
+        )
+
+    def get_response(self):
+        """Get 1 for true or 0 for false, as a response"""
+        return Response(value=self.cleaned_data[self.VALUE])
+
+
+class NumericQuestionForm(QuestionForm):
+    """Form for question answered by a number"""
+
+    VALUE = 'value'
+
+    def __init__(self, question, *args, **kwargs):
+        super().__init__(question, *args, **kwargs)
+
+        # rejects infinities and not a numbers as well
+        self.fields[self.VALUE] = forms.FloatField(
+            label=question.question_text)
+
+    def get_response(self):
+        """Get the number, as a response"""
+        return Response(value=self.cleaned_data[self.VALUE])
+
+
+QUESTION_FORMS = {
+    Question.RADIO: RadioQuestionForm,
+    Question.MULTIPLE: MultipleChoiceQuestionForm,
+    Question.TRUE_FALSE: TrueFalseQuestionForm,
+    Question.NUMERIC: NumericQuestionForm,
+}
+
+
+def get_question_form(question, *args, **kwargs):
+    """Form of question type for the question"""
+    return QUESTION_FORMS[question.question_type](question, *args, **kwargs)
@@ -0,0 +1,49 @@
+"""Exam app rendered fragments
+
+Question form is the same for every taker of a quiz, yet rendering it (a
+widget template per option) is the most expensive part of question
+page on large option sets. So rendered question forms are kept in a per
+process LRU cache, keyed by quiz id, quiz content version and question id,
+so stale fragments are never served, same as compiled quizzes (see content
+module).
+
+The only per request part of the form is the CSRF token: fragments are
+rendered with a placeholder token, which is replaced by the real one.
+"""
+from django.conf import settings
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .content import LRUCache
+from .forms import get_question_form as get_form
+
+
+TEMPLATE_QUESTION_FORM = 'exam/question_form.html'
+CSRF_PLACEHOLDER = 'csrf-token-placeholder'
+
+
+fragment_cache = LRUCache(  # pylint: disable = invalid-name
+    getattr(settings, 'EXAM_FRAGMENT_CACHE_SIZE', 1024))
+
+
+def render_question_form(quiz, question):
+    """Question form HTML with placeholder CSRF token, from the cache"""
+    key = quiz.id, quiz.version, question.id
+    fragment = fragment_cache.get(key)
+    if fragment is None:
+        fragment = render_to_string(TEMPLATE_QUESTION_FORM, {
+            'quiz_id': quiz.id,
+            'form': get_form(question),
+            'csrf_token': CSRF_PLACEHOLDER,
+        })
+        fragment_cache.set(key, fragment)
+    return fragment
+
+
+def get_question_form(request, quiz, question):
+    """Question form HTML with CSRF token of the request"""
+    fragment = render_question_form(quiz, question)
+    # token input precedes question text, which could contain placeholder
+    return mark_safe(
+        fragment.replace(CSRF_PLACEHOLDER, get_token(request), 1))
@@ -0,0 +1,311 @@
+"""Exam app answer ingestion queue
+
+At the start and the end of a timed exam lots of answers come at once,
+and writing each of them by its own transaction serializes takers on the
+database write lock (SQLite has a single one). With EXAM_ANSWER_INGEST
+enabled answers are validated and graded against compiled quiz content as
+usual, but instead of being written they are put to an in-process queue,
+and a background flusher writes them in batches: one transaction per
+batch, a single bulk INSERT of answers and an UPDATE per take.
+
+Read your writes: answers waiting in the queue are pending for their take,
+views skip pending questions when picking the current one. Pending answers
+are snapshotted before the take is read and dropped only after they are
+committed, so any answer is seen either as pending or as written. Results
+(and anything else relying on stored progress) wait for pending answers of
+the take to be written first, see AnswerQueue.sync.
+
+Backpressure: once EXAM_ANSWER_INGEST_QUEUE_SIZE answers are waiting,
+submissions wait for space up to EXAM_ANSWER_INGEST_TIMEOUT and fail with
+QueueFull after that.
+
+Deadlines: answers are checked against the deadline of their take when
+submitted, and written as long as the take is not finalized and its
+deadline has passed less than EXAM_DEADLINE_GRACE seconds ago, takes
+expired longer ago are up for finalizing by the sweep (see deadlines).
+
+Failures: a batch failed to be written by a database error (a lost
+connection, a lock timeout) is put back to the head of the queue and stays
+pending, the flusher retries it with growing delays up to RETRY_DELAY_MAX.
+
+The queue lives in the process memory, so read your writes holds only for
+requests served by the same process (i.e. a threaded or ASGI server, or
+sticky sessions), and queued answers are lost if the process crashes.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError, IntegrityError, close_old_connections, transaction)
+from django.utils import timezone
+
+from .models import Answer, Take
+
+
+logger = logging.getLogger(__name__)  # pylint: disable = invalid-name
+
+PendingAnswer = namedtuple(
+    'PendingAnswer',
+    'user_id quiz_id take_id question_id response is_correct',
+)
+
+# Answer queue tuning: answers waiting at most, answers written by a single
+# transaction at most, seconds flusher waits for more answers to come and
+# seconds submissions wait for space, see EXAM_ANSWER_INGEST_* settings
+QueueConfig = namedtuple(
+    'QueueConfig', 'max_size batch_size interval timeout')
+
+WRITE_ATTEMPTS = 3
+RETRY_DELAY_MAX = 5.0
+
+
+class QueueFull(Exception):
+    """Answers queue stayed full for longer than submission timeout"""
+
+
+def get_current_question_id(take, pending):
+    """Current question id of the take as if pending answers were written
+
+    Pending are ids of pending questions of the take, snapshotted before
+    the take was read. Unless the stored current question is pending, it is
+    used as is, otherwise next one is looked up by the database, or in the
+    question order, pending ones are right after answered ones there"""
+    current_question_id = take.current_question_id
+    if current_question_id is None or current_question_id not in pending:
+        return current_question_id
+    if take.question_order is not None:
+        position = take.answered_count
+        while current_question_id in pending:
+            position += 1
+            current_question_id = Take.get_ordered_question_id(
+                take.question_order, position)
+        return current_question_id
+    return (
+        Take.unanswered_questions(take.pk, take.quiz_id)
+        .exclude(pk__in=pending)
+        .values_list('pk', flat=True)
+        .first()
+    )
+
+
+def write_answers(answers):
+    """Write pending answers and advance their takes, in one transaction
+
+    Answers of deleted, completed or finalized takes, of takes expired
+    longer than grace ago, and of already answered questions are skipped,
+    returns amount of written answers. Takes are locked, so they are not
+    finalized meanwhile"""
+    take_ids = {answer.take_id for answer in answers}
+    cutoff = timezone.now() - timedelta(
+        seconds=getattr(settings, 'EXAM_DEADLINE_GRACE', 5))
+    with transaction.atomic():
+        existing_takes = {
+            take_id: progress
+            for take_id, *progress in (
+                Take.objects
+                .select_for_update()
+                .filter(pk__in=take_ids, current_question__isnull=False)
+                .exclude(deadline__lt=cutoff)
+                .values_list(
+                    'pk', 'question_order', 'answered_count',
+                    'questions_count')
+            )
+        }
+        answered = set(
+            Answer.objects
+            .filter(
+                take_id__in=take_ids,
+                question_id__in={answer.question_id for answer in answers},
+            )
+            .values_list('take_id', 'question_id')
+        )
+        fresh = [
+            answer
+            for answer in answers
+            if answer.take_id in existing_takes
+            and (answer.take_id, answer.question_id) not in answered
+        ]
+        Answer.objects.bulk_create(
+            Answer.from_response(
+                answer.take_id,
+                answer.question_id,
+                answer.response,
+                answer.is_correct,
+            )
+            for answer in fresh
+        )
+        # take id -> quiz id, answered, correct, picked option ids
+        progress = {}
+        for answer in fresh:
+            quiz_id, answered_now, correct, option_ids = progress.get(
+                answer.take_id, (answer.quiz_id, 0, 0, ()))
+            progress[answer.take_id] = (
+                quiz_id,
+                answered_now + 1,
+                correct + bool(answer.is_correct),
+                option_ids + tuple(answer.response.get_picked_option_ids()),
+            )
+        for take_id, (quiz_id, answered_now, correct, option_ids) in (
+                progress.items()):
+            Take.advance_stored_progress(
+                take_id, quiz_id, answered_now, correct, option_ids,
+                *existing_takes[take_id]
+            )
+    return len(fresh)
+
+
+class AnswerQueue:
+    """Thread safe bounded queue of answers, see module docstring"""
+
+    def __init__(self, config, background=True):
+        self.config = config
+        self.background = background
+        self._queue = []
+        self._pending = {}  # (user id, quiz id) -> {question id: answer}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._queue)
+
+    def get_queued(self):
+        """Answers waiting in the queue, oldest first"""
+        with self._condition:
+            return list(self._queue)
+
+    def submit(self, take, question_id, response, is_correct):
+        """Queue graded response, waits for space if the queue is full
+
+        Returns False if the question is already pending, first answer
+        wins, same as with a unique constraint"""
+        answer = PendingAnswer(
+            take.user_id, take.quiz_id, take.pk,
+            question_id, response, is_correct,
+        )
+        key = answer.user_id, answer.quiz_id
+        deadline = time.monotonic() + self.config.timeout
+        with self._condition:
+            while True:
+                if question_id in self._pending.get(key, ()):
+                    return False
+                if len(self._queue) < self.config.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QueueFull
+                self._condition.wait(remaining)
+            self._pending.setdefault(key, {})[question_id] = answer
+            self._queue.append(answer)
+            self._condition.notify_all()
+        if self.background:
+            self._start_flusher()
+        return True
+
+    def get_pending(self, user_id, quiz_id):
+        """Ids of pending questions of the take"""
+        with self._condition:
+            return frozenset(self._pending.get((user_id, quiz_id), ()))
+
+    def sync(self, user_id, quiz_id):
+        """Write pending answers of the take right away, if any
+
+        Database errors of writing are raised, the answers stay pending"""
+        while True:
+            with self._condition:
+                if (user_id, quiz_id) not in self._pending:
+                    return
+            # pending answers are either queued or being written under the
+            # flush lock, nothing is pending once there is nothing to flush
+            if not self.flush():
+                return
+
+    def flush(self):
+        """Write a batch of queued answers, returns amount written
+
+        On a database error the batch is put back to the head of the queue,
+        its answers stay pending, and the error is raised"""
+        with self._flush_lock:
+            with self._condition:
+                batch = self._queue[:self.config.batch_size]
+                del self._queue[:self.config.batch_size]
+                self._condition.notify_all()  # there is space now
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except DatabaseError:
+                with self._condition:
+                    self._queue[:0] = batch
+                    self._condition.notify_all()
+                raise
+            self._drop_pending(batch)
+            return len(batch)
+
+    def drain(self):
+        """Write everything queued so far"""
+        while self.flush():
+            pass
+
+    @staticmethod
+    def _write(batch):
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                write_answers(batch)
+                return
+            except IntegrityError:
+                # same answers written concurrently by another path, next
+                # attempt skips them
+                if attempt == WRITE_ATTEMPTS - 1:
+                    raise
+
+    def _drop_pending(self, answers):
+        with self._condition:
+            for answer in answers:
+                key = answer.user_id, answer.quiz_id
+                pending = self._pending.get(key, {})
+                if pending.get(answer.question_id) is answer:
+                    del pending[answer.question_id]
+                if not pending:
+                    self._pending.pop(key, None)
+            self._condition.notify_all()
+
+    def _start_flusher(self):
+        with self._condition:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._run, name='answer-flusher', daemon=True)
+            self._flusher.start()
+        atexit.register(self.drain)
+
+    def _run(self):
+        delay = self.config.interval
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+            # let more answers come, so they are written by a single batch
+            time.sleep(delay)
+            try:
+                self.drain()
+                delay = self.config.interval
+            except DatabaseError:
+                logger.exception('Failed to write answers, retrying')
+                delay = min(max(delay, 0.05) * 2, RETRY_DELAY_MAX)
+            finally:
+                close_old_connections()
+
+
+answer_queue = AnswerQueue(QueueConfig(  # pylint: disable = invalid-name
+    max_size=getattr(settings, 'EXAM_ANSWER_INGEST_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'EXAM_ANSWER_INGEST_BATCH_SIZE', 500),
+    interval=getattr(settings, 'EXAM_ANSWER_INGEST_INTERVAL', 0.05),
+    timeout=getattr(settings, 'EXAM_ANSWER_INGEST_TIMEOUT', 1.0),
+))
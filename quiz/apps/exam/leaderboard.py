@@ -0,0 +1,89 @@
+"""Exam app quiz leaderboards
+
+Ranking every take of a quiz by score on each request doesn't scale, so
+leaderboards are built out of two indexed structures:
+* ScoreBucket (see stats module) - amount of completed takes by score,
+  at most 101 rows per quiz, rank of a score is 1 + amount of takes with
+  a greater one, so equal scores share a rank
+* LeaderboardEntry - completed takes by score, for top K, read by an index
+  range scan of K rows
+
+Takes get on the leaderboard by the same answer which completes them and
+accounts them in their score bucket (or by finalizing, see deadlines), so
+ranks and top K are always counted out of the same takes. They leave it
+with take deletion (i.e. by cascade when pruned). Every attempt of a user
+is ranked, standing of the user is the best one.
+"""
+from collections import namedtuple
+
+from .models import LeaderboardEntry, ScoreBucket
+
+
+Standing = namedtuple('Standing', 'rank username score')
+
+Leaderboard = namedtuple('Leaderboard', 'top standing completed')
+
+
+def record_many(completed):
+    """Put completed takes on leaderboards by a single bulk INSERT
+
+    Completed are (take id, quiz id, user id, score) tuples of takes which
+    are not on their leaderboards yet"""
+    LeaderboardEntry.objects.bulk_create(
+        LeaderboardEntry(
+            take_id=take_id,
+            quiz_id=quiz_id,
+            user_id=user_id,
+            score=score,
+        )
+        for take_id, quiz_id, user_id, score in completed
+    )
+
+
+def rebuild(quiz_id):
+    """Recreate leaderboard of the quiz out of completed takes"""
+    LeaderboardEntry.objects.filter(quiz_id=quiz_id).delete()
+    record_many(
+        ScoreBucket.take_scores()
+        .filter(quiz_id=quiz_id)
+        .values_list('pk', 'quiz_id', 'user_id', 'score')
+        .iterator()
+    )
+
+
+def get_ranks(quiz_id):
+    """Function returning rank of a score in the quiz, and takes amount"""
+    scores = ScoreBucket.get_scores(quiz_id)
+    ranks = {}
+    higher = 0
+    for score in sorted(scores, reverse=True):
+        ranks[score] = higher + 1
+        higher += scores[score]
+    return lambda score: ranks.get(score, higher + 1), higher
+
+
+def get_leaderboard(quiz_id, user, size=10):
+    """Top size standings of the quiz and best standing of the user"""
+    get_rank, completed = get_ranks(quiz_id)
+    top = [
+        Standing(get_rank(score), username, score)
+        for username, score in (
+            LeaderboardEntry.objects
+            .filter(quiz_id=quiz_id)
+            .order_by('-score', 'take')
+            .values_list('user__username', 'score')[:size]
+        )
+    ]
+    score = (
+        LeaderboardEntry.objects
+        .filter(quiz_id=quiz_id, user=user)
+        .order_by('-score')
+        .values_list('score', flat=True)
+        .first()
+    )
+    standing = (
+        None
+        if score is None
+        else Standing(get_rank(score), user.get_username(), score)
+    )
+    return Leaderboard(top, standing, completed)
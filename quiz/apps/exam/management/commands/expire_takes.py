@@ -0,0 +1,46 @@
+"""Finalize expired takes of timed quizzes"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.apps.exam import deadlines
+
+
+class Command(BaseCommand):
+    """Finalizes takes in progress with their deadline passed
+
+    Takes visited after their deadline are finalized right away, this
+    command takes care of abandoned ones, so they get into statistics and
+    on leaderboards. It should be run periodically (i.e. by cron), each
+    batch is finalized by a short transaction, see deadlines module"""
+    help = 'Finalize expired takes of timed quizzes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Takes finalized by a single transaction',
+        )
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=getattr(settings, 'EXAM_DEADLINE_GRACE', 5),
+            help='Seconds after deadline takes are left alone for',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Finalize this amount of takes at most',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size should be positive')
+        if options['grace'] < 0:
+            raise CommandError('--grace should not be negative')
+        expired = deadlines.sweep(
+            batch_size=options['batch_size'],
+            grace=options['grace'],
+            limit=options['limit'],
+        )
+        self.stdout.write('{} takes finalized'.format(expired))
@@ -0,0 +1,31 @@
+"""Export quiz content to JSON lines or csv file"""
+from django.core.management.base import BaseCommand
+
+from quiz.apps.exam import transfer
+
+
+class Command(BaseCommand):
+    """Streams question records from the database into a file
+
+    See transfer module for file formats description"""
+    help = 'Export quizzes to a JSON lines or csv file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'quizzes',
+            nargs='*',
+            help='Names of quizzes to export, all of them by default',
+        )
+        transfer.add_output_argument(parser)
+        transfer.add_format_argument(parser)
+
+    def handle(self, *args, **options):
+        path = options['output']
+        file_format = options['format'] or transfer.guess_format(path)
+        records = transfer.export_records(options['quizzes'])
+        writer = transfer.WRITERS[file_format]
+        if path == '-':
+            writer(records, self.stdout)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as output:
+                writer(records, output)
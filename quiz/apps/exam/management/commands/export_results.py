@@ -0,0 +1,43 @@
+"""Export results of quizzes to a csv file"""
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.apps.exam import results, transfer
+from quiz.apps.exam.models import Quiz
+
+
+class Command(BaseCommand):
+    """Streams take or answer rows from the database into a file
+
+    See results module for columns description"""
+    help = 'Export results of quizzes to a csv file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'quizzes',
+            nargs='+',
+            help='Names of quizzes to export results of',
+        )
+        parser.add_argument(
+            '--kind',
+            choices=results.KINDS,
+            default=results.KIND_TAKES,
+            help='Export a row per take (default) or a row per answer',
+        )
+        transfer.add_output_argument(parser)
+
+    def handle(self, *args, **options):
+        quiz_ids = list(
+            Quiz.objects
+            .filter(name__in=options['quizzes'])
+            .values_list('pk', flat=True)
+        )
+        if not quiz_ids:
+            raise CommandError('No such quizzes')
+        lines = results.stream_csv(options['kind'], quiz_ids)
+        path = options['output']
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
@@ -0,0 +1,61 @@
+"""Import quiz content from JSON lines or csv file"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.apps.exam import transfer
+
+
+class Command(BaseCommand):
+    """Streams question records from a file into the database in batches
+
+    See transfer module for file formats description"""
+    help = 'Import quizzes from a JSON lines or csv file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File to import, "-" for stdin',
+        )
+        transfer.add_format_argument(parser)
+        parser.add_argument(
+            '--mode',
+            choices=transfer.MODES,
+            default=transfer.MODE_CREATE,
+            help='create - fail on existing quizzes, '
+                 'upsert - update content of existing quizzes by name',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Amount of questions written per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size should be positive')
+        path = options['path']
+        file_format = options['format'] or transfer.guess_format(path)
+        importer = transfer.Importer(
+            mode=options['mode'],
+            batch_size=options['batch_size'],
+        )
+        if path == '-':
+            lines = sys.stdin
+        else:
+            lines = open(path, newline='', encoding='utf-8')
+        try:
+            importer.run(transfer.READERS[file_format](lines))
+        except transfer.TransferError as error:
+            raise CommandError(error)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+        self.stdout.write(
+            'Imported {} quizzes, {} questions, {} options'.format(
+                len(importer.quiz_ids),
+                importer.questions_amount,
+                importer.options_amount,
+            )
+        )
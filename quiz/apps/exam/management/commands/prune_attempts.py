@@ -0,0 +1,46 @@
+"""Prune old attempts of takes"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.apps.exam import attempts
+
+
+class Command(BaseCommand):
+    """Deletes attempts older than the latest ones of each user and quiz
+
+    Retakes keep previous attempts, this command should be run
+    periodically (i.e. by cron) to keep their amount bounded. Answers are
+    deleted in batches by short transactions, so it can run along with
+    takers, see attempts module"""
+    help = 'Prune old attempts of takes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=getattr(settings, 'EXAM_ATTEMPTS_KEPT', 5),
+            help='Latest attempts of each user and quiz to keep',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Answers deleted by a single transaction',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Prune this amount of attempts at most',
+        )
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError('Latest attempt is always kept, --keep >= 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size should be positive')
+        pruned = attempts.prune(
+            keep=options['keep'],
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write('{} attempts pruned'.format(pruned))
@@ -0,0 +1,35 @@
+"""Rebuild materialized quiz statistics"""
+from django.core.management.base import BaseCommand
+
+from quiz.apps.exam import stats
+from quiz.apps.exam.models import Quiz
+
+
+class Command(BaseCommand):
+    """Recalculates quiz statistics from takes and answers
+
+    Statistics are maintained along with saved answers and deleted takes,
+    this command should be run after upgrading to fill them for existing
+    data, and after changes made around the models, e.g. rebuilt take
+    progress. Each quiz is rebuilt by its own transaction, answers saved
+    concurrently may be missed, so it is better run during quiet hours"""
+    help = 'Rebuild statistics of all quizzes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quiz',
+            type=int,
+            action='append',
+            help='Process only quiz with this id, can be repeated',
+        )
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('pk')
+        if options['quiz']:
+            quizzes = quizzes.filter(pk__in=options['quiz'])
+
+        rebuilt = 0
+        for quiz_id in quizzes.values_list('pk', flat=True).iterator():
+            stats.rebuild(quiz_id)
+            rebuilt += 1
+        self.stdout.write('{} quizzes rebuilt'.format(rebuilt))
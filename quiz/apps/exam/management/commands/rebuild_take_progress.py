@@ -0,0 +1,90 @@
+"""Rebuild or verify stored progress of takes"""
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.apps.exam import content, stats
+from quiz.apps.exam.models import Quiz, Take
+
+
+class Command(BaseCommand):
+    """Recalculates take progress counters and current question cursors
+
+    Stored progress is maintained along with saved answers, but editing
+    questions of a quiz, e.g. in the admin, makes it stale. So do stored
+    grades of answers, once an answer key is changed. This command should
+    be run after such edits, it grades answers again by current content
+    first, then rebuilds progress and statistics of quizzes with stale
+    takes"""
+    help = 'Rebuild or verify stored progress of all takes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report takes with stale progress, fail if any',
+        )
+        parser.add_argument(
+            '--quiz',
+            type=int,
+            help='Process only takes of a quiz with this id',
+        )
+
+    def regrade(self, quiz_ids, verify):
+        """Grade answers of the quizzes again, returns amount of their takes
+
+        Only counts takes with stale grades if verifying"""
+        regraded = 0
+        for quiz_id in quiz_ids:
+            if verify:
+                take_ids = {
+                    take_id
+                    for _, take_id, _ in content.get_stale_grades(quiz_id)
+                }
+                for take_id in sorted(take_ids):
+                    self.stdout.write(
+                        'Take {} has stale grades'.format(take_id))
+            else:
+                take_ids = content.regrade(quiz_id)
+            regraded += len(take_ids)
+        return regraded
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('pk')
+        takes = Take.objects.order_by('pk')
+        if options['quiz']:
+            quizzes = quizzes.filter(pk=options['quiz'])
+            takes = takes.filter(quiz_id=options['quiz'])
+        regraded = self.regrade(
+            list(quizzes.values_list('pk', flat=True)), options['verify'])
+
+        checked = stale = 0
+        stale_quiz_ids = set()
+        for take in takes.iterator():
+            checked += 1
+            stored = (
+                take.questions_count,
+                take.answered_count,
+                take.correct_count,
+                take.current_question_id,
+            )
+            if take.get_progress() == stored:
+                continue
+            stale += 1
+            if options['verify']:
+                self.stdout.write('Take {} has stale progress'.format(take.pk))
+            else:
+                take.refresh_progress()
+                stale_quiz_ids.add(take.quiz_id)
+        for quiz_id in sorted(stale_quiz_ids):
+            stats.rebuild(quiz_id)
+
+        if options['verify'] and (stale or regraded):
+            raise CommandError(
+                '{} of {} takes have stale progress, {} have stale '
+                'grades'.format(stale, checked, regraded))
+        self.stdout.write('{} takes checked, {} {}, {} {}'.format(
+            checked,
+            stale,
+            'stale' if options['verify'] else 'rebuilt',
+            regraded,
+            'with stale grades' if options['verify'] else 'regraded',
+        ))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_take_progress(apps, schema_editor):
+    """Calculate stored progress of already existing takes"""
+    # pylint: disable = unused-argument, invalid-name
+    Take = apps.get_model('exam', 'Take')
+    Question = apps.get_model('exam', 'Question')
+    Answer = apps.get_model('exam', 'Answer')
+    for take in Take.objects.iterator():
+        answers = Answer.objects.filter(take=take)
+        answered_ids = answers.values('question_id')
+        current_question = (
+            Question.objects
+            .filter(quiz_id=take.quiz_id)
+            .exclude(pk__in=answered_ids)
+            .order_by('pk')
+            .first()
+        )
+        take.questions_count = Question.objects.filter(
+            quiz_id=take.quiz_id).count()
+        take.answered_count = answers.count()
+        take.correct_count = answers.filter(
+            chosen_option__is_correct=True).count()
+        take.current_question = current_question
+        take.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='take',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='take',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='take',
+            name='current_question',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='exam.Question'),
+        ),
+        migrations.AddField(
+            model_name='take',
+            name='questions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_take_progress, migrations.RunPython.noop),
+    ]
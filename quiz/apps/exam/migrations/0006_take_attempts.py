@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:59
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('exam', '0005_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='take',
+            name='attempt',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterUniqueTogether(
+            name='take',
+            unique_together=set([('user', 'quiz', 'attempt')]),
+        ),
+    ]
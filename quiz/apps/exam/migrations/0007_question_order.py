@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:03
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0006_take_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='questions_per_take',
+            field=models.PositiveIntegerField(blank=True, help_text='Draw this amount of questions for each take out of the quiz, all of them if empty', null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_questions',
+            field=models.BooleanField(default=False, help_text='Deliver questions of each take in its own random order'),
+        ),
+        migrations.AddField(
+            model_name='take',
+            name='question_order',
+            field=models.BinaryField(null=True),
+        ),
+    ]
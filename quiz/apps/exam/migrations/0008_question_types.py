@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:08
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_answer_correct(apps, schema_editor):
+    """Grade already existing answers by their chosen options"""
+    # pylint: disable = unused-argument, invalid-name
+    Answer = apps.get_model('exam', 'Answer')
+    Answer.objects.filter(chosen_option__is_correct=True).update(correct=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0007_question_order'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='answer',
+            name='exam_answer_take_option_idx',
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='chosen_option_ids',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='correct',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='value',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='correct_value',
+            field=models.FloatField(blank=True, help_text='Correct answer of numeric question, 1 (true) or 0 (false) of true or false one', null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='question_type',
+            field=models.CharField(choices=[('radio', 'Single choice'), ('multiple', 'Multiple choice'), ('true_false', 'True or false'), ('numeric', 'Number')], default='radio', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='tolerance',
+            field=models.FloatField(default=0, help_text='Allowed difference from correct answer of numeric question'),
+        ),
+        migrations.AlterField(
+            model_name='answer',
+            name='chosen_option',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='exam.Option'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['take', 'correct'], name='exam_answer_take_correct_idx'),
+        ),
+        migrations.RunPython(fill_answer_correct, migrations.RunPython.noop),
+    ]
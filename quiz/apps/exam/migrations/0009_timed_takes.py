@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:16
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+# Partial index of deadlines of timed takes in progress, for the sweep of
+# expired ones, django can't describe partial indexes yet
+TAKE_DEADLINE_VENDORS = ('sqlite', 'postgresql')
+
+
+def create_take_deadline_index(apps, schema_editor):
+    # pylint: disable = unused-argument, missing-docstring
+    if schema_editor.connection.vendor in TAKE_DEADLINE_VENDORS:
+        schema_editor.execute(
+            'CREATE INDEX exam_take_deadline_idx ON exam_take (deadline) '
+            'WHERE deadline IS NOT NULL AND current_question_id IS NOT NULL'
+        )
+
+
+def drop_take_deadline_index(apps, schema_editor):
+    # pylint: disable = unused-argument, missing-docstring
+    if schema_editor.connection.vendor in TAKE_DEADLINE_VENDORS:
+        schema_editor.execute('DROP INDEX exam_take_deadline_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0008_question_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='time_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Minutes each take has to be completed in, no time limit if empty', null=True),
+        ),
+        migrations.AddField(
+            model_name='take',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='take',
+            name='started_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(create_take_deadline_index, drop_take_deadline_index),
+    ]
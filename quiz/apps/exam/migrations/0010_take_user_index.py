@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam', '0009_timed_takes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='take',
+            index=models.Index(fields=['user', 'id'], name='exam_take_user_id_idx'),
+        ),
+    ]
@@ -1,25 +1,125 @@
 """Exam app models"""
+import random
+import struct
+from collections import namedtuple
+from datetime import timedelta
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.db.models import (
+    Case, Count, Exists, ExpressionWrapper, F, IntegerField, OuterRef,
+    Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+
+
+ID_ITEM = struct.Struct('<I')  # id in packed arrays of ids
+
+
+def pack_ids(ids):
+    """Pack ids into bytes"""
+    return b''.join(ID_ITEM.pack(item) for item in ids)
+
+
+def unpack_ids(data):
+    """Tuple of ids packed into bytes (or memoryview)"""
+    return tuple(item for item, in ID_ITEM.iter_unpack(bytes(data)))
+
+
+class Response(namedtuple('Response', 'option_id option_ids value')):
+    """What was answered, depends on question type
+
+    option_id - chosen option of radio question
+    option_ids - chosen options of multiple choice question
+    value - number of numeric question, 1 or 0 of true or false one"""
+    __slots__ = ()
+
+    def __new__(cls, option_id=None, option_ids=None, value=None):
+        return super().__new__(cls, option_id, option_ids, value)
+
+    def get_picked_option_ids(self):
+        """Ids of all options picked by the response"""
+        if self.option_id is not None:
+            return [self.option_id]
+        return list(self.option_ids or ())
 
 
 class Quiz(models.Model):
-    """Quiz model contains questions"""
+    """Quiz model contains questions
+
+    Questions are delivered by id, unless they are shuffled or sampled,
+    then each take gets its own question order, drawn once on creation.
+    Takes of quizzes with time limit get their deadline on creation too"""
     name = models.CharField(max_length=200, unique=True)
+    shuffle_questions = models.BooleanField(
+        default=False,
+        help_text='Deliver questions of each take in its own random order',
+    )
+    questions_per_take = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Draw this amount of questions for each take out of '
+                  'the quiz, all of them if empty',
+    )
+    time_limit = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Minutes each take has to be completed in, '
+                  'no time limit if empty',
+    )
 
     def __str__(self):
         return self.name
 
 
 class Question(models.Model):
-    """Radio question model contains options"""
-    # might make sense to make this model resemble generic question,
-    # and have one to one relation to question details, which would
-    # differ by types, i.e. radio choice, multiple choice, etc.
-    # in case if different question types would be needed
+    """Question model, of one of types:
+
+    radio - single option is chosen, correct if it is a correct one
+    multiple - any options are chosen, correct if exactly the correct ones
+    true_false - true or false, correct if equals correct value (1 or 0)
+    numeric - a number, correct if within tolerance of correct value
+
+    Everything needed for grading is compiled along with quiz content, so
+    answers are graded without queries, see CompiledQuestion.grade"""
+    RADIO = 'radio'
+    MULTIPLE = 'multiple'
+    TRUE_FALSE = 'true_false'
+    NUMERIC = 'numeric'
+    TYPES = (
+        (RADIO, 'Single choice'),
+        (MULTIPLE, 'Multiple choice'),
+        (TRUE_FALSE, 'True or false'),
+        (NUMERIC, 'Number'),
+    )
+    OPTION_TYPES = (RADIO, MULTIPLE)
+
     question_text = models.CharField(max_length=500)
-    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    # indexed by the composite index on quiz and id, see Meta
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, db_index=False)
+    question_type = models.CharField(
+        max_length=16, choices=TYPES, default=RADIO)
+    correct_value = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='Correct answer of numeric question, '
+                  '1 (true) or 0 (false) of true or false one',
+    )
+    tolerance = models.FloatField(
+        default=0,
+        help_text='Allowed difference from correct answer of numeric '
+                  'question',
+    )
+
+    class Meta:
+        indexes = [
+            # questions of quiz ordered by id
+            models.Index(
+                fields=['quiz', 'id'],
+                name='exam_question_quiz_id_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.question_text
@@ -39,69 +139,845 @@ class Option(models.Model):
         return self.option_text
 
 
-class Take(models.Model):
+class TakeQuerySet(models.QuerySet):
+    """Take queryset, calculates progress of takes in the database"""
+
+    def with_progress(self):
+        """Annotate takes with progress, a single query for any amount
+
+        progress_total - amount of questions in take's quiz
+        progress_answered - amount of answered questions
+        progress_correct - amount of correctly answered questions, answers
+        are graded when saved, so that's regardless of question types"""
+        questions_amount = (
+            Question.objects
+            .filter(quiz_id=OuterRef('quiz_id'))
+            .order_by()
+            .values('quiz_id')
+            .annotate(amount=Count('pk'))
+            .values('amount')
+        )
+        return self.annotate(
+            progress_total=Subquery(
+                questions_amount, output_field=IntegerField()),
+            progress_answered=Count('answer'),
+            progress_correct=Sum(Case(
+                When(answer__correct=True, then=1),
+                default=0,
+                output_field=IntegerField(),
+            )),
+        )
+
+
+class Take(models.Model):  # pylint: disable = too-many-public-methods
     """Entity containing answers for a quiz
 
-    Used to track user progress in a quiz and for results calculation"""
+    Used to track user progress in a quiz and for results calculation.
+    Progress is also stored denormalized in counters and the current
+    question cursor, those are updated along with each saved answer, so
+    rendering a question or results needs only the take row itself.
+
+    Retaking a quiz starts a new attempt, a take with the next attempt
+    number, previous attempts are kept for history and statistics, until
+    pruned (see attempts module).
+
+    Takes of shuffled or sampled quizzes store their question order, as a
+    packed array of question ids. Questions of those are answered in that
+    order, so answered ones are always its prefix and the next question is
+    read right out of the array by position.
+
+    Takes of timed quizzes have a deadline, it is read along with the rest
+    of the take row, so enforcing it costs no queries. Once the deadline
+    passes, the take is finalized: its cursor is cleared, so unanswered
+    questions count as incorrect (see deadlines module)"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    attempt = models.PositiveIntegerField(default=1)
+    started_at = models.DateTimeField(default=timezone.now, editable=False)
+    # null if there is no time limit
+    deadline = models.DateTimeField(null=True, blank=True)
+    # null if questions are delivered by id
+    question_order = models.BinaryField(null=True, editable=False)
+    questions_count = models.PositiveIntegerField(default=0)
+    answered_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    current_question = models.ForeignKey(
+        Question,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+
+    PROGRESS_FIELDS = (
+        'questions_count',
+        'answered_count',
+        'correct_count',
+        'current_question_id',
+    )
+
+    objects = TakeQuerySet.as_manager()
+
+    PREVIOUS_ATTEMPTS = 10
+
+    ORDER_ITEM = ID_ITEM  # question id in packed order
 
     class Meta:
-        unique_together = ('user', 'quiz',)
+        # also serves lookups of the latest attempt of user and quiz
+        unique_together = ('user', 'quiz', 'attempt',)
+        indexes = [
+            # takes of a user latest first, for keyset paginated dashboard
+            models.Index(
+                fields=['user', 'id'],
+                name='exam_take_user_id_idx',
+            ),
+        ]
+        # there is also a partial index on deadline for timed takes in
+        # progress only, for the sweep of expired ones, see deadlines module
+
+    @classmethod
+    def get_latest(cls, user_id, quiz_id):
+        """Latest attempt take by user and quiz, None if there is none"""
+        return (
+            cls.objects
+            .filter(user_id=user_id, quiz_id=quiz_id)
+            .order_by('-attempt')
+            .first()
+        )
+
+    @staticmethod
+    def pack_question_order(question_ids):
+        """Pack question ids into question order"""
+        return pack_ids(question_ids)
+
+    @classmethod
+    def get_ordered_question_id(cls, question_order, position):
+        """Question id at a position of packed order, None past its end"""
+        offset = position * cls.ORDER_ITEM.size
+        if offset + cls.ORDER_ITEM.size > len(question_order):
+            return None
+        return cls.ORDER_ITEM.unpack_from(question_order, offset)[0]
+
+    @classmethod
+    def draw_question_order(cls, quiz, rng=random):
+        """Packed question order for a new take of a quiz (or compiled quiz)
+
+        None if questions of the quiz are delivered by id"""
+        sample_size = quiz.questions_per_take
+        if not quiz.shuffle_questions and sample_size is None:
+            return None
+        if isinstance(quiz, Quiz):
+            question_ids = list(
+                Question.objects
+                .filter(quiz_id=quiz.pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+        else:
+            question_ids = [question.id for question in quiz.questions]
+        if sample_size is not None and sample_size < len(question_ids):
+            question_ids = rng.sample(question_ids, sample_size)
+            if not quiz.shuffle_questions:
+                question_ids.sort()
+        elif quiz.shuffle_questions:
+            rng.shuffle(question_ids)
+        else:
+            return None  # all of questions, by id
+        return cls.pack_question_order(question_ids)
+
+    @classmethod
+    def create_attempt(  # pylint: disable = too-many-arguments
+            cls, user_id, quiz_id, attempt, question_order=None,
+            time_limit=None):
+        """Create take of an attempt, None if it exists already
+
+        Attempt could be created concurrently, i.e. by a double click.
+        Progress of ordered take is known right away, out of the order.
+        Time limit is in minutes, deadline is set out of it"""
+        started_at = timezone.now()
+        progress = {}
+        if question_order is not None:
+            progress = {
+                'questions_count': len(question_order) // cls.ORDER_ITEM.size,
+                'current_question_id': cls.get_ordered_question_id(
+                    question_order, 0),
+            }
+        try:
+            with transaction.atomic():
+                take = cls.objects.create(
+                    user_id=user_id,
+                    quiz_id=quiz_id,
+                    attempt=attempt,
+                    question_order=question_order,
+                    started_at=started_at,
+                    deadline=(
+                        None
+                        if time_limit is None
+                        else started_at + timedelta(minutes=time_limit)
+                    ),
+                    **progress
+                )
+        except IntegrityError:
+            return None
+        if question_order is None:
+            take.refresh_progress()
+        QuizStats.record_takes(quiz_id, 1)
+        return take
 
     @classmethod
     def get_or_create(cls, user, quiz):
-        """Get or create take by user and quiz"""
-        take = cls.objects.get_or_create(user=user, quiz=quiz)
-        return take[0]  # was object created or not is not relevant
+        """Get latest attempt take by user and quiz (or compiled quiz)
 
-    def get_current_question(self):
-        """Returns first unanswered question sorted by id, if any, else None"""
-        all_questions = set(self.quiz.question_set.all())
-        answers = self.answer_set.all()
-        answered_questions = {answer.question for answer in answers}
-        unanswered_questions = all_questions - answered_questions
-        current_question = (
-            sorted(unanswered_questions, key=lambda q: q.id)[0]
-            if unanswered_questions
-            else None
-        )
-        return current_question
+        First attempt is created if there is none"""
+        take = cls.get_latest(user.pk, quiz.pk)
+        if take is None:
+            take = (
+                cls.create_attempt(
+                    user.pk, quiz.pk, 1, cls.draw_question_order(quiz),
+                    quiz.time_limit)
+                or cls.get_latest(user.pk, quiz.pk)
+            )
+        return take
 
-    def get_quiz_results(self):
-        """Returns results for quiz"""
-        total_questions_amount = self.quiz.question_set.count()
-        answers = self.answer_set.all()
-        correct_questions_amount = sum(
-            answer.is_correct()
-            for answer in answers
+    def retake(self, quiz):
+        """Start next attempt of the quiz (or compiled quiz), returns its take
+
+        Previous attempt is kept as is, so this is a single INSERT whatever
+        amount of answers. New attempt gets a new question order and a new
+        deadline. Attempt without answers is not retaken, unless it has
+        expired"""
+        if not self.answered_count and not self.is_expired():
+            return self
+        return (
+            self.create_attempt(
+                self.user_id,
+                self.quiz_id,
+                self.attempt + 1,
+                self.draw_question_order(quiz),
+                quiz.time_limit,
+            )
+            or self.get_latest(self.user_id, self.quiz_id)
         )
-        incorrect_questions_amount = sum(
-            not answer.is_correct()
-            for answer in answers
+
+    def is_expired(self, now=None):
+        """Has deadline of the take passed"""
+        return self.deadline is not None and self.deadline <= (
+            now or timezone.now())
+
+    def _is_finalized(self, now=None):
+        """Has the take been completed by its deadline, see deadlines"""
+        return self.current_question_id is None and self.is_expired(now)
+
+    def get_question_order(self):
+        """Question ids in delivery order, None if delivered by id"""
+        if self.question_order is None:
+            return None
+        return unpack_ids(self.question_order)
+
+    def get_order_progress(self):
+        """Question ids and current question id of ordered take
+
+        Questions deleted from the quiz are skipped. Scans the whole order
+        against questions and answers, so it is for rebuilding progress
+        only, current question is read by position otherwise"""
+        existing = set(
+            Question.objects
+            .filter(quiz_id=self.quiz_id)
+            .values_list('pk', flat=True)
         )
+        answered = set(
+            Answer.objects
+            .filter(take_id=self.pk)
+            .values_list('question_id', flat=True)
+        )
+        question_ids = [
+            question_id
+            for question_id in self.get_question_order()
+            if question_id in existing
+        ]
+        current_question_id = next(
+            (
+                question_id
+                for question_id in question_ids
+                if question_id not in answered
+            ),
+            None,
+        )
+        return question_ids, current_question_id
+
+    def get_previous_results(self):
+        """Results of previous attempts, latest first
+
+        Returns (attempt, results) tuples, results are the same as stored
+        results, out of a single query"""
+        return [
+            (take.attempt, take.get_stored_results())
+            for take in (
+                Take.objects
+                .filter(
+                    user_id=self.user_id,
+                    quiz_id=self.quiz_id,
+                    attempt__lt=self.attempt,
+                )
+                .order_by('-attempt')
+                .only('attempt', 'deadline', *self.PROGRESS_FIELDS)
+                [:self.PREVIOUS_ATTEMPTS]
+            )
+        ]
+
+    @staticmethod
+    def unanswered_questions(take, quiz):
+        """Questions of the quiz without an answer in the take, by id
+
+        Answered questions are filtered out with NOT EXISTS, so the lookup
+        is done by the database, the primary one, where answers are"""
+        answered = Answer.objects.filter(take=take, question=OuterRef('pk'))
+        return (
+            Question.objects.db_manager(hints={'primary': True})
+            .filter(quiz=quiz)
+            .annotate(is_answered=Exists(answered))
+            .filter(is_answered=False)
+            .order_by('pk')
+        )
+
+    def get_current_question(self):
+        """Returns first unanswered question sorted by id, if any, else None
+
+        Lookup is done by the database in a single query. Questions of
+        ordered takes are answered in their order, so current one is read
+        at position of answered count there instead"""
+        if self.question_order is None:
+            return self.unanswered_questions(self.pk, self.quiz_id).first()
+        current_question_id = self.get_ordered_question_id(
+            self.question_order, self.answered_count)
+        if current_question_id is None:
+            return None
+        return Question.objects.filter(pk=current_question_id).first()
+
+    @staticmethod
+    def _get_results(total, answered, correct, finalized=False):
+        """Results tuple out of questions/answers amounts
+
+        Unanswered questions of takes finalized after their deadline count
+        as incorrect ones, along with wrong answers"""
         percentage_correct = int(
-            correct_questions_amount * 100 / total_questions_amount
-            if total_questions_amount  # No zero division on my watch
+            correct * 100 / total
+            if total  # No zero division on my watch
             else 0
         )
         return (
-            total_questions_amount,
-            correct_questions_amount,
-            incorrect_questions_amount,
+            total,
+            correct,
+            (total if finalized else answered) - correct,
             percentage_correct,
         )
 
+    def get_quiz_results(self):
+        """Returns results for quiz
+
+        Questions and answers are counted by a single aggregate query,
+        correctness is taken from chosen options right in the database"""
+        total, answered, correct = (
+            Take.objects
+            .filter(pk=self.pk)
+            .with_progress()
+            .values_list(
+                'progress_total', 'progress_answered', 'progress_correct')
+            .get()
+        )
+        if self.question_order is not None:
+            total = len(self.question_order) // self.ORDER_ITEM.size
+        return self._get_results(
+            total or 0, answered, correct, self._is_finalized())
+
+    def get_stored_results(self):
+        """Returns results for quiz out of stored progress counters
+
+        Same as get quiz results, but without touching the database"""
+        return self._get_results(
+            self.questions_count,
+            self.answered_count,
+            self.correct_count,
+            self._is_finalized(),
+        )
+
+    def get_progress(self):
+        """Calculate progress from questions and answers
+
+        Returns questions, answered and correct amounts and current question
+        id, same values as are stored in progress fields. Expired takes
+        have no current question"""
+        progress, _ = self._calculate_progress()
+        return progress
+
+    def _calculate_progress(self):
+        """Progress, see get progress, and question ids of ordered take"""
+        question_ids = None
+        total, answered, correct = (
+            Take.objects
+            .filter(pk=self.pk)
+            .with_progress()
+            .values_list(
+                'progress_total', 'progress_answered', 'progress_correct')
+            .get()
+        )
+        if self.question_order is None:
+            current_question_id = (
+                self.unanswered_questions(self.pk, self.quiz_id)
+                .values_list('pk', flat=True)
+                .first()
+            )
+        else:
+            question_ids, current_question_id = self.get_order_progress()
+            total = len(question_ids)
+        if self.is_expired():
+            current_question_id = None
+        return (
+            (total or 0, answered, correct, current_question_id),
+            question_ids,
+        )
+
+    def refresh_progress(self):
+        """Recalculate stored progress from questions and answers
+
+        Questions deleted from the quiz are dropped from question order,
+        so answered questions stay its prefix"""
+        progress, question_ids = self._calculate_progress()
+        for field, value in zip(self.PROGRESS_FIELDS, progress):
+            setattr(self, field, value)
+        fields = list(self.PROGRESS_FIELDS)
+        if question_ids is not None:
+            question_order = self.pack_question_order(question_ids)
+            if question_order != bytes(self.question_order):
+                self.question_order = question_order
+                fields.append('question_order')
+        self.save(update_fields=fields)
+
+    @classmethod
+    def drop_deleted_questions(cls, quiz_id, current_take_ids):
+        """Bring stored progress of quiz takes up to date after deletion
+
+        Current take ids are takes whose cursor was on deleted questions,
+        those cursors have been cleared by the database. Progress of all
+        takes of the quiz is updated by a fixed amount of queries rather
+        than per take: counters are recounted by a single UPDATE, deleted
+        questions are dropped from question orders and cleared cursors are
+        moved to the next unanswered question, both by UPDATEs of batches.
+        Completed takes are updated as well, their statistics are not, see
+        stats rebuild"""
+        existing = set(
+            Question.objects
+            .filter(quiz_id=quiz_id)
+            .values_list('pk', flat=True)
+        )
+        takes = cls.objects.filter(quiz_id=quiz_id)
+        orders = {}  # take id -> question ids left of its order
+        for take_id, question_order in (
+                takes
+                .filter(question_order__isnull=False)
+                .values_list('pk', 'question_order')
+                .iterator()):
+            question_ids = unpack_ids(question_order)
+            if not existing.issuperset(question_ids):
+                orders[take_id] = [
+                    question_id
+                    for question_id in question_ids
+                    if question_id in existing
+                ]
+        answers = (
+            Answer.objects
+            .filter(take_id=OuterRef('pk'))
+            .order_by()
+            .values('take_id')
+        )
+        takes.update(
+            answered_count=Coalesce(Subquery(
+                answers.annotate(amount=Count('pk')).values('amount'),
+                output_field=IntegerField(),
+            ), 0),
+            correct_count=Coalesce(Subquery(
+                answers
+                .filter(correct=True)
+                .annotate(amount=Count('pk'))
+                .values('amount'),
+                output_field=IntegerField(),
+            ), 0),
+        )
+        takes.filter(question_order__isnull=True).update(
+            questions_count=len(existing))
+        cls._update_each('question_order', {
+            take_id: cls.pack_question_order(question_ids)
+            for take_id, question_ids in orders.items()
+        }, models.BinaryField())
+        cls._update_each('questions_count', {
+            take_id: len(question_ids)
+            for take_id, question_ids in orders.items()
+        }, IntegerField())
+        cls._update_each(
+            'current_question',
+            cls._get_next_questions(current_take_ids, existing, orders),
+            IntegerField(),
+        )
+
+    @classmethod
+    def _get_next_questions(cls, take_ids, existing, orders):
+        """Next unanswered question ids of takes by their ids
+
+        Question ids of the quiz are existing ones, orders are question
+        ids of ordered takes dropped from their stored orders. Expired
+        takes have no next question"""
+        answered = {}
+        for take_id, question_id in (
+                Answer.objects
+                .filter(take_id__in=take_ids)
+                .values_list('take_id', 'question_id')
+                .iterator()):
+            answered.setdefault(take_id, set()).add(question_id)
+        now = timezone.now()
+        by_id = sorted(existing)
+        next_questions = {}
+        for take in cls.objects.filter(pk__in=take_ids).only(
+                'pk', 'deadline', 'question_order'):
+            if take.question_order is None:
+                question_ids = by_id
+            else:
+                question_ids = orders.get(
+                    take.pk, take.get_question_order())
+            next_questions[take.pk] = None if take.is_expired(now) else next(
+                (
+                    question_id
+                    for question_id in question_ids
+                    if question_id not in answered.get(take.pk, ())
+                ),
+                None,
+            )
+        return next_questions
+
+    @classmethod
+    def _update_each(cls, field, values, output_field, batch_size=500):
+        """Set a field of takes to values by take ids
+
+        A single UPDATE per batch of takes, values are picked by CASE. Null
+        ones are set apart, CASE of nulls only would be typed as text"""
+        items = sorted(values.items())
+        cleared = [pk for pk, value in items if value is None]
+        for start in range(0, len(cleared), batch_size):
+            cls.objects.filter(
+                pk__in=cleared[start:start + batch_size],
+            ).update(**{field: None})
+        items = [(pk, value) for pk, value in items if value is not None]
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            cls.objects.filter(pk__in=[pk for pk, _ in batch]).update(**{
+                field: Case(
+                    *(
+                        When(pk=pk, then=Value(value))
+                        for pk, value in batch
+                    ),
+                    output_field=output_field,
+                ),
+            })
+
+    def record_answer(self, question, chosen_option, is_correct=None):
+        """Save answer and update stored progress in the same transaction
+
+        Answer is graded by is correct argument, e.g. taken from compiled
+        quiz, or by chosen option itself if not provided. Counters are
+        incremented and the cursor is moved to the next unanswered question
+        by a single UPDATE, so there are no SELECTs at all"""
+        if is_correct is None:
+            is_correct = chosen_option.is_correct
+        with transaction.atomic():
+            answer = Answer.from_response(
+                self.pk, question.id, Response(chosen_option.id), is_correct)
+            answer.save(force_insert=True)
+            self._advance_progress(1, int(is_correct), [chosen_option.id])
+        return answer
+
+    def record_answers(self, answers):
+        """Save many graded answers at once, update stored progress
+
+        Answers are (question id, response, is correct) tuples, of any
+        question types, they are written by a single bulk create, followed
+        by a single progress UPDATE, in the same transaction. Nothing is
+        written, neither progress nor statistics are touched, if there are
+        no answers or the take is completed already"""
+        answers = list(answers)
+        if not answers or self.current_question_id is None:
+            return
+        with transaction.atomic():
+            Answer.objects.bulk_create(
+                Answer.from_response(
+                    self.pk, question_id, response, is_correct)
+                for question_id, response, is_correct in answers
+            )
+            self._advance_progress(
+                len(answers),
+                sum(bool(is_correct) for _, _, is_correct in answers),
+                [
+                    option_id
+                    for _, response, _ in answers
+                    for option_id in response.get_picked_option_ids()
+                ],
+            )
+
+    @classmethod
+    def advance_stored_progress(  # pylint: disable = too-many-arguments
+            cls, take_id, quiz_id, answered, correct, option_ids,
+            question_order=None, answered_count=0, questions_count=None):
+        """Account answered amount of answers already saved
+
+        Increments stored counters and moves cursor to unanswered question
+        by a single UPDATE of the take row, then updates quiz statistics,
+        option ids are all options picked by the answers. For ordered takes
+        the cursor is moved by position in the order, answered count is
+        needed for that, before these answers. Takes completed already are
+        not updated, the take is accounted as completed (in its score bucket
+        and on the leaderboard) only by the UPDATE which completes it.
+        Unordered take could complete only once answered count reaches its
+        stored questions count, if given, so completion is not looked up by
+        answers before that"""
+        answered_count += answered
+        if question_order is None:
+            current_question = Subquery(
+                cls.unanswered_questions(take_id, quiz_id).values('pk')[:1],
+                output_field=IntegerField(),
+            )
+            completing = (
+                questions_count is None or answered_count >= questions_count)
+        else:
+            current_question = cls.get_ordered_question_id(
+                question_order, answered_count)
+            completing = current_question is None
+        updated = cls.objects.filter(
+            pk=take_id, current_question__isnull=False,
+        ).update(
+            answered_count=F('answered_count') + answered,
+            correct_count=F('correct_count') + correct,
+            current_question=current_question,
+        )
+        OptionStats.record_picks(option_ids, 1)
+        if updated and completing:
+            # completed right now, if the cursor is past the last question
+            ScoreBucket.record_completion(take_id, quiz_id, 1)
+            LeaderboardEntry.record_completion(take_id)
+
+    def _advance_progress(self, answered, correct, option_ids):
+        """Advance stored progress of this take
+
+        Updated values are reloaded from the database on next access"""
+        self.advance_stored_progress(
+            self.pk,
+            self.quiz_id,
+            answered,
+            correct,
+            option_ids,
+            self.question_order,
+            self.answered_count,
+            self.questions_count,
+        )
+        for field in self.PROGRESS_FIELDS:
+            # deferred fields are lazily loaded by django on access
+            self.__dict__.pop(field, None)
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Reload take from the database
+
+        Progress fields are reloaded all together, so accessing them after
+        progress update costs a single query"""
+        if fields is not None and set(fields) & set(self.PROGRESS_FIELDS):
+            fields = set(fields) | set(self.PROGRESS_FIELDS)
+        super().refresh_from_db(using=using, fields=fields)
+
 
 class Answer(models.Model):
-    """Answer for a radio question"""
+    """Answer for a question, graded when saved
+
+    Holds a response of the question type, see Response"""
     take = models.ForeignKey(Take, on_delete=models.CASCADE)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
-    chosen_option = models.ForeignKey(Option, on_delete=models.CASCADE)
+    chosen_option = models.ForeignKey(
+        Option, on_delete=models.CASCADE, null=True, blank=True)
+    # packed ids, see pack_ids, of multiple choice question options
+    chosen_option_ids = models.BinaryField(null=True, editable=False)
+    value = models.FloatField(null=True, blank=True)
+    correct = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ('take', 'question',)
+        indexes = [
+            # answers of take along with their grades, for scoring
+            models.Index(
+                fields=['take', 'correct'],
+                name='exam_answer_take_correct_idx',
+            ),
+        ]
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """Save answer, graded by chosen option if it is loaded already
+
+        Grades are stored, so they become stale once an answer key is
+        changed, see content.regrade"""
+        if Answer.chosen_option.is_cached(self) and self.chosen_option:
+            self.correct = self.chosen_option.is_correct
+        super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
+
+    @classmethod
+    def from_response(cls, take_id, question_id, response, is_correct):
+        """Unsaved graded answer out of a response"""
+        return cls(
+            take_id=take_id,
+            question_id=question_id,
+            chosen_option_id=response.option_id,
+            chosen_option_ids=(
+                None
+                if response.option_ids is None
+                else pack_ids(response.option_ids)
+            ),
+            value=response.value,
+            correct=bool(is_correct),
+        )
+
+    @staticmethod
+    def picked_option_ids(chosen_option_id, chosen_option_ids):
+        """Ids of all options picked by answer with these field values"""
+        if chosen_option_id is not None:
+            return [chosen_option_id]
+        if chosen_option_ids is None:
+            return []
+        return list(unpack_ids(chosen_option_ids))
+
+    def get_picked_option_ids(self):
+        """Ids of all options picked by the answer"""
+        return self.picked_option_ids(
+            self.chosen_option_id, self.chosen_option_ids)
 
     def is_correct(self):
-        """Is this answer correct"""
-        return self.chosen_option.is_correct
+        """Is this answer correct, by chosen option if there is one"""
+        if self.chosen_option_id is not None:
+            return self.chosen_option.is_correct
+        return self.correct
+
+
+class QuizStats(models.Model):
+    """Materialized statistics of a quiz, see stats module
+
+    Completed takes are counted by score buckets, answers by options"""
+    quiz = models.OneToOneField(
+        Quiz,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    takes_count = models.IntegerField(default=0)
+
+    @classmethod
+    def record_takes(cls, quiz_id, delta):
+        """Account created (positive delta) or deleted takes of a quiz"""
+        cls.objects.filter(pk=quiz_id).update(
+            takes_count=F('takes_count') + delta)
+
+
+class ScoreBucket(models.Model):
+    """Amount of completed takes of a quiz with a score percentage"""
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    score = models.PositiveSmallIntegerField()  # 0 to 100
+    takes_count = models.IntegerField(default=0)
+
+    SCORES = range(101)
+
+    class Meta:
+        unique_together = ('quiz', 'score',)
+
+    @staticmethod
+    def take_scores():
+        """Takes annotated with score, completed takes only"""
+        return (
+            Take.objects
+            .filter(current_question__isnull=True, questions_count__gt=0)
+            .annotate(score=ExpressionWrapper(
+                # integer division in the database, same as int() of results
+                F('correct_count') * 100 / F('questions_count'),
+                output_field=IntegerField(),
+            ))
+        )
+
+    @classmethod
+    def get_scores(cls, quiz_id):
+        """Amounts of completed takes of the quiz by score, if any"""
+        return dict(
+            cls.objects
+            .filter(quiz_id=quiz_id, takes_count__gt=0)
+            .values_list('score', 'takes_count')
+        )
+
+    @classmethod
+    def record_completion(cls, take_id, quiz_id, delta):
+        """Account take in its score bucket, if the take is completed
+
+        A single UPDATE, which does nothing for takes in progress"""
+        score = cls.take_scores().filter(pk=take_id).values('score')
+        cls.objects.filter(
+            quiz_id=quiz_id,
+            score=Subquery(score, output_field=IntegerField()),
+        ).update(takes_count=F('takes_count') + delta)
+
+
+class OptionStats(models.Model):
+    """Amount of answers which picked an option"""
+    option = models.OneToOneField(
+        Option,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    picks_count = models.IntegerField(default=0)
+
+    @classmethod
+    def record_picks(cls, option_ids, delta):
+        """Account picks of options, each of them picked once"""
+        if option_ids:
+            cls.objects.filter(pk__in=option_ids).update(
+                picks_count=F('picks_count') + delta)
+
+
+class LeaderboardEntry(models.Model):
+    """Completed take on the leaderboard of its quiz, see leaderboard module"""
+    take = models.OneToOneField(
+        Take,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='leaderboard_entry',
+    )
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    score = models.PositiveSmallIntegerField()  # 0 to 100
+
+    class Meta:
+        indexes = [
+            # top scores of quiz, earlier completed first among equal ones
+            models.Index(
+                fields=['quiz', '-score', 'take'],
+                name='exam_leaderboard_top_idx',
+            ),
+        ]
+
+    @classmethod
+    def record_completion(cls, take_id):
+        """Put take on the leaderboard of its quiz, if it is completed
+
+        Does nothing for takes in progress or on the leaderboard already"""
+        cls.objects.bulk_create(
+            cls(take_id=take_id, quiz_id=quiz_id, user_id=user_id, score=score)
+            for quiz_id, user_id, score in (
+                ScoreBucket.take_scores()
+                .filter(pk=take_id, leaderboard_entry__isnull=True)
+                .values_list('quiz_id', 'user_id', 'score')
+            )
+        )
@@ -0,0 +1,123 @@
+"""Exam app quiz results export
+
+Instructors export results of every take of a quiz. Getting quiz results
+take by take costs a query per take and holds all of them in memory, so
+each export is read by a single query instead, iterated with a
+server-side cursor where supported (see transfer module):
+    takes - one row per take with quiz, take, user, attempt, started_at,
+        deadline, questions, answered, correct, score and completed
+        columns, scores are calculated out of stored progress counters
+    answers - one row per answer with quiz, take, user, attempt,
+        question, question_type, options (picked option ids separated by
+        spaces), value and correct columns
+
+Rows are streamed as csv lines by a generator, to a file by
+export_results management command or to the browser by a quiz admin
+action, so memory use doesn't depend on amount of takes and answers.
+"""
+import csv
+
+from .models import Answer, Take
+
+
+KIND_TAKES = 'takes'
+KIND_ANSWERS = 'answers'
+KINDS = (KIND_TAKES, KIND_ANSWERS)
+
+TAKE_COLUMNS = (
+    'quiz', 'take', 'user', 'attempt', 'started_at', 'deadline',
+    'questions', 'answered', 'correct', 'score', 'completed',
+)
+ANSWER_COLUMNS = (
+    'quiz', 'take', 'user', 'attempt', 'question', 'question_type',
+    'options', 'value', 'correct',
+)
+
+
+def _format_time(value):
+    """Csv value of a nullable datetime"""
+    return '' if value is None else value.isoformat()
+
+
+def take_rows(quiz_ids):
+    """Yield take rows of the quizzes, ordered by quiz and take"""
+    takes = (
+        Take.objects
+        .filter(quiz_id__in=quiz_ids)
+        .select_related('quiz', 'user')
+        .only(
+            'quiz', 'quiz__name', 'user', 'user__username', 'attempt',
+            'started_at', 'deadline', *Take.PROGRESS_FIELDS
+        )
+        .order_by('quiz_id', 'pk')
+    )
+    for take in takes.iterator():
+        total, correct, _, percentage_correct = take.get_stored_results()
+        yield (
+            take.quiz.name,
+            take.pk,
+            take.user.username,
+            take.attempt,
+            _format_time(take.started_at),
+            _format_time(take.deadline),
+            total,
+            take.answered_count,
+            correct,
+            percentage_correct,
+            int(take.current_question_id is None),
+        )
+
+
+def answer_rows(quiz_ids):
+    """Yield answer rows of the quizzes, ordered by quiz, take, question"""
+    rows = (
+        Answer.objects
+        .filter(take__quiz_id__in=quiz_ids)
+        .order_by('take__quiz_id', 'take_id', 'question_id')
+        .values_list(
+            'take__quiz__name', 'take_id', 'take__user__username',
+            'take__attempt', 'question_id', 'question__question_type',
+            'chosen_option_id', 'chosen_option_ids', 'value', 'correct',
+        )
+        .iterator()
+    )
+    for (quiz_name, take_id, username, attempt, question_id, question_type,
+         option_id, option_ids, value, correct) in rows:
+        yield (
+            quiz_name,
+            take_id,
+            username,
+            attempt,
+            question_id,
+            question_type,
+            ' '.join(
+                str(picked)
+                for picked in Answer.picked_option_ids(option_id, option_ids)
+            ),
+            '' if value is None else value,
+            int(correct),
+        )
+
+
+EXPORTS = {
+    KIND_TAKES: (TAKE_COLUMNS, take_rows),
+    KIND_ANSWERS: (ANSWER_COLUMNS, answer_rows),
+}
+
+
+class _Echo:  # pylint: disable = too-few-public-methods
+    """File-like object returning written data instead of storing it"""
+
+    @staticmethod
+    def write(value):
+        """Return the value"""
+        return value
+
+
+def stream_csv(kind, quiz_ids):
+    """Yield csv lines of the export of quizzes results, header first"""
+    columns, rows = EXPORTS[kind]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows(quiz_ids):
+        yield writer.writerow(row)
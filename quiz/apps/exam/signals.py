@@ -0,0 +1,107 @@
+"""Exam app signals
+
+Keep cached quiz content up to date, any change to a quiz, its questions
+or options (including nested admin edits) bumps quiz content version.
+Keep quiz statistics rows in place and deleted takes out of statistics.
+Keep takes in progress in progress, when a question of their quiz is
+deleted: cursors pointing to it are cleared by the database, and a take
+without a cursor is a completed one, so stored progress of takes of the
+quiz is updated in bulk, then its statistics are rebuilt, as scores of
+completed takes change too. Not when the quiz itself is deleted, its
+questions are deleted along with it then"""
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import stats
+from .content import bump_catalogue_version, bump_quiz_version
+from .models import Quiz, Question, Option, OptionStats, Take
+
+
+# pylint: disable = unused-argument
+
+DELETING_QUIZ_IDS = set()  # quizzes being deleted, with their questions
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    """Quiz itself was changed, it might be listed differently as well"""
+    bump_quiz_version(instance.pk)
+    bump_catalogue_version()
+
+
+@receiver(pre_delete, sender=Quiz)
+def quiz_deleting(sender, instance, **kwargs):
+    """Quiz is about to be deleted, questions are deleted before it"""
+    DELETING_QUIZ_IDS.add(instance.pk)
+
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    """Quiz is gone along with its questions"""
+    DELETING_QUIZ_IDS.discard(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Question of a quiz was changed"""
+    bump_quiz_version(instance.quiz_id)
+
+
+@receiver(pre_delete, sender=Question)
+def question_deleting(sender, instance, **kwargs):
+    """Question is about to be deleted, remember takes it is current of"""
+    instance.current_take_ids = list(
+        Take.objects
+        .filter(current_question_id=instance.pk)
+        .values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    """Question is gone, update progress of takes and quiz statistics
+
+    Takes left without unanswered questions are completed, scores of all
+    takes change with amount of questions, so statistics and leaderboard
+    of the quiz are rebuilt"""
+    if instance.quiz_id in DELETING_QUIZ_IDS:
+        return
+    Take.drop_deleted_questions(
+        instance.quiz_id, getattr(instance, 'current_take_ids', ()))
+    stats.rebuild(instance.quiz_id)
+
+
+@receiver(post_save, sender=Option)
+@receiver(post_delete, sender=Option)
+def option_changed(sender, instance, **kwargs):
+    """Option of a question was changed"""
+    quiz_id = (
+        Question.objects
+        .filter(pk=instance.question_id)
+        .values_list('quiz_id', flat=True)
+        .first()
+    )
+    if quiz_id is not None:  # question is gone, its signal took care of it
+        bump_quiz_version(quiz_id)
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_created(sender, instance, created, **kwargs):
+    """New quiz gets its statistics rows"""
+    if created:
+        stats.ensure_rows(instance.pk)
+
+
+@receiver(post_save, sender=Option)
+def option_created(sender, instance, created, **kwargs):
+    """New option gets its statistics row"""
+    if created:
+        OptionStats.objects.get_or_create(option_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Take)
+def take_deleted(sender, instance, **kwargs):
+    """Take is about to be deleted, i.e. old attempt pruned"""
+    stats.take_deleted(instance)
@@ -0,0 +1,237 @@
+"""Exam app quiz statistics
+
+Instructors need pass rates, score distributions and per question/option
+pick rates, and aggregating answers for those live is too slow. So they
+are materialized and maintained incrementally in the same transactions
+as answers:
+* QuizStats - amount of takes of a quiz, updated on take creation/deletion
+* ScoreBucket - amount of completed takes of a quiz by score percentage,
+  updated when a take gets its last answer or a completed take is deleted
+* OptionStats - amount of answers which picked an option, updated on
+  answers saving and take deletion
+
+Answers are graded when saved (and graded again after answer key fixes,
+see content.regrade), so per question amounts of answers and correct ones
+are counted out of stored grades, of every question type, by a single
+grouped query over the question index of answers. Reading statistics of a
+quiz costs a few indexed queries. Stats rows are created along with quizzes and options,
+rows missing for older content (and stats drifted because of direct
+database edits) are fixed by rebuild_quiz_stats management command, takes
+with stale progress get their quizzes rebuilt by rebuild_take_progress.
+"""
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Sum, When
+
+from . import leaderboard
+from .models import (
+    Answer, Option, OptionStats, Question, QuizStats, ScoreBucket, Take)
+
+
+OptionSummary = namedtuple('OptionSummary', 'id option_text is_correct picks')
+
+QuestionSummary = namedtuple(
+    'QuestionSummary',
+    'id question_text question_type answers correct options',
+)
+
+QuizSummary = namedtuple(
+    'QuizSummary', 'takes completed passed mean_score distribution questions')
+
+
+def ensure_rows(quiz_id):
+    """Create stats rows missing for the quiz and its options"""
+    QuizStats.objects.get_or_create(quiz_id=quiz_id)
+    existing = set(
+        ScoreBucket.objects
+        .filter(quiz_id=quiz_id)
+        .values_list('score', flat=True)
+    )
+    ScoreBucket.objects.bulk_create(
+        ScoreBucket(quiz_id=quiz_id, score=score)
+        for score in ScoreBucket.SCORES
+        if score not in existing
+    )
+    OptionStats.objects.bulk_create(
+        OptionStats(option_id=option_id)
+        for option_id in (
+            Option.objects
+            .filter(question__quiz_id=quiz_id, stats__isnull=True)
+            .values_list('pk', flat=True)
+        )
+    )
+
+
+def take_deleted(take):
+    """Withdraw take and its answers from statistics, before deletion"""
+    ScoreBucket.record_completion(take.pk, take.quiz_id, -1)
+    OptionStats.record_picks(
+        [
+            picked
+            for option_id, option_ids in (
+                Answer.objects
+                .filter(take_id=take.pk)
+                .values_list('chosen_option_id', 'chosen_option_ids')
+            )
+            for picked in Answer.picked_option_ids(option_id, option_ids)
+        ],
+        -1,
+    )
+    QuizStats.record_takes(take.quiz_id, -1)
+
+
+def rebuild(quiz_id):
+    """Recalculate all statistics of the quiz from takes and answers
+
+    Leaderboard of the quiz is rebuilt as well, to match score buckets"""
+    with transaction.atomic():
+        QuizStats.objects.update_or_create(
+            quiz_id=quiz_id,
+            defaults={
+                'takes_count': Take.objects.filter(quiz_id=quiz_id).count(),
+            },
+        )
+        scores = dict(
+            ScoreBucket.take_scores()
+            .filter(quiz_id=quiz_id)
+            .order_by()
+            .values('score')
+            .annotate(amount=Count('pk'))
+            .values_list('score', 'amount')
+        )
+        ScoreBucket.objects.filter(quiz_id=quiz_id).delete()
+        ScoreBucket.objects.bulk_create(
+            ScoreBucket(
+                quiz_id=quiz_id,
+                score=score,
+                takes_count=scores.get(score, 0),
+            )
+            for score in ScoreBucket.SCORES
+        )
+        picks = Counter(dict(
+            Answer.objects
+            .filter(question__quiz_id=quiz_id, chosen_option__isnull=False)
+            .order_by()
+            .values('chosen_option_id')
+            .annotate(amount=Count('pk'))
+            .values_list('chosen_option_id', 'amount')
+        ))
+        picks.update(
+            option_id
+            for option_ids in (
+                Answer.objects
+                .filter(
+                    question__quiz_id=quiz_id,
+                    chosen_option_ids__isnull=False,
+                )
+                .values_list('chosen_option_ids', flat=True)
+                .iterator()
+            )
+            for option_id in Answer.picked_option_ids(None, option_ids)
+        )
+        options = Option.objects.filter(question__quiz_id=quiz_id)
+        OptionStats.objects.filter(option__in=options).delete()
+        OptionStats.objects.bulk_create(
+            OptionStats(
+                option_id=option_id,
+                picks_count=picks.get(option_id, 0),
+            )
+            for option_id in options.values_list('pk', flat=True)
+        )
+        leaderboard.rebuild(quiz_id)
+
+
+def get_distribution(scores, width=10):
+    """Completed takes amounts by score ranges of width percent"""
+    retval = []
+    for low in range(0, 100, width):
+        high = low + width - 1 if low + width < 100 else 100
+        retval.append((
+            low,
+            high,
+            sum(scores.get(score, 0) for score in range(low, high + 1)),
+        ))
+    return retval
+
+
+def get_question_summaries(quiz_id):
+    """Statistics of questions of a quiz, ordered by id
+
+    Answers are counted out of their stored grades, picks are read out of
+    options statistics"""
+    # question id -> answers and correct ones amounts
+    grades = {
+        question_id: (answers, correct)
+        for question_id, answers, correct in (
+            Answer.objects
+            .filter(question__quiz_id=quiz_id)
+            .order_by()
+            .values('question_id')
+            .annotate(
+                answers=Count('pk'),
+                correct=Sum(Case(
+                    When(correct=True, then=1),
+                    default=0,
+                    output_field=IntegerField(),
+                )),
+            )
+            .values_list('question_id', 'answers', 'correct')
+        )
+    }
+    options = {}  # question id -> options
+    for question_id, option_id, text, is_correct, picks in (
+            Option.objects
+            .filter(question__quiz_id=quiz_id)
+            .order_by('pk')
+            .values_list(
+                'question_id', 'pk', 'option_text', 'is_correct',
+                'stats__picks_count')):
+        options.setdefault(question_id, []).append(
+            OptionSummary(option_id, text, is_correct, picks or 0))
+    questions = []
+    for question_id, question_text, question_type in (
+            Question.objects
+            .filter(quiz_id=quiz_id)
+            .order_by('pk')
+            .values_list('pk', 'question_text', 'question_type')):
+        answers, correct = grades.get(question_id, (0, 0))
+        questions.append(QuestionSummary(
+            id=question_id,
+            question_text=question_text,
+            question_type=question_type,
+            answers=answers,
+            correct=correct,
+            options=options.get(question_id, []),
+        ))
+    return questions
+
+
+def get_quiz_summary(quiz_id):
+    """Statistics of a quiz, out of materialized aggregates and indexes"""
+    takes = (
+        QuizStats.objects
+        .filter(quiz_id=quiz_id)
+        .values_list('takes_count', flat=True)
+        .first()
+    ) or 0
+    scores = ScoreBucket.get_scores(quiz_id)
+    completed = sum(scores.values())
+    pass_score = getattr(settings, 'EXAM_PASS_PERCENTAGE', 50)
+    return QuizSummary(
+        takes=takes,
+        completed=completed,
+        passed=sum(
+            amount for score, amount in scores.items()
+            if score >= pass_score
+        ),
+        mean_score=(
+            sum(score * amount for score, amount in scores.items())
+            / completed
+            if completed
+            else 0
+        ),
+        distribution=get_distribution(scores),
+        questions=get_question_summaries(quiz_id),
+    )
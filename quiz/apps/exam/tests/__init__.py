@@ -0,0 +1 @@
+"""Exam app tests"""
@@ -0,0 +1,88 @@
+"""Exam app tests fixtures"""
+import json
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import api, forms, models, views
+
+
+def create_user(username='whatever'):
+    """Create user to take quizzes as"""
+    return User.objects.create_user(
+        username=username,
+        email='{}@whatever.org'.format(username),
+        password='whatever_very_secure_pass',
+    )
+
+
+def request_quiz(user, quiz_id, option=None):
+    """Get quiz page, or answer current question by option, through the view"""
+    link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+    if option is None:
+        request = RequestFactory().get(link)
+    else:
+        request = RequestFactory().post(link, {
+            forms.RadioQuestionForm.RADIO_OPTIONS: [str(option.pk)]})
+    request.user = user
+    return views.QuizView.as_view()(request, quiz_id)
+
+
+def create_quiz(name='quiz', questions=3, **kwargs):
+    """Create quiz of questions with a correct and an incorrect option each
+
+    Returns the quiz and [correct option, incorrect option] of each question"""
+    quiz = models.Quiz.objects.create(name=name, **kwargs)
+    options = []
+    for i in range(questions):
+        question = models.Question.objects.create(
+            question_text='question_text {}'.format(i),
+            quiz=quiz,
+        )
+        options.append([
+            models.Option.objects.create(
+                option_text='correct' if is_correct else 'incorrect',
+                is_correct=is_correct,
+                question=question,
+            )
+            for is_correct in (True, False)
+        ])
+    return quiz, options
+
+
+def get_api_quiz(user, quiz_id):
+    """Get quiz through the API, returns status code and data"""
+    request = RequestFactory().get(
+        reverse('exam:api_quiz', kwargs={'quiz_id': quiz_id}))
+    request.user = user
+    response = api.QuizApiView.as_view()(request, quiz_id)
+    return response.status_code, json.loads(response.content.decode())
+
+
+def post_api_answers(user, quiz_id, answers):
+    """Submit answers through the API, returns status code and data"""
+    request = RequestFactory().post(
+        reverse('exam:api_answers', kwargs={'quiz_id': quiz_id}),
+        json.dumps({'answers': answers}),
+        content_type='application/json',
+    )
+    request.user = user
+    response = api.AnswersApiView.as_view()(request, quiz_id)
+    return response.status_code, json.loads(response.content.decode())
+
+
+class QuizTakeTestCase(TestCase):
+    """Test case of a quiz of 3 questions, see create_quiz, and its taker"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.quiz, self.options = create_quiz()
+
+    def _take(self, user, correct):
+        """Take the quiz, answering first questions correctly"""
+        take = models.Take.get_or_create(user=user, quiz=self.quiz)
+        for position, options in enumerate(self.options):
+            option = options[0] if position < correct else options[1]
+            take.record_answer(option.question, option)
+        return take
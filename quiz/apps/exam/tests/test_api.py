@@ -0,0 +1,117 @@
+"""Exam app JSON API tests"""
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import models
+from .fixtures import create_quiz, create_user, get_api_quiz, post_api_answers
+
+
+class ApiTests(TestCase):
+    """JSON API tests"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.quiz, self.options = create_quiz()
+
+    def _get(self):
+        """Get quiz through the API"""
+        return get_api_quiz(self.user, self.quiz.pk)
+
+    def _post(self, answers):
+        """Submit answers, options, through the API"""
+        return post_api_answers(self.user, self.quiz.pk, [
+            {'question': option.question_id, 'option': option.pk}
+            for option in answers
+        ])
+
+    def test_get_quiz(self):
+        """Whole quiz is returned, without correctness"""
+        status, data = self._get()
+        assert status == 200
+        assert data['name'] == 'quiz'
+        assert len(data['questions']) == 3
+        assert data['questions'][0]['options'] == [
+            {'id': option.pk, 'text': option.option_text}
+            for option in self.options[0]
+        ]
+        assert 'is_correct' not in json.dumps(data)
+        assert data['answered'] == []
+        assert data['results']['completed'] is False
+
+    def test_submit_answers(self):
+        """Batch is written at once, in any order, results are returned
+
+        Take, already given answers, then bulk insert, progress and
+        statistics updates in a savepoint, then updated progress"""
+        answers = [self.options[2][0], self.options[0][1]]
+        self._get()
+        with self.assertNumQueries(8):
+            status, data = self._post(answers)
+        assert status == 200
+        assert data['results'] == {
+            'total_questions': 3,
+            'right_answers': 1,
+            'wrong_answers': 1,
+            'right_percentage': 33,
+            'completed': False,
+            'deadline': None,
+        }
+        take = models.Take.objects.get(user=self.user, quiz=self.quiz)
+        assert take.current_question_id == self.options[1][0].question_id
+
+        status, data = self._post([self.options[1][0]])
+        assert status == 200
+        assert data['results']['completed'] is True
+        assert data['results']['right_answers'] == 2
+        assert set(self._get()[1]['answered']) == {
+            options[0].question_id for options in self.options}
+
+    def test_submit_invalid_answers(self):
+        """Invalid batch is rejected as a whole"""
+        self._post([self.options[0][0]])
+        for answers in (
+                [self.options[1][0], self.options[1][1]],  # same question
+                [self.options[1][0], self.options[0][0]],  # answered
+        ):
+            status, data = self._post(answers)
+            assert status == 400
+            assert len(data['errors']) == 1
+        status, _ = self._post([
+            models.Option(pk=self.options[1][0].pk, question_id=999)])
+        assert status == 400
+        status, _ = self._post([models.Option(
+            pk=self.options[2][0].pk,
+            question_id=self.options[1][0].question_id,
+        )])
+        assert status == 400
+        assert models.Answer.objects.count() == 1
+
+    def test_submit_no_answers(self):
+        """Empty batch is rejected, progress and statistics are untouched"""
+        self._post([self.options[0][0]])
+        assert self._post([]) == (400, {'errors': ['No answers given']})
+        take = models.Take.objects.get(user=self.user, quiz=self.quiz)
+        assert take.answered_count == 1
+
+        self._post([options[0] for options in self.options[1:]])
+        take = models.Take.objects.get(pk=take.pk)
+        with self.assertNumQueries(0):
+            take.record_answers([])
+        take.record_answers([(
+            self.options[0][0].question_id,
+            models.Response(self.options[0][0].pk),
+            True,
+        )])
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.get_stored_results() == (3, 3, 0, 100)
+        assert models.ScoreBucket.objects.get(
+            quiz=self.quiz, score=100).takes_count == 1
+        assert models.OptionStats.objects.get(
+            pk=self.options[0][0].pk).picks_count == 1
+
+    def test_login_required(self):
+        """API responds with 403 instead of redirect"""
+        link = reverse('exam:api_quiz', kwargs={'quiz_id': self.quiz.pk})
+        assert self.client.get(link).status_code == 403
@@ -0,0 +1,81 @@
+"""Exam app take attempts tests"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .. import content, models, stats, views
+from .fixtures import QuizTakeTestCase, create_user
+
+
+class AttemptsTests(QuizTakeTestCase):
+    """Take attempts tests"""
+
+    def _retake(self):
+        """Start a new attempt through the view"""
+        request = RequestFactory().get(
+            reverse('exam:clear', kwargs={'quiz_id': self.quiz.pk}))
+        request.user = self.user
+        return views.ClearAnswersView.as_view()(request, self.quiz.pk)
+
+    def test_retake(self):
+        """Retake starts a new attempt, previous one is kept"""
+        take = self._take(self.user, correct=2)
+        content.get_compiled_quiz(self.quiz.pk)  # warm up cache
+        # latest take, savepoint, insert, release, progress of the new
+        # attempt and its update, quiz statistics update
+        with self.assertNumQueries(8):
+            response = self._retake()
+        assert response.status_code == 302
+        latest = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        assert latest.attempt == 2
+        assert latest.current_question_id == self.options[0][0].question_id
+        assert take.answer_set.count() == 3
+
+        # attempt without answers is not retaken again
+        self._retake()
+        assert models.Take.objects.count() == 2
+        # neither is one created concurrently
+        assert take.retake(self.quiz).pk == latest.pk
+
+    def test_previous_results(self):
+        """Results page lists previous attempts"""
+        self._take(self.user, correct=2)
+        self._retake()
+        self._take(self.user, correct=3)
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('exam:quiz', kwargs={'quiz_id': self.quiz.pk}))
+        self.assertContains(response, 'Attempt 2, previous attempts:')
+        self.assertContains(response, '<li>Attempt 1: 2/3 (66%)</li>')
+
+    def test_prune(self):
+        """Old attempts are pruned, statistics stay consistent"""
+        for correct in (1, 2, 3):
+            self._take(self.user, correct=correct)
+            self._retake()
+        other_user = create_user('other')
+        self._take(other_user, correct=0)
+
+        with self.assertRaises(CommandError):
+            call_command('prune_attempts', '--keep', '0', stdout=StringIO())
+        output = StringIO()
+        call_command(
+            'prune_attempts', '--keep', '2', '--batch-size', '2',
+            stdout=output)
+        assert output.getvalue() == '2 attempts pruned\n'
+        assert list(
+            models.Take.objects
+            .filter(user=self.user)
+            .order_by('attempt')
+            .values_list('attempt', flat=True)
+        ) == [3, 4]
+        assert models.Answer.objects.count() == 6
+
+        summary = stats.get_quiz_summary(self.quiz.pk)
+        assert summary.takes == 3
+        assert summary.completed == 2
+        stats.rebuild(self.quiz.pk)
+        assert stats.get_quiz_summary(self.quiz.pk) == summary
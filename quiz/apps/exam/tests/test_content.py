@@ -0,0 +1,90 @@
+"""Exam app compiled content tests"""
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from .. import content, models
+from .fixtures import create_quiz
+
+
+class CompiledQuizTests(TestCase):
+    """Compiled quiz content and its cache tests"""
+
+    def setUp(self):
+        self.quiz, [[self.correct_option, self.incorrect_option]] = (
+            create_quiz(questions=1))
+        self.question = self.correct_option.question
+
+    def test_compiled_content(self):
+        """Compiled quiz contains questions, options and correct ones"""
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        assert quiz.name == 'quiz'
+        assert [question.id for question in quiz.questions] == [
+            self.question.pk]
+        question = quiz.get_question(self.question.pk)
+        assert question.question_text == 'question_text 0'
+        assert [option.id for option in question.get_options()] == [
+            self.correct_option.pk, self.incorrect_option.pk]
+        assert quiz.is_correct(self.question.pk, self.correct_option.pk)
+        assert not quiz.is_correct(self.question.pk, self.incorrect_option.pk)
+        assert quiz.get_question(999) is None
+
+    def test_cached(self):
+        """Compiled quiz is cached, until content is changed"""
+        content.get_compiled_quiz(self.quiz.pk)
+        with self.assertNumQueries(0):
+            content.get_compiled_quiz(self.quiz.pk)
+
+        # not in process cache anymore, but still in the shared one
+        content.local_cache.clear()
+        with self.assertNumQueries(0):
+            content.get_compiled_quiz(self.quiz.pk)
+
+        self.incorrect_option.option_text = 'changed'
+        self.incorrect_option.save()
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        question = quiz.get_question(self.question.pk)
+        assert question.get_option(self.incorrect_option.pk).option_text == (
+            'changed')
+
+        new_question = models.Question.objects.create(
+            question_text='new question_text',
+            quiz=self.quiz,
+        )
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        assert quiz.get_question(new_question.pk) is not None
+
+        question_id = self.question.pk
+        self.question.delete()
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        assert quiz.get_question(question_id) is None
+
+    def test_read_hints(self):
+        """Content is read from the primary while replicas may lag"""
+        version = content.get_quiz_version(self.quiz.pk)
+        assert content.get_read_hints(version) == content.PRIMARY
+        with override_settings(DATABASE_REPLICA_LAG=0):
+            assert content.get_read_hints(version) == {}
+        assert content.get_read_hints(None) == content.PRIMARY
+        assert content.get_read_hints('not a time') == content.PRIMARY
+
+    @override_settings(EXAM_CONTENT_VERSION_TIMEOUT=60)
+    def test_version_timeout(self):
+        """Versions expire, so changes by other processes are seen"""
+        version = content.get_quiz_version(self.quiz.pk)
+        assert content.get_quiz_version(self.quiz.pk) == version
+        with mock.patch('time.time', return_value=time.time() + 61):
+            assert content.get_quiz_version(self.quiz.pk) != version
+
+        # with a shared cache versions are kept forever
+        with override_settings(EXAM_CONTENT_VERSION_TIMEOUT=None):
+            content.bump_quiz_version(self.quiz.pk)
+            version = content.get_quiz_version(self.quiz.pk)
+        with mock.patch('time.time', return_value=time.time() + 3600):
+            assert content.get_quiz_version(self.quiz.pk) == version
+
+    def test_missing_quiz(self):
+        """Compiling non-existent quiz fails"""
+        with self.assertRaises(models.Quiz.DoesNotExist):
+            content.get_compiled_quiz(999)
@@ -0,0 +1,110 @@
+"""Exam app dashboard tests"""
+from datetime import timedelta
+
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import models, views
+from .fixtures import create_user
+
+
+class DashboardTests(TestCase):
+    """Dashboard of takes of the user tests"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = create_user()
+        self.question = models.Question.objects.create(
+            question_text='question_text',
+            quiz=models.Quiz.objects.create(name='quiz'),
+        )
+
+    def _create_take(self, name, progress, current=True, **fields):
+        """Take of a new quiz of 4 questions with stored (answered, correct)"""
+        answered, correct = progress
+        return models.Take.objects.create(
+            user=self.user,
+            quiz=models.Quiz.objects.get_or_create(name=name)[0],
+            questions_count=4,
+            answered_count=answered,
+            correct_count=correct,
+            current_question=self.question if current else None,
+            **fields
+        )
+
+    def _get_dashboard(self, **params):
+        """Get dashboard view response"""
+        request = self.factory.get(reverse('exam:dashboard'), params)
+        request.user = self.user
+        return views.DashboardView.as_view()(request)
+
+    def test_statuses(self):
+        """Progress, score and status of each take"""
+        now = timezone.now()
+        in_progress = self._create_take('in_progress', (1, 1))
+        completed = self._create_take('completed', (4, 3), current=False)
+        expired = self._create_take(
+            'expired', (2, 2), deadline=now - timedelta(minutes=1))
+        finalized = self._create_take(
+            'finalized', (2, 1), current=False, deadline=now)
+        retake = self._create_take(
+            'completed', (0, 0), deadline=now + timedelta(minutes=1),
+            attempt=2)
+        takes, next_before = views.DashboardView.get_takes(self.user)
+        assert next_before is None
+        assert [
+            (take.id, take.attempt, take.answered, take.total, take.score,
+             take.status)
+            for take in takes
+        ] == [
+            (retake.pk, 2, 0, 4, 0, views.DashboardView.IN_PROGRESS),
+            (finalized.pk, 1, 2, 4, 25, views.DashboardView.EXPIRED),
+            (expired.pk, 1, 2, 4, 50, views.DashboardView.EXPIRED),
+            (completed.pk, 1, 4, 4, 75, views.DashboardView.COMPLETED),
+            (in_progress.pk, 1, 1, 4, 25, views.DashboardView.IN_PROGRESS),
+        ]
+        assert takes[0].quiz_name == 'completed'
+        assert takes[0].quiz_id == completed.quiz_id
+
+        response = self._get_dashboard()
+        self.assertContains(response, '<td>4/4</td>')
+        self.assertContains(response, '<td>75%</td>')
+        self.assertContains(response, 'time is up', count=2)
+
+    def test_query_count(self):
+        """A page costs a single query whatever amount of takes"""
+        for i in range(20):
+            self._create_take('quiz_{}'.format(i), (i % 5, i % 3))
+        self._get_dashboard()  # warm up caches
+        with self.assertNumQueries(1):
+            response = self._get_dashboard()
+        self.assertContains(response, '>quiz_19</a>')
+
+    def test_pagination(self):
+        """Dashboard is paginated by take id, latest first"""
+        takes = [
+            self._create_take('quiz_{:03}'.format(i), (0, 0))
+            for i in range(views.DashboardView.PAGE_SIZE + 5)
+        ][::-1]
+        response = self._get_dashboard()
+        page = response.content.decode()
+        for take in takes[:views.DashboardView.PAGE_SIZE]:
+            assert '>{}</a>'.format(take.quiz.name) in page
+        for take in takes[views.DashboardView.PAGE_SIZE:]:
+            assert '>{}</a>'.format(take.quiz.name) not in page
+        next_before = takes[views.DashboardView.PAGE_SIZE - 1].pk
+        self.assertContains(response, '?before={}'.format(next_before))
+
+        response = self._get_dashboard(before=next_before)
+        page = response.content.decode()
+        for take in takes[views.DashboardView.PAGE_SIZE:]:
+            assert '>{}</a>'.format(take.quiz.name) in page
+        self.assertNotContains(response, 'Next page')
+
+    def test_other_users(self):
+        """Only takes of the user are listed"""
+        other = create_user('other')
+        models.Take.get_or_create(user=other, quiz=self.question.quiz)
+        self.assertContains(
+            self._get_dashboard(), "You haven't taken any quizzes yet")
@@ -0,0 +1,126 @@
+"""Exam app timed takes tests"""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, RequestFactory
+from django.utils import timezone
+
+from .. import content, models, stats
+from .fixtures import create_quiz, create_user, post_api_answers, request_quiz
+
+
+# pylint: disable = no-self-use
+
+
+class TimedTakeTests(TestCase):
+    """Time limited quizzes tests"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = create_user()
+        self.quiz, self.options = create_quiz(time_limit=10)
+
+    def _request(self, method, option=None):
+        """Get quiz page or answer current question through the view"""
+        return request_quiz(
+            self.user, self.quiz.pk, option if method == 'post' else None)
+
+    def _expire(self, take, ago=60):
+        """Move deadline of the take to ago seconds in the past"""
+        models.Take.objects.filter(pk=take.pk).update(
+            deadline=timezone.now() - timedelta(seconds=ago))
+
+    def test_deadline(self):
+        """Deadline is set on creation, checked without queries"""
+        before = timezone.now()
+        take = models.Take.get_or_create(
+            user=self.user, quiz=content.get_compiled_quiz(self.quiz.pk))
+        assert take.started_at >= before
+        assert take.deadline == take.started_at + timedelta(minutes=10)
+        with self.assertNumQueries(0):
+            assert not take.is_expired()
+        assert take.is_expired(take.deadline)
+
+        self._request('get')  # warm up caches
+        with self.assertNumQueries(6):  # see test_quiz_post_query_count
+            assert self._request('post', self.options[0][0]).status_code == (
+                302)
+
+        untimed = models.Quiz.objects.create(name='untimed')
+        assert models.Take.get_or_create(
+            user=self.user, quiz=untimed).deadline is None
+
+    def test_late_answer(self):
+        """Answers after deadline are rejected, take is finalized"""
+        self._request('post', self.options[0][0])
+        take = models.Take.objects.get()
+        self._expire(take)
+        assert self._request('post', self.options[1][0]).status_code == 302
+        take.refresh_from_db()
+        assert take.answer_set.count() == 1
+        assert take.current_question_id is None
+        assert take.get_stored_results() == take.get_quiz_results()
+        assert take.get_stored_results() == (3, 1, 2, 33)
+        assert models.LeaderboardEntry.objects.get().take_id == take.pk
+        assert models.ScoreBucket.objects.get(
+            quiz=self.quiz, score=33).takes_count == 1
+        response = self._request('get')
+        assert b'Time is up' in response.content
+        take.refresh_progress()
+        assert take.current_question_id is None
+
+        new_take = take.retake(content.get_compiled_quiz(self.quiz.pk))
+        assert new_take.attempt == 2
+        assert not new_take.is_expired()
+        assert new_take.get_previous_results() == [(1, (3, 1, 2, 33))]
+
+    def test_sweep(self):
+        """Abandoned takes are finalized in batches, after grace period"""
+        takes = []
+        for i in range(4):
+            user = create_user(str(i))
+            takes.append(models.Take.get_or_create(user=user, quiz=self.quiz))
+        takes[0].record_answer(
+            self.options[0][0].question, self.options[0][0])
+        for take in takes[:3]:
+            self._expire(take)
+        self._expire(takes[3], ago=1)
+        takes[2].record_answers(  # completed already
+            (option.question_id, models.Response(option.pk), False)
+            for _, option in self.options
+        )
+
+        out = StringIO()
+        call_command(
+            'expire_takes', '--batch-size', '1', '--grace', '5', stdout=out)
+        assert out.getvalue() == '2 takes finalized\n'
+        finalized = set(
+            models.Take.objects
+            .filter(current_question__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        assert finalized == {take.pk for take in takes[:3]}
+        # completed take got on the leaderboard by its last answer
+        assert sorted(
+            models.LeaderboardEntry.objects.values_list('score', flat=True)
+        ) == [0, 0, 33]
+        summary = stats.get_quiz_summary(self.quiz.pk)
+        stats.rebuild(self.quiz.pk)
+        assert stats.get_quiz_summary(self.quiz.pk) == summary
+        with self.assertRaises(CommandError):
+            call_command('expire_takes', '--grace', '-1')
+
+    def test_api(self):
+        """API rejects answers after deadline"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        self._expire(take)
+        status, data = post_api_answers(self.user, self.quiz.pk, [{
+            'question': self.options[0][0].question_id,
+            'option': self.options[0][0].pk,
+        }])
+        assert status == 403
+        assert data['errors'] == ['Time is up']
+        assert data['results']['completed']
+        assert not models.Answer.objects.exists()
@@ -0,0 +1,59 @@
+"""Exam app forms tests"""
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+
+from .. import content, forms, models
+from .fixtures import create_quiz
+
+
+class RadioQuestionFormTests(TestCase):
+    """Radio Question form tests"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_get_chosen_option(self):
+        """Test that get options returns all options for the question"""
+        quiz = models.Quiz.objects.create(name='quiz')
+        question = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        option = models.Option.objects.create(
+            option_text='option_text 1',
+            is_correct=True,
+            question=question,
+        )
+        models.Option.objects.create(
+            option_text='option_text 2',
+            is_correct=False,
+            question=question,
+        )
+        quiz_link = reverse('exam:quiz', kwargs={'quiz_id': quiz.pk})
+        request = self.factory.post(
+            quiz_link,
+            {forms.RadioQuestionForm.RADIO_OPTIONS: [str(option.pk)]},
+        )
+        forms.RadioQuestionForm(question)
+        # probably there is a better way to get proper POST structure
+        form = forms.RadioQuestionForm(question, request.POST)
+        assert form.is_valid()
+        with self.assertNumQueries(0):
+            chosen_option = form.get_chosen_option()
+        assert chosen_option == option
+
+    def test_compiled_question(self):
+        """Form works on compiled question without any queries"""
+        quiz, [[option, _]] = create_quiz(questions=1)
+        question = option.question
+        compiled_question = content.get_compiled_quiz(quiz.pk).get_question(
+            question.pk)
+        with self.assertNumQueries(0):
+            form = forms.RadioQuestionForm(
+                compiled_question,
+                {forms.RadioQuestionForm.RADIO_OPTIONS: str(option.pk)},
+            )
+            assert form.is_valid()
+            chosen_option = form.get_chosen_option()
+        assert chosen_option.id == option.pk
+        assert chosen_option.is_correct
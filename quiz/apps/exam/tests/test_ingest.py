@@ -0,0 +1,172 @@
+"""Exam app answer ingestion tests"""
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import deadlines, ingest, models, views
+from .fixtures import create_quiz, create_user, request_quiz
+
+
+@override_settings(EXAM_ANSWER_INGEST=True)
+class AnswerIngestTests(TestCase):
+    """Answer ingestion queue tests"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = create_user()
+        self.quiz, self.options = create_quiz()
+        self.queue = ingest.AnswerQueue(
+            ingest.QueueConfig(
+                max_size=2, batch_size=10, interval=0, timeout=0),
+            background=False,
+        )
+        patcher = mock.patch.object(ingest, 'answer_queue', self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, method, option=None):
+        """Get quiz page or answer current question through the view"""
+        return request_quiz(
+            self.user, self.quiz.pk, option if method == 'post' else None)
+
+    def test_read_your_writes(self):
+        """Pending answers are not written, but already skipped"""
+        response = self._request('post', self.options[0][0])
+        assert response.status_code == 302
+        assert not models.Answer.objects.exists()
+        assert self.queue.get_pending(self.user.pk, self.quiz.pk) == {
+            self.options[0][0].question_id}
+        response = self._request('get')
+        self.assertContains(response, 'question_text 1')
+
+        # answer to pending question is not taken
+        response = self._request('post', self.options[0][1])
+        self.assertEqual(response.status_code, 200)
+        response = self._request('post', self.options[1][1])
+        assert response.status_code == 302
+        assert len(self.queue) == 2
+
+        self.queue.drain()
+        take = models.Take.objects.get(user=self.user, quiz=self.quiz)
+        assert take.get_stored_results() == (3, 1, 1, 33)
+        assert take.current_question_id == self.options[2][0].question_id
+        assert not self.queue.get_pending(self.user.pk, self.quiz.pk)
+        self.assertContains(self._request('get'), 'question_text 2')
+
+    def test_results_sync(self):
+        """Results are shown once pending answers are written"""
+        for options in self.options[:2]:
+            self._request('post', options[0])
+        self.queue.drain()
+        self._request('post', self.options[2][0])
+        response = self._request('get')
+        self.assertContains(response, 'Quiz results:')
+        assert not self.queue
+        take = models.Take.objects.get(user=self.user, quiz=self.quiz)
+        assert take.get_stored_results() == (3, 3, 0, 100)
+
+    def test_backpressure(self):
+        """Answers are rejected while queue is full"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        for options in self.options[:2]:
+            assert self.queue.submit(take, options[0].question_id,
+                                     models.Response(options[0].pk), True)
+        with self.assertRaises(ingest.QueueFull):
+            self.queue.submit(
+                take, self.options[2][0].question_id,
+                models.Response(self.options[2][0].pk), True)
+        response = self._request('post', self.options[2][0])
+        assert response.status_code == 503
+        assert response['Retry-After'] == '1'
+
+    def test_conflicts(self):
+        """Answers of deleted takes and answered questions are skipped"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        question = self.options[0][0].question
+        take.record_answer(question, self.options[0][1])
+        self.queue.submit(
+            take, question.pk, models.Response(self.options[0][0].pk), True)
+        assert ingest.write_answers(self.queue.get_queued()) == 0
+        self.queue.drain()
+        assert take.answer_set.get().chosen_option == self.options[0][1]
+
+        self.queue.submit(
+            take, self.options[1][0].question_id,
+            models.Response(self.options[1][0].pk), True)
+        take.delete()
+        self.queue.drain()
+        assert not models.Answer.objects.exists()
+
+    def test_write_error(self):
+        """Answers failed to be written are kept and written later"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        question_id = self.options[0][0].question_id
+        self.queue.submit(
+            take, question_id, models.Response(self.options[0][0].pk), True)
+        failures = [OperationalError('database is locked')]
+        write_answers = ingest.write_answers
+
+        def fail_once(answers):
+            """Raise a database error on the first call only"""
+            if failures:
+                raise failures.pop()
+            return write_answers(answers)
+
+        with mock.patch.object(ingest, 'write_answers', fail_once):
+            with self.assertRaises(OperationalError):
+                self.queue.flush()
+            assert len(self.queue) == 1
+            assert self.queue.get_pending(self.user.pk, self.quiz.pk) == {
+                question_id}
+            self.queue.drain()
+        assert not self.queue
+        assert not self.queue.get_pending(self.user.pk, self.quiz.pk)
+        assert take.answer_set.get().question_id == question_id
+
+    def test_deadlines(self):
+        """Answers of finalized and long expired takes are skipped"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        other = models.Take.get_or_create(
+            user=create_user('other'), quiz=self.quiz)
+        for pending in (take, other):
+            self.queue.submit(
+                pending, self.options[0][0].question_id,
+                models.Response(self.options[0][0].pk), True)
+        models.Take.objects.filter(pk=take.pk).update(
+            deadline=timezone.now() - timedelta(seconds=60))
+        models.Take.objects.filter(pk=other.pk).update(
+            deadline=timezone.now() - timedelta(seconds=1))
+        assert ingest.write_answers(self.queue.get_queued()) == 1
+        self.queue.drain()
+        assert not take.answer_set.exists()
+        assert other.answer_set.exists()
+
+        # answer flushed after the sweep doesn't reopen the take
+        assert deadlines.sweep(10) == 2
+        self.queue.submit(
+            other, self.options[1][0].question_id,
+            models.Response(self.options[1][0].pk), True)
+        with override_settings(EXAM_DEADLINE_GRACE=60):
+            self.queue.drain()
+        assert other.answer_set.count() == 1
+        assert deadlines.sweep(10) == 0
+        assert models.LeaderboardEntry.objects.count() == 2
+        assert models.Take.objects.filter(
+            current_question__isnull=True).count() == 2
+
+    def test_clear(self):
+        """Pending answers are written before new attempt is started"""
+        self._request('post', self.options[0][0])
+        link = reverse('exam:clear', kwargs={'quiz_id': self.quiz.pk})
+        request = self.factory.get(link)
+        request.user = self.user
+        views.ClearAnswersView.as_view()(request, self.quiz.pk)
+        assert not self.queue
+        assert models.Answer.objects.get().take.attempt == 1
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        assert take.attempt == 2
+        assert not take.answer_set.exists()
@@ -0,0 +1,73 @@
+"""Exam app leaderboard tests"""
+from django.urls import reverse
+
+from .. import attempts, leaderboard, models, stats
+from .fixtures import QuizTakeTestCase, create_user
+
+
+class LeaderboardTests(QuizTakeTestCase):
+    """Quiz leaderboard tests"""
+
+    def _complete(self, username, correct):
+        """Complete the quiz as a new user, without seeing the results"""
+        user = create_user(username)
+        self._take(user, correct)
+        return user
+
+    def test_leaderboard(self):
+        """Equal scores share a rank, user sees own standing"""
+        self._complete('first', correct=2)
+        self._complete('second', correct=3)
+        self._complete('third', correct=2)
+        user = self._complete('fourth', correct=0)
+        models.Take.get_or_create(user=self.user, quiz=self.quiz)
+
+        self.client.force_login(user)
+        with self.assertNumQueries(3):
+            board = leaderboard.get_leaderboard(self.quiz.pk, user, size=3)
+        assert board.top == [
+            leaderboard.Standing(1, 'second', 100),
+            leaderboard.Standing(2, 'first', 66),
+            leaderboard.Standing(2, 'third', 66),
+        ]
+        assert board.standing == leaderboard.Standing(4, 'fourth', 0)
+        assert board.completed == 4
+        assert leaderboard.get_leaderboard(
+            self.quiz.pk, self.user).standing is None
+
+        response = self.client.get(
+            reverse('exam:leaderboard', kwargs={'quiz_id': self.quiz.pk}))
+        self.assertContains(response, '<td>2</td><td>third</td><td>66%</td>')
+        self.assertContains(response, 'Your rank: 4 of 4, score 0%')
+
+    def test_retake(self):
+        """Every attempt is ranked, pruned ones leave the leaderboard"""
+        self._complete('first', correct=2)
+        user = self._complete('second', correct=3)
+        self.client.force_login(user)
+        self.client.get(
+            reverse('exam:clear', kwargs={'quiz_id': self.quiz.pk}))
+        self._take(user, correct=1)
+        self.client.get(reverse('exam:quiz', kwargs={'quiz_id': self.quiz.pk}))
+        board = leaderboard.get_leaderboard(self.quiz.pk, user)
+        assert [standing.username for standing in board.top] == [
+            'second', 'first', 'second']
+        assert board.standing == leaderboard.Standing(1, 'second', 100)
+        assert board.completed == 3
+
+        attempts.prune(keep=1, batch_size=10)
+        board = leaderboard.get_leaderboard(self.quiz.pk, user)
+        assert board.top == [
+            leaderboard.Standing(1, 'first', 66),
+            leaderboard.Standing(2, 'second', 33),
+        ]
+        assert board.standing == leaderboard.Standing(2, 'second', 33)
+        assert board.completed == 2
+
+    def test_rebuild(self):
+        """Leaderboard is rebuilt along with statistics"""
+        user = self._complete('first', correct=1)
+        models.LeaderboardEntry.objects.all().delete()
+        stats.rebuild(self.quiz.pk)
+        board = leaderboard.get_leaderboard(self.quiz.pk, user)
+        assert board.standing == leaderboard.Standing(1, 'first', 33)
@@ -0,0 +1,473 @@
+"""Exam app models tests"""
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import models
+from .fixtures import create_quiz, create_user
+
+
+# pylint: disable = no-self-use
+
+
+class QuestionModelTests(TestCase):
+    """Question model tests"""
+
+    def test_get_options(self):
+        """Test that get options returns all options for the question"""
+        quiz = models.Quiz.objects.create(name='quiz')
+        question = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        option_1 = models.Option.objects.create(
+            option_text='option_text 1',
+            is_correct=True,
+            question=question,
+        )
+        option_2 = models.Option.objects.create(
+            option_text='option_text 2',
+            is_correct=False,
+            question=question,
+        )
+
+        options = set(question.get_options())
+        expected_optinos = {option_1, option_2}
+        assert options == expected_optinos
+
+
+class TakeModelTests(TestCase):
+    """Take model tests"""
+
+    def test_get_or_create(self):
+        """On first call take should be created, on next returned the same"""
+        user = User.objects.create_user(
+            username='whatever',
+            email='whatever@whatever.org',
+            password='whatever_very_secure_pass',
+        )
+        quiz = models.Quiz.objects.create(name='quiz')
+
+        take_1 = models.Take.get_or_create(user=user, quiz=quiz)
+
+        take_2 = models.Take.get_or_create(user=user, quiz=quiz)
+
+        assert take_1.pk == take_2.pk
+
+    def test_get_current_question(self):
+        """Test get current question
+
+        Should return yet unanswered questions, in whatever order, and None
+        if none left"""
+        user = User.objects.create_user(
+            username='whatever',
+            email='whatever@whatever.org',
+            password='whatever_very_secure_pass',
+        )
+        quiz = models.Quiz.objects.create(name='quiz')
+        question_1 = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        models.Option.objects.create(
+            option_text='option_text',
+            is_correct=True,
+            question=question_1,
+        )
+        question_2 = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        models.Option.objects.create(
+            option_text='option_text',
+            is_correct=True,
+            question=question_2,
+        )
+        question_3 = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        models.Option.objects.create(
+            option_text='option_text',
+            is_correct=True,
+            question=question_3,
+        )
+        expected_questions = {question_1, question_2, question_3}
+        take = models.Take.get_or_create(user=user, quiz=quiz)
+        while True:
+            current_question = take.get_current_question()
+            if current_question is None:
+                break
+            assert current_question in expected_questions
+            models.Answer.objects.create(
+                take=take,
+                question=current_question,
+                chosen_option=current_question.option_set.first(),
+            )
+            expected_questions.remove(current_question)
+        assert not expected_questions
+
+    def test_get_quiz_results(self):
+        """Test get quiz results
+
+        Get quiz results method returns:
+        Total questions amount (in quiz)
+        Correct answers amount
+        Incorrect answers amount
+        Percentage of correct answers - compared to total questions,
+            0 if no asnwers
+        """
+        user = User.objects.create_user(
+            username='whatever',
+            email='whatever@whatever.org',
+            password='whatever_very_secure_pass',
+        )
+        quiz = models.Quiz.objects.create(name='quiz')
+        take = models.Take.get_or_create(user=user, quiz=quiz)
+        # should work even if there a no questions in quiz
+        results = take.get_quiz_results()
+        assert results == (0, 0, 0, 0)
+
+        # add a question
+        question_1 = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        models.Option.objects.create(
+            option_text='option_text',
+            is_correct=True,
+            question=question_1,
+        )
+
+        results = take.get_quiz_results()
+        assert results == (1, 0, 0, 0)
+
+        # add correct answer to added question
+        models.Answer.objects.create(
+            take=take,
+            question=question_1,
+            chosen_option=question_1.option_set.first(),
+        )
+
+        results = take.get_quiz_results()
+        assert results == (1, 1, 0, 100)
+
+        # add a question
+        question_2 = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        models.Option.objects.create(
+            option_text='option_text',
+            is_correct=False,
+            question=question_2,
+        )
+
+        results = take.get_quiz_results()
+        assert results == (2, 1, 0, 50)
+
+        # add incorrect answer to added question
+        models.Answer.objects.create(
+            take=take,
+            question=question_2,
+            chosen_option=question_2.option_set.first(),
+        )
+
+        results = take.get_quiz_results()
+        assert results == (2, 1, 1, 50)
+
+
+class TakeQueryCostTests(TestCase):
+    """Take methods should cost the same no matter how big the quiz is"""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def _create_take(self, name, questions_amount, answered_amount,
+                     shuffle=False):
+        """Create quiz with questions and a take with some answered ones
+
+        Questions of shuffled quiz are answered in take's order"""
+        quiz = models.Quiz.objects.create(
+            name=name, shuffle_questions=shuffle)
+        models.Question.objects.bulk_create(
+            models.Question(question_text=str(i), quiz=quiz)
+            for i in range(questions_amount)
+        )
+        questions = list(quiz.question_set.order_by('pk'))
+        models.Option.objects.bulk_create(
+            models.Option(option_text='option', is_correct=True, question=q)
+            for q in questions
+        )
+        options = {
+            option.question_id: option
+            for option in models.Option.objects.filter(question__quiz=quiz)
+        }
+        take = models.Take.get_or_create(user=self.user, quiz=quiz)
+        answered = questions[:answered_amount]
+        if shuffle:
+            by_id = {question.pk: question for question in questions}
+            answered = [
+                by_id[question_id]
+                for question_id in take.get_question_order()[:answered_amount]
+            ]
+        models.Answer.objects.bulk_create(
+            models.Answer(
+                take=take,
+                question=q,
+                chosen_option=options[q.pk],
+                correct=True,
+            )
+            for q in answered
+        )
+        if shuffle:
+            take.refresh_progress()
+        return take, questions
+
+    @staticmethod
+    def _best_time(func, repeat=5):
+        """Best wall clock time of several calls"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def test_current_question_lowest(self):
+        """Current question is the lowest id one, which is not answered"""
+        take, questions = self._create_take('quiz', 10, 4)
+        assert take.get_current_question() == questions[4]
+
+    def test_current_question_queries(self):
+        """Lookup is a single query, both for small and large quizzes
+
+        Whatever the size, shuffled take reads current question by position
+        in its order"""
+        small_take, _ = self._create_take('small', 10, 5)
+        large_take, _ = self._create_take('large', 2000, 1000)
+        ordered_take, _ = self._create_take('ordered', 2000, 1000, True)
+        with self.assertNumQueries(1):
+            small_take.get_current_question()
+        with self.assertNumQueries(1):
+            large_take.get_current_question()
+        with self.assertNumQueries(1):
+            current_question = ordered_take.get_current_question()
+        assert current_question.pk == ordered_take.get_question_order()[1000]
+
+    def test_current_question_latency(self):
+        """Lookup cost should not grow along with quiz size
+
+        Old python-side implementation instantiated every question and
+        answer, so the large quiz was a couple of orders of magnitude slower.
+        Bound is kept loose on purpose, to not be flaky on slow machines."""
+        small_take, _ = self._create_take('small', 10, 5)
+        large_take, _ = self._create_take('large', 2000, 1000)
+        small_time = self._best_time(small_take.get_current_question)
+        large_time = self._best_time(large_take.get_current_question)
+        assert large_time < max(small_time * 20, 0.05)
+
+    def test_quiz_results_queries(self):
+        """Results are a single aggregate query, whatever answers amount"""
+        small_take, _ = self._create_take('small', 10, 5)
+        large_take, _ = self._create_take('large', 2000, 1000)
+        with self.assertNumQueries(1):
+            assert small_take.get_quiz_results() == (10, 5, 0, 50)
+        with self.assertNumQueries(1):
+            assert large_take.get_quiz_results() == (2000, 1000, 0, 50)
+
+
+class TakeProgressTests(TestCase):
+    """Tests for progress stored in take"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.quiz, options = create_quiz()
+        self.questions = [
+            question_options[0].question for question_options in options]
+
+    def test_created_take_progress(self):
+        """New take has counters set and points to the first question"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        assert take.questions_count == 3
+        assert take.answered_count == 0
+        assert take.correct_count == 0
+        assert take.current_question == self.questions[0]
+
+    def test_record_answer(self):
+        """Recording an answer updates counters and moves the cursor"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        question = self.questions[0]
+        correct = question.option_set.get(is_correct=True)
+        # savepoint, insert, progress and statistics updates, release
+        with self.assertNumQueries(5):
+            take.record_answer(question, correct)
+        assert take.answered_count == 1
+        assert take.correct_count == 1
+        assert take.current_question == self.questions[1]
+
+        question = self.questions[1]
+        take.record_answer(
+            question, question.option_set.get(is_correct=False))
+        question = self.questions[2]
+        take.record_answer(
+            question, question.option_set.get(is_correct=False))
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.current_question is None
+        assert take.get_stored_results() == take.get_quiz_results()
+        assert take.get_stored_results() == (3, 1, 2, 33)
+        # accounted in its score bucket by the last answer only
+        assert models.ScoreBucket.get_scores(self.quiz.pk) == {33: 1}
+
+    def test_rebuild_command(self):
+        """Command verifies and rebuilds stale progress"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        question = self.questions[0]
+        take.record_answer(question, question.option_set.first())
+        call_command('rebuild_take_progress', '--verify', stdout=StringIO())
+
+        # answers deleted in the database, progress is not aware of that
+        models.Answer.objects.filter(take=take).delete()
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_take_progress', '--verify', stdout=StringIO())
+
+        call_command('rebuild_take_progress', stdout=StringIO())
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.questions_count == 3
+        assert take.answered_count == 0
+        assert take.current_question == self.questions[0]
+        call_command('rebuild_take_progress', '--verify', stdout=StringIO())
+
+    def test_regrade(self):
+        """Command grades answers again after answer key is fixed"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        for position, question in enumerate(self.questions):
+            take.record_answer(
+                question, question.option_set.get(is_correct=position == 0))
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.get_stored_results() == (3, 1, 2, 33)
+
+        # answer key of the second question is fixed, e.g. in the admin
+        for option in self.questions[1].option_set.all():
+            option.is_correct = not option.is_correct
+            option.save()
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_take_progress', '--verify', stdout=StringIO())
+        output = StringIO()
+        call_command('rebuild_take_progress', stdout=output)
+        assert output.getvalue() == (
+            '1 takes checked, 1 rebuilt, 1 regraded\n')
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.get_stored_results() == take.get_quiz_results()
+        assert take.get_stored_results() == (3, 2, 1, 66)
+        assert dict(
+            models.ScoreBucket.objects
+            .filter(quiz=self.quiz, takes_count__gt=0)
+            .values_list('score', 'takes_count')
+        ) == {66: 1}
+        call_command('rebuild_take_progress', '--verify', stdout=StringIO())
+
+    def test_question_deleted(self):
+        """Deleting current question moves cursor on, not completing take"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        question = self.questions[0]
+        take.record_answer(question, question.option_set.first())
+        self.quiz.shuffle_questions = True
+        self.quiz.save()
+        ordered = models.Take.get_or_create(
+            user=create_user('other'), quiz=self.quiz)
+        current_id = ordered.current_question_id
+        deleted_id = self.questions[1].pk
+
+        self.questions[1].delete()
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.questions_count == 2
+        assert take.answered_count == 1
+        assert take.current_question == self.questions[2]
+        ordered = models.Take.objects.get(pk=ordered.pk)
+        assert ordered.questions_count == 2
+        assert ordered.current_question is not None
+        if current_id != deleted_id:
+            assert ordered.current_question_id == current_id
+
+        self.questions[2].delete()
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.current_question is None
+        assert take.get_stored_results() == (1, 1, 0, 100)
+        assert models.ScoreBucket.objects.get(
+            quiz=self.quiz, score=100).takes_count == 1
+
+    def test_question_deleted_in_bulk(self):
+        """Deleting a question updates takes and statistics in bulk
+
+        Scores of completed takes change as well, they are rebuilt"""
+        completed = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        for question, is_correct in zip(self.questions, (True, False, True)):
+            completed.record_answer(
+                question, question.option_set.get(is_correct=is_correct))
+        takes = [
+            models.Take.get_or_create(
+                user=create_user('other {}'.format(i)), quiz=self.quiz)
+            for i in range(10)
+        ]
+        assert models.ScoreBucket.get_scores(self.quiz.pk) == {66: 1}
+
+        # same amount for any amount of takes, see drop deleted questions
+        with self.assertNumQueries(36):
+            self.questions[0].delete()
+        completed = models.Take.objects.get(pk=completed.pk)
+        assert completed.get_stored_results() == (2, 1, 1, 50)
+        assert models.ScoreBucket.get_scores(self.quiz.pk) == {50: 1}
+        assert models.LeaderboardEntry.objects.get(
+            take=completed).score == 50
+        for take in models.Take.objects.filter(
+                pk__in=[take.pk for take in takes]):
+            assert take.get_stored_results() == (2, 0, 0, 0)
+            assert take.current_question == self.questions[1]
+
+
+class AnswerModelTests(TestCase):
+    """Answer model tests"""
+
+    def test_is_correct(self):
+        """Check that is correct returns correct values"""
+        user = User.objects.create_user(
+            username='whatever',
+            email='whatever@whatever.org',
+            password='whatever_very_secure_pass',
+        )
+        quiz = models.Quiz.objects.create(name='quiz')
+        question = models.Question.objects.create(
+            question_text='question_text',
+            quiz=quiz,
+        )
+        correct_option = models.Option.objects.create(
+            option_text='option_text',
+            is_correct=True,
+            question=question,
+        )
+        incorrect_option = models.Option.objects.create(
+            option_text='option_text',
+            is_correct=False,
+            question=question,
+        )
+        take = models.Take.get_or_create(user=user, quiz=quiz)
+        correct_answer = models.Answer(
+            take=take,
+            question=question,
+            chosen_option=correct_option,
+        )
+        assert correct_answer.is_correct() is True
+
+        incorrect_answer = models.Answer(
+            take=take,
+            question=question,
+            chosen_option=incorrect_option,
+        )
+        assert incorrect_answer.is_correct() is False
@@ -0,0 +1,121 @@
+"""Exam app query plans tests"""
+import re
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import content, deadlines, forms, models, views
+from .fixtures import create_quiz, create_user
+
+
+class QueryPlanTests(TestCase):
+    """Hot queries should be backed by indexes
+
+    Exact queries issued by the code are captured and explained"""
+
+    def setUp(self):
+        user = create_user()
+        self.quiz, [[option, _]] = create_quiz(questions=1)
+        self.question = option.question
+        self.take = models.Take.get_or_create(user=user, quiz=self.quiz)
+        models.Answer.objects.create(
+            take=self.take,
+            question=self.question,
+            chosen_option=option,
+        )
+        if connection.vendor == 'postgresql':
+            # tables are tiny, make planner pick indexes anyway
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def _explain(self, sql):
+        """Query plan lines"""
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ' + sql)
+                return [row[0] for row in cursor.fetchall()]
+        self.skipTest('No plan checks for ' + connection.vendor)
+
+    def _assert_indexed(self, func, expected_indexes):
+        """All queries of function use indexes, including expected ones
+
+        Expected indexes are full names, so a similar index, i.e. foreign
+        key one, doesn't pass for the expected one. Where planner is free
+        to pick one of equally suitable indexes, a tuple of them is
+        expected"""
+        with CaptureQueriesContext(connection) as context:
+            func()
+        plan = []
+        for query in context.captured_queries:
+            plan.extend(self._explain(query['sql']))
+        for line in plan:
+            # sqlite: SCAN table, postgres: Seq Scan on table
+            assert not (
+                line.startswith('SCAN') and 'INDEX' not in line or
+                'Seq Scan' in line
+            ), plan
+        for indexes in expected_indexes:
+            if isinstance(indexes, str):
+                indexes = (indexes,)
+            assert any(
+                re.search(r'\b{}\b'.format(index), line)
+                for index in indexes
+                for line in plan
+            ), (indexes, plan)
+
+    def test_get_current_question(self):
+        """Questions of quiz ordered by id, answers of take"""
+        self._assert_indexed(
+            self.take.get_current_question,
+            [
+                'exam_question_quiz_id_idx',
+                (
+                    'exam_answer_take_id_question_id_2d5a2f96_uniq',
+                    'exam_answer_take_correct_idx',
+                ),
+            ],
+        )
+
+    def test_get_quiz_results(self):
+        """Answers of take along with chosen options"""
+        self._assert_indexed(
+            self.take.get_quiz_results,
+            ['exam_answer_take_correct_idx', 'exam_question_quiz_id_idx'],
+        )
+
+    def test_radio_question_form(self):
+        """Options of question"""
+        self._assert_indexed(
+            lambda: forms.RadioQuestionForm(self.question),
+            ['exam_option_question_id_992a7b13'],
+        )
+
+    def test_compile_quiz(self):
+        """Questions and options of quiz, for compiled content"""
+        self._assert_indexed(
+            lambda: content.compile_quiz(self.quiz.pk, 1),
+            ['exam_option_question_id_992a7b13', 'exam_question_quiz_id_idx'],
+        )
+
+    def test_expired_takes(self):
+        """Timed takes in progress by deadline"""
+        self._assert_indexed(
+            lambda: list(
+                deadlines.get_expired_takes(timezone.now())
+                .values_list('pk', flat=True)[:10]
+            ),
+            ['exam_take_deadline_idx'],
+        )
+
+    def test_dashboard(self):
+        """Takes of user latest first"""
+        self._assert_indexed(
+            lambda: views.DashboardView.get_takes(self.take.user, 10**6),
+            ['exam_take_user_id_idx'],
+        )
@@ -0,0 +1,151 @@
+"""Exam app question order tests"""
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import content, forms, ingest, models, views
+from .fixtures import create_quiz, create_user, get_api_quiz, post_api_answers
+
+
+class QuestionOrderTests(TestCase):
+    """Shuffled and sampled question delivery tests"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = create_user()
+        self.quiz, options = create_quiz(questions=5, shuffle_questions=True)
+        # question id -> correct option, incorrect one
+        self.options = {
+            question_options[0].question_id: question_options
+            for question_options in options
+        }
+
+    def _answer(self, question_id, quiz_id=None):
+        """Answer question correctly through the view"""
+        quiz_id = quiz_id or self.quiz.pk
+        request = self.factory.post(
+            reverse('exam:quiz', kwargs={'quiz_id': quiz_id}),
+            {forms.RadioQuestionForm.RADIO_OPTIONS: [
+                str(self.options[question_id][0].pk)]},
+        )
+        request.user = self.user
+        return views.QuizView.as_view()(request, quiz_id)
+
+    def test_draw(self):
+        """Questions are shuffled and/or sampled, once per take"""
+        question_ids = sorted(self.options)
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        order = models.Take.draw_question_order(quiz, random.Random(1))
+        take = models.Take(question_order=order)
+        assert sorted(take.get_question_order()) == question_ids
+        assert take.get_question_order() != tuple(question_ids)
+        assert models.Take.get_ordered_question_id(order, 4) in question_ids
+        assert models.Take.get_ordered_question_id(order, 5) is None
+
+        self.quiz.questions_per_take = 3
+        take.question_order = models.Take.draw_question_order(self.quiz)
+        assert len(set(take.get_question_order())) == 3
+        self.quiz.shuffle_questions = False
+        take.question_order = models.Take.draw_question_order(self.quiz)
+        assert list(take.get_question_order()) == sorted(
+            take.get_question_order())
+        self.quiz.questions_per_take = 5
+        assert models.Take.draw_question_order(self.quiz) is None
+
+    def test_delivery(self):
+        """Questions are delivered in take's order, read by position"""
+        self.quiz.questions_per_take = 3
+        self.quiz.save()
+        take = models.Take.get_or_create(
+            user=self.user, quiz=content.get_compiled_quiz(self.quiz.pk))
+        order = take.get_question_order()
+        assert len(order) == 3
+        assert take.questions_count == 3
+        assert take.current_question_id == order[0]
+
+        for position, question_id in enumerate(order):
+            take.refresh_from_db(fields=models.Take.PROGRESS_FIELDS)
+            assert take.current_question_id == question_id
+            assert take.get_current_question().pk == question_id
+            with CaptureQueriesContext(connection) as queries:
+                self._answer(question_id)
+            # same queries as in test_quiz_post_query_count, but the cursor
+            # is set right away, without unanswered questions lookup, score
+            # bucket and leaderboard are updated by the last answer only
+            assert len(queries) == (9 if position == 2 else 6), [
+                q["sql"] for q in queries]
+            cursor = '"current_question_id" = {}'.format(
+                order[position + 1] if position < 2 else 'NULL')
+            assert any(cursor in query['sql'] for query in queries)
+        take.refresh_from_db()
+        assert take.get_stored_results() == (3, 3, 0, 100)
+        assert take.get_stored_results() == take.get_quiz_results()
+        call_command('rebuild_take_progress', '--verify', stdout=StringIO())
+
+        new_take = take.retake(content.get_compiled_quiz(self.quiz.pk))
+        assert new_take.attempt == 2
+        assert len(new_take.get_question_order()) == 3
+
+    def test_deleted_question(self):
+        """Deleted questions are dropped from order by progress rebuild"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        order = take.get_question_order()
+        self._answer(order[0])
+        models.Question.objects.filter(pk__in=order[:2]).delete()
+        call_command('rebuild_take_progress', stdout=StringIO())
+        take.refresh_from_db()
+        assert take.get_question_order() == order[2:]
+        assert take.get_stored_results() == (3, 0, 0, 0)
+        assert take.current_question_id == order[2]
+        self._answer(order[2])
+        take.refresh_from_db()
+        assert take.current_question_id == order[3]
+
+    def test_ingest(self):
+        """Pending answers are skipped in take's order"""
+        queue = ingest.AnswerQueue(
+            ingest.QueueConfig(
+                max_size=10, batch_size=10, interval=0, timeout=0),
+            background=False,
+        )
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        order = take.get_question_order()
+        for question_id in order[:2]:
+            queue.submit(
+                take, question_id,
+                models.Response(self.options[question_id][0].pk), True)
+        pending = queue.get_pending(self.user.pk, self.quiz.pk)
+        assert ingest.get_current_question_id(take, pending) == order[2]
+        queue.drain()
+        take.refresh_from_db()
+        assert take.current_question_id == order[2]
+        assert take.get_stored_results() == (5, 2, 0, 40)
+
+    def test_api(self):
+        """API lists questions in take's order, takes answers in it"""
+        take = models.Take.get_or_create(user=self.user, quiz=self.quiz)
+        order = take.get_question_order()
+        _, data = get_api_quiz(self.user, self.quiz.pk)
+        assert [question['id'] for question in data['questions']] == list(
+            order)
+
+        def post(question_ids):
+            """Answer questions correctly through the API"""
+            return post_api_answers(self.user, self.quiz.pk, [
+                {
+                    'question': question_id,
+                    'option': self.options[question_id][0].pk,
+                }
+                for question_id in question_ids
+            ])
+
+        assert post([order[1]]) == (400, {'errors': [
+            'Question {} is answered out of order'.format(order[1])]})
+        assert post(order[:2])[0] == 200
+        take.refresh_from_db()
+        assert take.current_question_id == order[2]
@@ -0,0 +1,182 @@
+"""Exam app question types tests"""
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import content, forms, models, stats, views
+from .fixtures import create_user, get_api_quiz, post_api_answers
+
+
+class QuestionTypesTests(TestCase):
+    """Multiple choice, true or false and numeric questions tests"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.quiz = models.Quiz.objects.create(name='quiz')
+        self.radio = models.Question.objects.create(
+            question_text='radio', quiz=self.quiz)
+        self.multiple = models.Question.objects.create(
+            question_text='multiple',
+            quiz=self.quiz,
+            question_type=models.Question.MULTIPLE,
+        )
+        self.options = {}  # question id -> correct options, incorrect one
+        for question in (self.radio, self.multiple):
+            self.options[question.pk] = [
+                models.Option.objects.create(
+                    option_text=str(is_correct),
+                    is_correct=is_correct,
+                    question=question,
+                )
+                for is_correct in (True, True, False)[
+                    question is self.radio:]
+            ]
+        self.true_false = models.Question.objects.create(
+            question_text='true_false',
+            quiz=self.quiz,
+            question_type=models.Question.TRUE_FALSE,
+            correct_value=0,
+        )
+        self.numeric = models.Question.objects.create(
+            question_text='numeric',
+            quiz=self.quiz,
+            question_type=models.Question.NUMERIC,
+            correct_value=3.14,
+            tolerance=0.01,
+        )
+
+    def _post(self, data):
+        """Answer current question through the view"""
+        request = RequestFactory().post(
+            reverse('exam:quiz', kwargs={'quiz_id': self.quiz.pk}), data)
+        request.user = self.user
+        return views.QuizView.as_view()(request, self.quiz.pk)
+
+    def test_forms(self):
+        """Every question type has its form, returning a response"""
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        multiple, incorrect = self.options[self.multiple.pk][1:]
+        cases = [
+            (self.radio, {'radio_options': [str(incorrect.pk)]}, None),
+            (self.radio, {'radio_options': ['0']}, None),
+            (self.multiple, {'options': [str(multiple.pk)] * 2},
+             models.Response(option_ids=[multiple.pk])),
+            (self.multiple, {}, models.Response(option_ids=[])),
+            (self.true_false, {'value': '0'}, models.Response(value=0)),
+            (self.true_false, {'value': '2'}, None),
+            (self.numeric, {'value': '3.145'}, models.Response(value=3.145)),
+            (self.numeric, {'value': 'inf'}, None),
+        ]
+        for question, data, response in cases:
+            for form_question in (question, quiz.get_question(question.pk)):
+                form = forms.get_question_form(form_question, data)
+                assert form.is_valid() is (response is not None)
+                if response is not None:
+                    assert form.get_response() == response
+        form = forms.get_question_form(
+            self.radio, {'radio_options': [str(incorrect.pk)]})
+        assert isinstance(form, forms.RadioQuestionForm)
+
+    def test_grade(self):
+        """Compiled quiz grades responses of any question type"""
+        quiz = content.get_compiled_quiz(self.quiz.pk)
+        options = [option.pk for option in self.options[self.multiple.pk]]
+        cases = [
+            (self.radio, models.Response(self.options[self.radio.pk][0].pk),
+             True),
+            (self.radio, models.Response(self.options[self.radio.pk][1].pk),
+             False),
+            (self.multiple, models.Response(option_ids=options[:2]), True),
+            (self.multiple, models.Response(option_ids=options[:1]), False),
+            (self.multiple, models.Response(option_ids=options), False),
+            (self.true_false, models.Response(value=0), True),
+            (self.true_false, models.Response(value=1), False),
+            (self.numeric, models.Response(value=3.15), True),
+            (self.numeric, models.Response(value=3.16), False),
+        ]
+        for question, response, is_correct in cases:
+            assert quiz.grade(question.pk, response) is is_correct
+
+    def test_take(self):
+        """Mixed take is graded without a query per question"""
+        multiple = self.options[self.multiple.pk]
+        request = RequestFactory().get(
+            reverse('exam:quiz', kwargs={'quiz_id': self.quiz.pk}))
+        request.user = self.user
+        views.QuizView.as_view()(request, self.quiz.pk)  # warm up caches
+        counts = []
+        for data in (
+                {'radio_options': [str(self.options[self.radio.pk][0].pk)]},
+                {'options': [str(multiple[0].pk), str(multiple[2].pk)]},
+                {'value': '0'},
+                {'value': '3.139'}):
+            with CaptureQueriesContext(connection) as queries:
+                assert self._post(data).status_code == 302
+            counts.append(len(queries))
+        # as in test_quiz_post_query_count, whatever question type, option
+        # statistics are not updated if no options are picked, and the last
+        # answer accounts the completed take in its score bucket and puts
+        # it on the leaderboard
+        assert counts == [6, 6, 5, 8]
+        take = models.Take.objects.get(user=self.user, quiz=self.quiz)
+        with self.assertNumQueries(1):
+            assert take.get_quiz_results() == (4, 3, 1, 75)
+        assert take.get_stored_results() == take.get_quiz_results()
+        answer = take.answer_set.get(question=self.multiple)
+        assert answer.get_picked_option_ids() == [
+            multiple[0].pk, multiple[2].pk]
+        assert answer.is_correct() is False
+        assert take.answer_set.get(question=self.numeric).value == 3.139
+
+        summary = stats.get_quiz_summary(self.quiz.pk)
+        assert [
+            (question.answers, question.correct)
+            for question in summary.questions
+        ] == [(1, 1), (1, 0), (1, 1), (1, 1)]
+        assert [
+            option.picks for option in summary.questions[1].options
+        ] == [1, 0, 1]
+        stats.rebuild(self.quiz.pk)
+        assert stats.get_quiz_summary(self.quiz.pk) == summary
+        take.delete()
+        assert not any(
+            option.picks
+            for question in stats.get_quiz_summary(self.quiz.pk).questions
+            for option in question.options
+        )
+
+    def test_api(self):
+        """API takes answers of every question type, validated by type"""
+        _, data = get_api_quiz(self.user, self.quiz.pk)
+        assert [question['type'] for question in data['questions']] == [
+            'radio', 'multiple', 'true_false', 'numeric']
+
+        def post(answers):
+            """Submit answers through the API"""
+            return post_api_answers(self.user, self.quiz.pk, answers)
+
+        multiple = [option.pk for option in self.options[self.multiple.pk]]
+        assert post([
+            {'question': self.radio.pk, 'value': 1},
+            {'question': self.multiple.pk, 'options': [0]},
+            {'question': self.true_false.pk, 'value': 0.5},
+            {'question': self.numeric.pk, 'value': 'nan'},
+        ]) == (400, {'errors': [
+            'Question {} is answered by options'.format(self.radio.pk),
+            'Option 0 is not in question {}'.format(self.multiple.pk),
+            'Question {} is answered by 1 or 0'.format(self.true_false.pk),
+            'Question {} is answered by a number'.format(self.numeric.pk),
+        ]})
+        status, data = post([
+            {
+                'question': self.radio.pk,
+                'option': self.options[self.radio.pk][0].pk,
+            },
+            {'question': self.multiple.pk, 'options': multiple[1::-1]},
+            {'question': self.true_false.pk, 'value': 1},
+            {'question': self.numeric.pk, 'value': 3.14},
+        ])
+        assert status == 200
+        assert data['results']['right_answers'] == 3
+        assert data['results']['completed']
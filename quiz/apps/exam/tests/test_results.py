@@ -0,0 +1,140 @@
+"""Exam app results export tests"""
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import models, results
+from .fixtures import create_user
+
+
+class ResultsExportTests(TestCase):
+    """Quiz results export tests"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.quiz = models.Quiz.objects.create(name='quiz')
+        radio = models.Question.objects.create(
+            question_text='radio', quiz=self.quiz)
+        self.options = [
+            models.Option.objects.create(
+                option_text=str(is_correct),
+                is_correct=is_correct,
+                question=radio,
+            )
+            for is_correct in (True, False)
+        ]
+        multiple = models.Question.objects.create(
+            question_text='multiple',
+            quiz=self.quiz,
+            question_type=models.Question.MULTIPLE,
+        )
+        numeric = models.Question.objects.create(
+            question_text='numeric',
+            quiz=self.quiz,
+            question_type=models.Question.NUMERIC,
+            correct_value=1,
+        )
+        self.question_ids = {
+            'radio': radio.pk,
+            'multiple': multiple.pk,
+            'numeric': numeric.pk,
+        }
+        self.completed = models.Take.get_or_create(
+            user=self.user, quiz=self.quiz)
+        self.completed.record_answers([
+            (radio.pk, models.Response(self.options[0].pk), True),
+            (multiple.pk, models.Response(
+                option_ids=[o.pk for o in self.options]), False),
+            (numeric.pk, models.Response(value=1.5), False),
+        ])
+        self.completed.refresh_from_db()
+        self.in_progress = models.Take.get_or_create(
+            user=create_user('other'), quiz=self.quiz)
+        self.in_progress.record_answers([
+            (radio.pk, models.Response(self.options[1].pk), False),
+        ])
+        self.in_progress.refresh_from_db()
+        models.Take.get_or_create(
+            user=self.user,
+            quiz=models.Quiz.objects.create(name='other'),
+        )
+
+    @staticmethod
+    def _export(*args):
+        """Export to a string"""
+        output = StringIO()
+        call_command('export_results', *args, stdout=output)
+        return output.getvalue()
+
+    def _expected_takes(self):
+        """Take rows csv of the quiz"""
+        return (
+            'quiz,take,user,attempt,started_at,deadline,questions,answered,'
+            'correct,score,completed\r\n'
+            'quiz,{},whatever,1,{},,3,3,1,33,1\r\n'
+            'quiz,{},other,1,{},,3,1,0,0,0\r\n'
+        ).format(
+            self.completed.pk, self.completed.started_at.isoformat(),
+            self.in_progress.pk, self.in_progress.started_at.isoformat(),
+        )
+
+    def test_takes(self):
+        """Take rows with scores out of stored progress"""
+        assert self._export('quiz') == self._expected_takes()
+
+    def test_answers(self):
+        """Answer rows with responses of any question type"""
+        assert self._export('quiz', '--kind', 'answers') == (
+            'quiz,take,user,attempt,question,question_type,options,value,'
+            'correct\r\n'
+            'quiz,{take},whatever,1,{radio},radio,{option},,1\r\n'
+            'quiz,{take},whatever,1,{multiple},multiple,{option} {other},,0'
+            '\r\n'
+            'quiz,{take},whatever,1,{numeric},numeric,,1.5,0\r\n'
+            'quiz,{other_take},other,1,{radio},radio,{other},,0\r\n'
+        ).format(
+            take=self.completed.pk,
+            other_take=self.in_progress.pk,
+            option=self.options[0].pk,
+            other=self.options[1].pk,
+            **self.question_ids
+        )
+
+    def test_file(self):
+        """Export is written to a file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.csv')
+            self._export('quiz', '--output', path)
+            with open(path, newline='') as output:
+                assert output.read() == self._expected_takes()
+        with self.assertRaises(CommandError):
+            self._export('missing')
+
+    def test_query_count(self):
+        """Each export is read by a single query"""
+        for kind in results.KINDS:
+            with self.assertNumQueries(1):
+                assert len(list(
+                    results.stream_csv(kind, [self.quiz.pk]))) > 1
+
+    def test_admin_action(self):
+        """Quiz admin streams results of selected quizzes"""
+        self.user.is_staff = True
+        self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('admin:exam_quiz_changelist'),
+            {
+                'action': 'export_take_results',
+                '_selected_action': [str(self.quiz.pk)],
+            },
+        )
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv'
+        assert b''.join(response.streaming_content).decode() == (
+            self._expected_takes())
@@ -0,0 +1,89 @@
+"""Exam app quiz statistics tests"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from .. import models, stats
+from .fixtures import QuizTakeTestCase, create_user
+
+
+class QuizStatsTests(QuizTakeTestCase):
+    """Materialized quiz statistics tests"""
+
+    def test_incremental(self):
+        """Answers and take deletions are accounted as they happen"""
+        take = self._take(self.user, correct=2)
+        other_user = create_user('other')
+        other_take = models.Take.get_or_create(user=other_user, quiz=self.quiz)
+        option = self.options[0][1]
+        other_take.record_answer(option.question, option)
+
+        with self.assertNumQueries(5):
+            summary = stats.get_quiz_summary(self.quiz.pk)
+        assert summary.takes == 2
+        assert summary.completed == 1
+        assert summary.passed == 1
+        assert summary.mean_score == 66
+        assert summary.distribution[6] == (60, 69, 1)
+        assert [
+            (question.answers, question.correct)
+            for question in summary.questions
+        ] == [(2, 1), (1, 1), (1, 0)]
+        assert [
+            option.picks for option in summary.questions[0].options
+        ] == [1, 1]
+
+        take.delete()
+        summary = stats.get_quiz_summary(self.quiz.pk)
+        assert summary.takes == 1
+        assert summary.completed == 0
+        assert [
+            (question.answers, question.correct)
+            for question in summary.questions
+        ] == [(1, 0), (0, 0), (0, 0)]
+
+    def test_completion_once(self):
+        """Completed take is accounted once, whatever comes after"""
+        take = self._take(self.user, correct=3)
+        summary = stats.get_quiz_summary(self.quiz.pk)
+        assert summary.completed == 1
+        for _ in range(2):
+            models.Take.advance_stored_progress(
+                take.pk, self.quiz.pk, 0, 0, [])
+        assert stats.get_quiz_summary(self.quiz.pk) == summary
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.get_stored_results() == (3, 3, 0, 100)
+
+    def test_rebuild(self):
+        """Rebuilt statistics are the same as maintained ones"""
+        self._take(self.user, correct=1)
+        maintained = stats.get_quiz_summary(self.quiz.pk)
+        models.QuizStats.objects.all().delete()
+        models.ScoreBucket.objects.all().delete()
+        models.OptionStats.objects.all().delete()
+        assert stats.get_quiz_summary(self.quiz.pk).completed == 0
+
+        out = StringIO()
+        call_command('rebuild_quiz_stats', '--quiz', str(self.quiz.pk),
+                     stdout=out)
+        assert '1 quizzes rebuilt' in out.getvalue()
+        assert stats.get_quiz_summary(self.quiz.pk) == maintained
+        assert maintained.passed == 0
+
+    def test_stats_pages(self):
+        """Statistics are shown to staff and in the admin"""
+        self._take(self.user, correct=3)
+        self.client.force_login(self.user)
+        link = reverse('exam:stats', kwargs={'quiz_id': self.quiz.pk})
+        assert self.client.get(link).status_code == 302
+
+        self.user.is_staff = True
+        self.user.is_superuser = True
+        self.user.save()
+        response = self.client.get(link)
+        self.assertContains(response, 'question_text 2')
+        self.assertContains(response, '<td>90-100%</td><td>1</td>')
+        response = self.client.get(
+            reverse('admin:exam_quiz_change', args=[self.quiz.pk]))
+        self.assertContains(response, 'Score distribution')
@@ -0,0 +1,181 @@
+"""Exam app quiz import/export tests"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import content, models
+from .fixtures import create_user
+
+
+# pylint: disable = no-self-use
+
+
+class QuizTransferTests(TestCase):
+    """Quiz import/export commands tests"""
+
+    JSONL = (
+        '{"quiz": "quiz_1", "question": "q1", "options": ['
+        '{"text": "o1", "is_correct": true}, '
+        '{"text": "o2", "is_correct": false}]}\n'
+        '{"quiz": "quiz_1", "question": "q2", "options": ['
+        '{"text": "o3", "is_correct": false}, '
+        '{"text": "o4", "is_correct": true}]}\n'
+        '\n'
+        '{"quiz": "quiz_2", "question": "q3", "options": []}\n'
+        '{"quiz": "quiz_2", "question": "q4", "type": "true_false", '
+        '"correct_value": 0.0, "options": []}\n'
+        '{"quiz": "quiz_2", "question": "q5", "type": "numeric", '
+        '"correct_value": 3.14, "tolerance": 0.01, "options": []}\n'
+    )
+    CSV = (
+        'quiz,question,question_type,correct_value,tolerance,option,'
+        'is_correct\r\n'
+        'quiz_1,q1,radio,,0.0,o1,1\r\n'
+        'quiz_1,q1,radio,,0.0,o2,0\r\n'
+        'quiz_1,q2,radio,,0.0,o3,0\r\n'
+        'quiz_1,q2,radio,,0.0,o4,1\r\n'
+        'quiz_2,q3,radio,,0.0,,\r\n'
+        'quiz_2,q4,true_false,0.0,0.0,,\r\n'
+        'quiz_2,q5,numeric,3.14,0.01,,\r\n'
+    )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, name, data):
+        """Write file to the temporary directory, return its path"""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', newline='') as output:
+            output.write(data)
+        return path
+
+    def _import(self, name, data, *args):
+        """Import data through a file"""
+        call_command(
+            'import_quiz', self._write(name, data), *args, stdout=StringIO())
+
+    @staticmethod
+    def _export(*args):
+        """Export to a string"""
+        output = StringIO()
+        call_command('export_quiz', *args, stdout=output)
+        return output.getvalue()
+
+    def _assert_imported(self):
+        """Check that test data is in the database"""
+        quiz = models.Quiz.objects.get(name='quiz_1')
+        questions = list(quiz.question_set.order_by('pk'))
+        assert [q.question_text for q in questions] == ['q1', 'q2']
+        assert [
+            (o.option_text, o.is_correct)
+            for o in questions[1].option_set.order_by('pk')
+        ] == [('o3', False), ('o4', True)]
+        quiz = models.Quiz.objects.get(name='quiz_2')
+        assert not models.Option.objects.filter(question__quiz=quiz).exists()
+        assert list(
+            quiz.question_set
+            .order_by('pk')
+            .values_list('question_type', 'correct_value', 'tolerance')
+        ) == [
+            (models.Question.RADIO, None, 0),
+            (models.Question.TRUE_FALSE, 0, 0),
+            (models.Question.NUMERIC, 3.14, 0.01),
+        ]
+
+    def test_import_jsonl(self):
+        """Import JSON lines and export them back"""
+        self._import('quizzes.jsonl', self.JSONL, '--batch-size', '1')
+        self._assert_imported()
+        exported = self._export('--format', 'jsonl')
+        assert [json.loads(line) for line in exported.splitlines()] == [
+            json.loads(line) for line in self.JSONL.splitlines() if line]
+
+    def test_import_csv(self):
+        """Import csv and export it back"""
+        self._import('quizzes.csv', self.CSV)
+        self._assert_imported()
+        assert self._export('--format', 'csv') == self.CSV
+        assert self._export('quiz_1', '--format', 'csv') == (
+            self.CSV[:self.CSV.index('quiz_2')])
+
+        # question type columns are optional
+        self._import('old.csv', (
+            'quiz,question,option,is_correct\r\n'
+            'quiz_3,q1,o1,1\r\n'
+        ))
+        assert self._export('quiz_3', '--format', 'csv').splitlines()[1] == (
+            'quiz_3,q1,radio,,0.0,o1,1')
+
+    def test_modes(self):
+        """Create mode fails on existing quizzes, upsert replaces content"""
+        self._import('quizzes.jsonl', self.JSONL)
+        with self.assertRaises(CommandError):
+            self._import('quizzes.jsonl', self.JSONL)
+
+        replacement = (
+            '{"quiz": "quiz_1", "question": "new", "options": ['
+            '{"text": "o", "is_correct": true}]}\n'
+        )
+        self._import('new.jsonl', replacement, '--mode', 'upsert')
+        quiz = models.Quiz.objects.get(name='quiz_1')
+        assert [q.question_text for q in quiz.question_set.all()] == ['new']
+        assert models.Quiz.objects.filter(name='quiz_2').exists()
+        compiled_quiz = content.get_compiled_quiz(quiz.pk)
+        assert [q.question_text for q in compiled_quiz.questions] == ['new']
+
+    def test_upsert_in_place(self):
+        """Upsert keeps matched questions, their answers and takes"""
+        self._import('quizzes.jsonl', self.JSONL)
+        quiz = models.Quiz.objects.get(name='quiz_1')
+        question = quiz.question_set.get(question_text='q1')
+        option = question.option_set.get(option_text='o1')
+        take = models.Take.get_or_create(
+            user=create_user(), quiz=quiz)
+        take.record_answer(question, option)
+
+        self._import('upsert.jsonl', (
+            '{"quiz": "quiz_1", "question": "q1", "type": "multiple", '
+            '"options": ['
+            '{"text": "o1", "is_correct": true}, '
+            '{"text": "o5", "is_correct": false}]}\n'
+            '{"quiz": "quiz_1", "question": "q4", "options": []}\n'
+        ), '--mode', 'upsert', '--batch-size', '1')
+        upserted = quiz.question_set.get(question_text='q1')
+        assert upserted.pk == question.pk
+        assert upserted.question_type == models.Question.MULTIPLE
+        assert [
+            (o.pk == option.pk, o.option_text, o.is_correct)
+            for o in question.option_set.order_by('pk')
+        ] == [(True, 'o1', True), (False, 'o5', False)]
+        assert not quiz.question_set.filter(question_text='q2').exists()
+        take = models.Take.objects.get(pk=take.pk)
+        assert take.answer_set.get().question_id == question.pk
+        assert take.get_stored_results() == (2, 1, 0, 50)
+        assert take.current_question.question_text == 'q4'
+
+        with self.assertRaises(CommandError):
+            self._import(
+                'upsert.jsonl', self.JSONL, '--mode', 'upsert',
+                '--batch-size', '0')
+
+    def test_malformed(self):
+        """Malformed files are reported"""
+        with self.assertRaises(CommandError):
+            self._import('broken.jsonl', '{"quiz": "quiz"}\n')
+        with self.assertRaises(CommandError):
+            self._import('broken.csv', 'quiz,question\r\nquiz,q\r\n')
+        with self.assertRaises(CommandError):
+            self._import('broken.jsonl', (
+                '{"quiz": "quiz", "question": "q", "type": "essay"}\n'))
+        with self.assertRaises(CommandError):
+            self._import('broken.csv', (
+                'quiz,question,question_type,correct_value,option,'
+                'is_correct\r\nquiz,q,numeric,pi,,\r\n'))
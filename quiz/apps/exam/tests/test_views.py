@@ -0,0 +1,299 @@
+"""Exam app views tests"""
+import re
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.template import engines
+from django.template.loaders import cached
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import content, forms, fragments, models, views
+
+
+# pylint: disable = no-self-use
+
+
+class ViewsBehaviorTests(TestCase):
+    """Views tests"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            username='whatever',
+            email='whatever@whatever.org',
+            password='whatever_very_secure_pass',
+        )
+        quiz_1 = models.Quiz.objects.create(name='quiz_1')
+        question_11 = models.Question.objects.create(
+            question_text='question_text1',
+            quiz=quiz_1,
+        )
+        models.Option.objects.create(
+            option_text='option_text1',
+            is_correct=True,
+            question=question_11,
+        )
+        models.Option.objects.create(
+            option_text='option_text2',
+            is_correct=False,
+            question=question_11,
+        )
+        question_12 = models.Question.objects.create(
+            question_text='question_text2',
+            quiz=quiz_1,
+        )
+        models.Option.objects.create(
+            option_text='option_text3',
+            is_correct=True,
+            question=question_12,
+        )
+        models.Option.objects.create(
+            option_text='option_text4',
+            is_correct=False,
+            question=question_12,
+        )
+        quiz_2 = models.Quiz.objects.create(name='quiz_2')
+        question_21 = models.Question.objects.create(
+            question_text='question_text3',
+            quiz=quiz_2,
+        )
+        models.Option.objects.create(
+            option_text='option_text5',
+            is_correct=True,
+            question=question_21,
+        )
+        models.Option.objects.create(
+            option_text='option_text6',
+            is_correct=False,
+            question=question_21,
+        )
+
+    def test_index(self):
+        """Test index view, it should display links to all available quizzes"""
+        request = self.factory.get(reverse('exam:index'))
+        request.user = self.user
+        response = views.IndexView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        # content should contain links for each quiz
+        for quiz in models.Quiz.objects.all():
+            name = quiz.name
+            url = reverse('exam:quiz', kwargs={'quiz_id': quiz.id})
+            link = '<li><a href="{url}">{name}</a></li>'.format(
+                url=url,
+                name=name,
+            )
+            self.assertContains(response, link)
+
+    def _get_index(self, **params):
+        """Get index view response"""
+        request = self.factory.get(reverse('exam:index'), params)
+        request.user = self.user
+        return views.IndexView.as_view()(request)
+
+    def test_index_pagination(self):
+        """Index is paginated by quiz id, newest first"""
+        models.Quiz.objects.bulk_create(
+            models.Quiz(name='paginated_{:03}'.format(i))
+            for i in range(views.IndexView.PAGE_SIZE + 5)
+        )
+        content.bump_catalogue_version()  # bulk create sends no signals
+        quizzes = list(models.Quiz.objects.order_by('-pk'))
+        response = self._get_index()
+        page = response.content.decode()
+        for quiz in quizzes[:views.IndexView.PAGE_SIZE]:
+            assert '>{}</a>'.format(quiz.name) in page
+        for quiz in quizzes[views.IndexView.PAGE_SIZE:]:
+            assert '>{}</a>'.format(quiz.name) not in page
+        next_before = quizzes[views.IndexView.PAGE_SIZE - 1].pk
+        self.assertContains(response, '?before={}'.format(next_before))
+
+        response = self._get_index(before=next_before)
+        page = response.content.decode()
+        for quiz in quizzes[views.IndexView.PAGE_SIZE:]:
+            assert '>{}</a>'.format(quiz.name) in page
+        self.assertNotContains(response, 'Next page')
+
+    def test_index_search(self):
+        """Index can be searched by name prefix"""
+        response = self._get_index(q='quiz_2')
+        self.assertContains(response, '>quiz_2</a>')
+        self.assertNotContains(response, '>quiz_1</a>')
+        response = self._get_index(q='uiz')
+        self.assertContains(response, 'No quizzes are available.')
+
+    def test_index_cached(self):
+        """Pages are cached until a quiz is added, progress is fetched"""
+        self._get_index()
+        with self.assertNumQueries(1):  # progress of the user
+            self._get_index()
+        models.Quiz.objects.create(name='quiz_3')
+        self.assertContains(self._get_index(), '>quiz_3</a>')
+
+    def test_index_progress(self):
+        """Index shows progress in started and completed quizzes"""
+        quiz_1 = models.Quiz.objects.get(name='quiz_1')
+        take = models.Take.get_or_create(user=self.user, quiz=quiz_1)
+        question = take.current_question
+        take.record_answer(question, question.option_set.first())
+        quiz_2 = models.Quiz.objects.get(name='quiz_2')
+        take = models.Take.get_or_create(user=self.user, quiz=quiz_2)
+        question = take.current_question
+        take.record_answer(question, question.option_set.first())
+        response = self._get_index()
+        self.assertContains(response, '>quiz_1</a> (1/2)</li>')
+        self.assertContains(response, '>quiz_2</a> (completed)</li>')
+
+    def test_quiz(self):
+        """Test quiz view
+
+        On get it displays current question if any, results otherwise.
+        On set it saves chosen option and redirects to quiz get.
+        """
+        # there's probably a room for improvement in this test
+        quiz_id = 1
+        quiz_link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+        request = self.factory.get(quiz_link)
+        request.user = self.user
+        response = views.QuizView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 200)
+        request = self.factory.post(
+            quiz_link, {forms.RadioQuestionForm.RADIO_OPTIONS: ['1']})
+        request.user = self.user
+        response = views.QuizView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 302)
+        request = self.factory.post(
+            quiz_link, {forms.RadioQuestionForm.RADIO_OPTIONS: ['999']})
+        # non-existent option, in case this happens somehow
+        request.user = self.user
+        response = views.QuizView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 200)
+        request = self.factory.post(
+            quiz_link, {forms.RadioQuestionForm.RADIO_OPTIONS: ['3']})
+        # a bit of a dirty hack, but second question contains options with
+        # id 3 and 4
+        request.user = self.user
+        response = views.QuizView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 302)
+        # all questions answered, view should return results
+        request = self.factory.get(quiz_link)
+        request.user = self.user
+        response = views.QuizView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Quiz results:')
+
+    def _get_quiz(self, quiz_id):
+        """Get quiz view response"""
+        request = self.factory.get(
+            reverse('exam:quiz', kwargs={'quiz_id': quiz_id}))
+        request.user = self.user
+        return views.QuizView.as_view()(request, quiz_id)
+
+    def test_question_form_cached(self):
+        """Question form is rendered once, CSRF token is per request"""
+        fragments.fragment_cache.clear()
+        first = self._get_quiz(1)
+        with mock.patch.object(fragments, 'get_form') as form:
+            second = self._get_quiz(1)
+        form.assert_not_called()
+        tokens = [
+            re.search(
+                r"name='csrfmiddlewaretoken' value='(\w+)'",
+                response.content.decode(),
+            ).group(1)
+            for response in (first, second)
+        ]
+        assert tokens[0] != tokens[1]
+        self.assertContains(second, 'question_text1')
+        self.assertNotContains(second, fragments.CSRF_PLACEHOLDER)
+
+        question = models.Question.objects.get(question_text='question_text1')
+        question.question_text = 'question_text1 changed'
+        question.save()
+        self.assertContains(self._get_quiz(1), 'question_text1 changed')
+
+    def test_cached_template_loader(self):
+        """Templates are compiled once with DEBUG off"""
+        assert not settings.DEBUG
+        template_loaders = engines['django'].engine.template_loaders
+        assert isinstance(template_loaders[0], cached.Loader)
+
+    def test_quiz_post_query_count(self):
+        """Submitting an answer is one INSERT and no extra SELECTs
+
+        Only take is selected, then, inside of a savepoint (transaction
+        outside of tests), answer is inserted, take progress and picked
+        option statistics are updated. Score bucket is not touched, as the
+        take is not completed by the answer"""
+        quiz_id = 1
+        quiz_link = reverse('exam:quiz', kwargs={'quiz_id': quiz_id})
+        request = self.factory.get(quiz_link)
+        request.user = self.user
+        views.QuizView.as_view()(request, quiz_id)  # warm up caches
+        request = self.factory.post(
+            quiz_link, {forms.RadioQuestionForm.RADIO_OPTIONS: ['1']})
+        request.user = self.user
+        with CaptureQueriesContext(connection) as queries:
+            response = views.QuizView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 302)
+        statements = [
+            'SELECT "exam_take"',
+            'SAVEPOINT',
+            'INSERT INTO "exam_answer"',
+            'UPDATE "exam_take"',
+            'UPDATE "exam_optionstats"',
+            'RELEASE SAVEPOINT',
+        ]
+        assert len(queries) == len(statements)
+        for query, statement in zip(queries, statements):
+            assert query['sql'].startswith(statement), query['sql']
+        take = models.Take.objects.get(user=self.user, quiz_id=quiz_id)
+        assert take.get_stored_results() == (2, 1, 0, 50)
+
+    def test_clear(self):
+        """Test clear view
+
+        On get it clears saved quiz answers and redirects to quiz"""
+        # there's probably a room for improvement in this test too
+        quiz_id = 2
+        clear_link = reverse('exam:clear', kwargs={'quiz_id': quiz_id})
+        request = self.factory.get(clear_link)
+        request.user = self.user
+        response = views.ClearAnswersView.as_view()(request, quiz_id)
+        self.assertEqual(response.status_code, 302)
+        # makes sense to add take for quiz and check that it is indeed deleted
+
+
+class LoginRequiredTests(TestCase):
+    """Tests for certain views which require login"""
+
+    def _get_login_url(self, initial_url=None):
+        """Get expected redirect login url"""
+        login_url = settings.LOGIN_URL  # not sure if it's a correct way
+        # to get the default login url
+        retval = (
+            '{}?next={}'.format(login_url, initial_url)
+            if initial_url
+            else login_url
+        )
+        return retval
+
+    def _test_login_required(self, url):
+        """Parametrized helper test"""
+        response = self.client.get(url)
+        expected_url = self._get_login_url(url)
+        self.assertRedirects(
+            response=response,
+            expected_url=expected_url,
+            status_code=302,
+            target_status_code=200)
+
+    def test_login_required(self):
+        """Test that views which require login, can't be accessed without it"""
+        self._test_login_required(reverse('exam:index'))
+        self._test_login_required(reverse('exam:dashboard'))
+        self._test_login_required(reverse('exam:quiz', kwargs={'quiz_id': 1}))
+        self._test_login_required(reverse('exam:clear', kwargs={'quiz_id': 1}))
@@ -0,0 +1,447 @@
+"""Exam app quiz content import/export
+
+Quiz content is transferred as a stream of question records, every record
+is quiz name, question text, a list of (option text, is correct) pairs and
+question type along with its answer key, correct value and tolerance (see
+Question model). Two file formats are supported:
+    jsonl - one JSON object per line, i.e.
+        {"quiz": "name", "question": "text",
+         "options": [{"text": "option", "is_correct": true}, ...]}
+        optionally with "type", "correct_value" and "tolerance" keys,
+        those are written only if they differ from single choice defaults
+    csv - one row per option with quiz, question, question_type,
+        correct_value, tolerance, option, is_correct columns, consecutive
+        rows of the same quiz and question make a single question, the
+        question type columns are optional, taken from the first row
+
+Both readers and writers work on iterators, so files of any size are
+processed with bounded memory.
+
+Upserting into an existing quiz keeps its questions, those are matched by
+text and updated in place, so answers to them and takes in progress stay
+as they are. Only questions missing from the file are deleted.
+"""
+import csv
+import itertools
+import json
+from collections import OrderedDict, namedtuple
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .content import bump_quiz_version
+from .models import Quiz, Question, Option
+from .stats import ensure_rows
+
+
+FORMAT_JSONL = 'jsonl'
+FORMAT_CSV = 'csv'
+FORMATS = (FORMAT_JSONL, FORMAT_CSV)
+
+CSV_COLUMNS = ('quiz', 'question', 'option', 'is_correct')
+CSV_QUESTION_COLUMNS = ('question_type', 'correct_value', 'tolerance')
+CSV_HEADER = CSV_COLUMNS[:2] + CSV_QUESTION_COLUMNS + CSV_COLUMNS[2:]
+
+MODE_CREATE = 'create'
+MODE_UPSERT = 'upsert'
+MODES = (MODE_CREATE, MODE_UPSERT)
+
+
+class TransferError(Exception):
+    """Malformed file or content, which can't be imported"""
+
+
+class QuestionRecord(namedtuple(
+        'QuestionRecord',
+        'quiz question options question_type correct_value tolerance')):
+    """Question with its options, question type defaults to single choice"""
+    __slots__ = ()
+
+    def __new__(  # pylint: disable = too-many-arguments
+            cls, quiz, question, options, question_type=Question.RADIO,
+            correct_value=None, tolerance=0):
+        if question_type not in dict(Question.TYPES):
+            raise TransferError(
+                'Unknown question type: {!r}'.format(question_type))
+        return super().__new__(
+            cls, quiz, question, options, question_type, correct_value,
+            tolerance)
+
+
+def guess_format(path):
+    """Guess file format by its name, jsonl if not obvious"""
+    return FORMAT_CSV if path.lower().endswith('.csv') else FORMAT_JSONL
+
+
+def add_output_argument(parser):
+    """Add output file option to an export management command parser"""
+    parser.add_argument(
+        '--output',
+        default='-',
+        help='File to export to, "-" (default) for stdout',
+    )
+
+
+def add_format_argument(parser):
+    """Add file format option to a management command parser"""
+    parser.add_argument(
+        '--format',
+        choices=FORMATS,
+        help='File format, guessed by file extension by default',
+    )
+
+
+def _parse_bool(value):
+    """Parse csv boolean"""
+    value = value.strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no', ''):
+        return False
+    raise TransferError('Not a boolean: {!r}'.format(value))
+
+
+def _parse_float(value, default=None):
+    """Parse csv number, default if empty"""
+    value = value.strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError as error:
+        raise TransferError('Not a number: {!r}'.format(value)) from error
+
+
+def _format_float(value):
+    """Csv value of a nullable number"""
+    return '' if value is None else repr(value)
+
+
+def read_jsonl(lines):
+    """Yield question records out of JSON lines"""
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            yield QuestionRecord(
+                data['quiz'],
+                data['question'],
+                [
+                    (option['text'], bool(option['is_correct']))
+                    for option in data.get('options', ())
+                ],
+                data.get('type', Question.RADIO),
+                (
+                    None
+                    if data.get('correct_value') is None
+                    else float(data['correct_value'])
+                ),
+                float(data.get('tolerance', 0)),
+            )
+        except (ValueError, KeyError, TypeError) as error:
+            raise TransferError(
+                'Line {}: {}'.format(line_number, error)) from error
+
+
+def read_csv(lines):
+    """Yield question records out of csv rows"""
+    reader = csv.DictReader(lines)
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise TransferError('Missing columns: {}'.format(
+            ', '.join(sorted(missing))))
+    for (quiz, question), rows in itertools.groupby(
+            reader, key=lambda row: (row['quiz'], row['question'])):
+        rows = list(rows)
+        yield QuestionRecord(
+            quiz,
+            question,
+            [
+                (row['option'], _parse_bool(row['is_correct']))
+                for row in rows
+                if row['option']  # question without options
+            ],
+            rows[0].get('question_type') or Question.RADIO,
+            _parse_float(rows[0].get('correct_value') or ''),
+            _parse_float(rows[0].get('tolerance') or '', 0),
+        )
+
+
+READERS = {
+    FORMAT_JSONL: read_jsonl,
+    FORMAT_CSV: read_csv,
+}
+
+
+def write_jsonl(records, output):
+    """Write question records as JSON lines"""
+    for record in records:
+        data = OrderedDict((
+            ('quiz', record.quiz),
+            ('question', record.question),
+        ))
+        if record.question_type != Question.RADIO:
+            data['type'] = record.question_type
+        if record.correct_value is not None:
+            data['correct_value'] = record.correct_value
+        if record.tolerance:
+            data['tolerance'] = record.tolerance
+        data['options'] = [
+            {'text': text, 'is_correct': is_correct}
+            for text, is_correct in record.options
+        ]
+        output.write(json.dumps(data) + '\n')
+
+
+def write_csv(records, output):
+    """Write question records as csv rows"""
+    writer = csv.writer(output)
+    writer.writerow(CSV_HEADER)
+    for record in records:
+        question = (
+            record.quiz,
+            record.question,
+            record.question_type,
+            _format_float(record.correct_value),
+            _format_float(record.tolerance),
+        )
+        if not record.options:
+            writer.writerow(question + ('', ''))
+        for text, is_correct in record.options:
+            writer.writerow(question + (text, int(is_correct)))
+
+
+WRITERS = {
+    FORMAT_JSONL: write_jsonl,
+    FORMAT_CSV: write_csv,
+}
+
+
+def export_records(quiz_names=None):
+    """Yield question records of quizzes, all of them if no names given
+
+    Content is read by a single query, iterated with a server-side cursor
+    where supported, so whole quizzes are never held in memory"""
+    rows = Question.objects.order_by('quiz_id', 'pk', 'option__pk')
+    if quiz_names:
+        rows = rows.filter(quiz__name__in=quiz_names)
+    rows = rows.values_list(
+        'quiz__name',
+        'pk',
+        'question_text',
+        'question_type',
+        'correct_value',
+        'tolerance',
+        'option__option_text',
+        'option__is_correct',
+    ).iterator()
+    for question, question_rows in itertools.groupby(
+            rows, key=lambda row: row[:6]):
+        yield QuestionRecord(
+            question[0],  # quiz name
+            question[2],  # question text, after its id
+            [
+                (option_text, is_correct)
+                for option_text, is_correct in (
+                    row[6:] for row in question_rows)
+                if option_text is not None  # question without options
+            ],
+            *question[3:]  # question type and its answer key
+        )
+
+
+class Importer:  # pylint: disable = too-few-public-methods
+    """Writes question records to the database in batches
+
+    Every batch is written by bulk_create in its own transaction, so memory
+    usage and transaction length do not depend on file size.
+    In create mode importing into an existing quiz is an error, in upsert
+    mode questions of an existing quiz with the same name are updated by
+    question text (see module docstring), options of those by option text"""
+
+    def __init__(self, mode=MODE_CREATE, batch_size=500):
+        if mode not in MODES:
+            raise ValueError('Unknown mode: {}'.format(mode))
+        if batch_size < 1:
+            raise ValueError('Batch size should be positive')
+        self.mode = mode
+        self.batch_size = batch_size
+        self.quiz_ids = {}  # imported quizzes by name
+        # upserted quizzes by id, ids of questions not matched yet by text
+        self.existing = {}
+        self.questions_amount = 0
+        self.options_amount = 0
+
+    def run(self, records):
+        """Import all records"""
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                self._import_batch(batch)
+        self._delete_unmatched()
+
+    def _get_quiz_id(self, name):
+        """Id of quiz by name, created or emptied on first encounter"""
+        if name in self.quiz_ids:
+            return self.quiz_ids[name]
+        quiz = Quiz.objects.filter(name=name).first()
+        if quiz is None:
+            quiz = Quiz.objects.create(name=name)
+        elif self.mode == MODE_UPSERT:
+            self.existing[quiz.pk] = self._get_existing_questions(quiz.pk)
+        else:
+            raise TransferError('Quiz {!r} already exists'.format(name))
+        self.quiz_ids[name] = quiz.pk
+        return quiz.pk
+
+    @staticmethod
+    def _get_existing_questions(quiz_id):
+        """Ids of questions of a quiz by question text, in id order"""
+        existing = {}
+        for question_id, text in (
+                Question.objects
+                .filter(quiz_id=quiz_id)
+                .order_by('pk')
+                .values_list('pk', 'question_text')
+                .iterator()):
+            existing.setdefault(text, []).append(question_id)
+        return existing
+
+    def _get_question(self, record):
+        """Question of a record, existing one of upserted quiz if matched"""
+        quiz_id = self._get_quiz_id(record.quiz)
+        matches = self.existing.get(quiz_id, {}).get(record.question)
+        return Question(
+            pk=matches.pop(0) if matches else None,
+            quiz_id=quiz_id,
+            question_text=record.question,
+            question_type=record.question_type,
+            correct_value=record.correct_value,
+            tolerance=record.tolerance,
+        )
+
+    @staticmethod
+    def _update_questions(questions):
+        """Update type and answer key of matched questions in place
+
+        Questions are updated by a single UPDATE per distinct answer key,
+        ones which have it already are left alone"""
+        keys = OrderedDict()  # question ids by type and answer key
+        for question in questions:
+            keys.setdefault(
+                (question.question_type, question.correct_value,
+                 question.tolerance),
+                [],
+            ).append(question.pk)
+        for (question_type, correct_value, tolerance), pks in keys.items():
+            fields = {
+                'question_type': question_type,
+                'correct_value': correct_value,
+                'tolerance': tolerance,
+            }
+            Question.objects.filter(pk__in=pks).exclude(**fields).update(
+                **fields)
+
+    def _delete_unmatched(self):
+        """Delete questions of upserted quizzes missing from records
+
+        Questions are deleted in batches, each by its own transaction"""
+        unmatched = [
+            pk
+            for existing in self.existing.values()
+            for pks in existing.values()
+            for pk in pks
+        ]
+        for start in range(0, len(unmatched), self.batch_size):
+            with transaction.atomic():
+                Question.objects.filter(
+                    pk__in=unmatched[start:start + self.batch_size],
+                ).delete()
+
+    @staticmethod
+    def _create_questions(questions):
+        """Bulk create questions, returns them with primary keys set"""
+        if connection.features.can_return_ids_from_bulk_insert:
+            return Question.objects.bulk_create(questions)
+        # primary keys are not returned, so fetch them back, rows are
+        # inserted in order and get increasing primary keys
+        last_pk = Question.objects.aggregate(last_pk=Max('pk'))['last_pk']
+        Question.objects.bulk_create(questions)
+        by_quiz = OrderedDict()
+        for question in questions:
+            by_quiz.setdefault(question.quiz_id, []).append(question)
+        for quiz_id, quiz_questions in by_quiz.items():
+            pks = (
+                Question.objects
+                .filter(quiz_id=quiz_id, pk__gt=last_pk or 0)
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            for question, question_pk in zip(quiz_questions, pks):
+                question.pk = question_pk
+        return questions
+
+    @staticmethod
+    def _sync_options(questions, records, matched):
+        """New options of the records, to be created
+
+        Existing options of matched questions are matched by text, their
+        correctness is updated in place, ones missing from records are
+        deleted"""
+        existing = {}  # question id -> options by text
+        for option in (
+                Option.objects
+                .filter(question_id__in=matched)
+                .order_by('pk')):
+            existing.setdefault(option.question_id, {}).setdefault(
+                option.option_text, []).append(option)
+        created = []
+        changed = {True: [], False: []}  # option ids by new correctness
+        for question, record in zip(questions, records):
+            by_text = existing.get(question.pk, {})
+            for text, is_correct in record.options:
+                if by_text.get(text):
+                    option = by_text[text].pop(0)
+                    if option.is_correct != is_correct:
+                        changed[is_correct].append(option.pk)
+                else:
+                    created.append(Option(
+                        question_id=question.pk,
+                        option_text=text,
+                        is_correct=is_correct,
+                    ))
+        for is_correct, pks in changed.items():
+            if pks:
+                Option.objects.filter(pk__in=pks).update(
+                    is_correct=is_correct)
+        stale = [
+            option.pk
+            for by_text in existing.values()
+            for options in by_text.values()
+            for option in options
+        ]
+        if stale:
+            Option.objects.filter(pk__in=stale).delete()
+        return created
+
+    def _import_batch(self, batch):
+        """Import one batch of records"""
+        questions = [self._get_question(record) for record in batch]
+        matched = [
+            question.pk for question in questions if question.pk is not None]
+        self._update_questions(
+            [question for question in questions if question.pk is not None])
+        self._create_questions(
+            [question for question in questions if question.pk is None])
+        options = self._sync_options(questions, batch, matched)
+        Option.objects.bulk_create(options)
+        self.questions_amount += len(questions)
+        self.options_amount += sum(len(record.options) for record in batch)
+        for quiz_id in {question.quiz_id for question in questions}:
+            # bulk create sends no signals
+            bump_quiz_version(quiz_id)
+            ensure_rows(quiz_id)
@@ -1,15 +1,24 @@
 """Exam app urls"""
 from django.conf.urls import url
 
-from quiz.apps.exam import views
+from quiz.apps.exam import api, views
 
 
 app_name = 'exam'  # pylint: disable = invalid-name
 
 urlpatterns = [
     url(r'^$', views.IndexView.as_view(), name='index'),
+    url(r'^my/$', views.DashboardView.as_view(), name='dashboard'),
     url(r'^(?P<quiz_id>\d+)/$',
         views.QuizView.as_view(), name='quiz'),
     url(r'^(?P<quiz_id>\d+)/clear/$',
         views.ClearAnswersView.as_view(), name='clear'),
+    url(r'^(?P<quiz_id>\d+)/leaderboard/$',
+        views.LeaderboardView.as_view(), name='leaderboard'),
+    url(r'^(?P<quiz_id>\d+)/stats/$',
+        views.QuizStatsView.as_view(), name='stats'),
+    url(r'^api/(?P<quiz_id>\d+)/$',
+        api.QuizApiView.as_view(), name='api_quiz'),
+    url(r'^api/(?P<quiz_id>\d+)/answers/$',
+        api.AnswersApiView.as_view(), name='api_answers'),
 ]
@@ -1,10 +1,24 @@
 """Exam app views"""
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import render, redirect, get_object_or_404
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponse
+from django.shortcuts import render, redirect
+from django.utils import timezone
 from django.views import View
 
-from .forms import RadioQuestionForm
-from .models import Quiz, Take, Answer
+from . import deadlines, fragments, ingest, leaderboard
+from .content import get_catalogue_page, get_compiled_quiz_or_404
+from .forms import get_question_form
+from .models import Take
+from .stats import get_quiz_summary
+
+
+DashboardTake = namedtuple(
+    'DashboardTake',
+    'id quiz_id quiz_name attempt answered total score status',
+)
 
 
 class GenericQuizView(LoginRequiredMixin, View):
@@ -17,26 +31,195 @@ class GenericQuizView(LoginRequiredMixin, View):
     LINK_QUIZ = 'exam:quiz'
 
     @staticmethod
-    def get_take(request, quiz_id):
+    def get_quiz(quiz_id):
+        """Returns compiled (cached) content of current quiz"""
+        return get_compiled_quiz_or_404(quiz_id)
+
+    @classmethod
+    def get_take(cls, request, quiz_id, quiz=None):
         """Returns take for current user, current quiz"""
         user = request.user
-        quiz = get_object_or_404(Quiz, pk=quiz_id)
+        quiz = quiz or cls.get_quiz(quiz_id)
         take = Take.get_or_create(user=user, quiz=quiz)
         return take
 
+    @staticmethod
+    def is_ingesting():
+        """Are answers written through the ingestion queue"""
+        return getattr(settings, 'EXAM_ANSWER_INGEST', False)
+
+    @classmethod
+    def get_pending(cls, request, quiz):
+        """Ids of questions with answers waiting in the ingestion queue
+
+        Should be called before the take is read, see ingest module"""
+        if not cls.is_ingesting():
+            return frozenset()
+        return ingest.answer_queue.get_pending(request.user.pk, quiz.id)
+
+    @classmethod
+    def sync_pending(cls, request, quiz_id):
+        """Write answers waiting in the ingestion queue right away
+
+        Needed before anything relying on stored answers or progress.
+        Returns True if there was anything to write"""
+        if not cls.is_ingesting():
+            return False
+        quiz_id = int(quiz_id)
+        if not ingest.answer_queue.get_pending(request.user.pk, quiz_id):
+            return False
+        ingest.answer_queue.sync(request.user.pk, quiz_id)
+        return True
+
+    @classmethod
+    def finalize_if_expired(cls, request, quiz_id, take):
+        """Finalize take in progress if its deadline has passed
+
+        Deadline is read along with the take, so that's free unless it has
+        passed. Answers waiting in the ingestion queue were submitted
+        before, they are written first. Returns True if take is finalized"""
+        if take.current_question_id is None or not take.is_expired():
+            return False
+        cls.sync_pending(request, quiz_id)
+        deadlines.finalize([take.pk])
+        take.refresh_from_db(fields=Take.PROGRESS_FIELDS)
+        return True
+
 
 class IndexView(GenericQuizView):
-    """Simply displays list of links to all available quizzes"""
-    # might make sense to make it a generic list view
+    """Displays paginated list of links to available quizzes
+
+    Pages are cached and fetched by quiz id (keyset pagination), so deep
+    pages are as cheap as the first one. User progress in listed quizzes
+    is fetched by a single query per page"""
+    PAGE_SIZE = 50
+    PARAM_SEARCH = 'q'
+    PARAM_BEFORE = 'before'
+
+    @staticmethod
+    def get_progress(user, quizzes):
+        """Progress of the user in quizzes, by quiz id
+
+        Progress is either 'completed' or 'answered/total' string, of the
+        latest attempt"""
+        takes = Take.objects.filter(
+            user=user,
+            quiz_id__in=[quiz.id for quiz in quizzes],
+        ).order_by('attempt').values_list(
+            'quiz_id',
+            'answered_count',
+            'questions_count',
+            'current_question_id',
+        )
+        return {
+            quiz_id: (
+                '{}/{}'.format(answered, total)
+                if current_question_id
+                else 'completed'
+            )
+            for quiz_id, answered, total, current_question_id in takes
+        }
+
     def get(self, request):
         """Process get request"""
-        quizzes = Quiz.objects.order_by('-pk')
+        search = request.GET.get(self.PARAM_SEARCH, '').strip()
+        try:
+            before = int(request.GET[self.PARAM_BEFORE])
+        except (KeyError, ValueError):
+            before = None
+        quizzes, next_before = get_catalogue_page(
+            search=search,
+            before=before,
+            size=self.PAGE_SIZE,
+        )
+        progress = self.get_progress(request.user, quizzes)
         context = {
-            'quizzes': quizzes,
+            'quizzes': [
+                (quiz, progress.get(quiz.id))
+                for quiz in quizzes
+            ],
+            'search': search,
+            'next_before': next_before,
+            'is_first_page': before is None,
         }
         return render(request, self.TEMPLATE_INDEX, context)
 
 
+class DashboardView(GenericQuizView):
+    """Displays every take of the user with its progress and score
+
+    Progress is stored in takes (see Take), so a page is a single query,
+    an index range scan of takes of the user by id (keyset pagination),
+    whatever amount of quizzes, attempts and answers"""
+    TEMPLATE_DASHBOARD = 'exam/dashboard.html'
+    PAGE_SIZE = 50
+    PARAM_BEFORE = 'before'
+    COMPLETED = 'completed'
+    IN_PROGRESS = 'in progress'
+    EXPIRED = 'time is up'
+
+    @classmethod
+    def get_status(cls, take, now):
+        """Status of a take out of its stored progress"""
+        if take.current_question_id is not None:
+            return cls.EXPIRED if take.is_expired(now) else cls.IN_PROGRESS
+        if (take.deadline is not None
+                and take.answered_count < take.questions_count):
+            return cls.EXPIRED  # finalized after the deadline
+        return cls.COMPLETED
+
+    @classmethod
+    def get_takes(cls, user, before=None, size=50):
+        """Page of takes of the user, latest first, out of a single query
+
+        Returns list of dashboard takes and value of before for the next
+        page, None if it is the last one"""
+        takes = (
+            Take.objects
+            .filter(user=user)
+            .select_related('quiz')
+            .only(
+                'quiz', 'quiz__name', 'attempt', 'deadline',
+                *Take.PROGRESS_FIELDS
+            )
+            .order_by('-pk')
+        )
+        if before is not None:
+            takes = takes.filter(pk__lt=before)
+        takes = list(takes[:size + 1])
+        next_before = takes[size - 1].pk if len(takes) > size else None
+        now = timezone.now()
+        retval = []
+        for take in takes[:size]:
+            total, _, _, percentage_correct = take.get_stored_results()
+            retval.append(DashboardTake(
+                id=take.pk,
+                quiz_id=take.quiz_id,
+                quiz_name=take.quiz.name,
+                attempt=take.attempt,
+                answered=take.answered_count,
+                total=total,
+                score=percentage_correct,
+                status=cls.get_status(take, now),
+            ))
+        return retval, next_before
+
+    def get(self, request):
+        """Process get request"""
+        try:
+            before = int(request.GET[self.PARAM_BEFORE])
+        except (KeyError, ValueError):
+            before = None
+        takes, next_before = self.get_takes(
+            request.user, before, self.PAGE_SIZE)
+        context = {
+            'takes': takes,
+            'next_before': next_before,
+            'is_first_page': before is None,
+        }
+        return render(request, self.TEMPLATE_DASHBOARD, context)
+
+
 class QuizView(GenericQuizView):
     """Displays unanswered question, if any left, results otherwise.
 
@@ -47,13 +230,18 @@ class QuizView(GenericQuizView):
     """
 
     @classmethod
-    def process_question_render(cls, request, quiz_id, current_question):
-        """Collect context and process question page render"""
+    def process_question_render(
+            cls, request, quiz, current_question, deadline=None):
+        """Collect context and process question page render
+
+        Question form is rendered once per quiz content version, see
+        fragments module"""
         # might make sense to check if question has no options
-        form = RadioQuestionForm(current_question)
         context = {
-            'quiz_id': quiz_id,
-            'form': form,
+            'quiz_id': quiz.id,
+            'question_form': fragments.get_question_form(
+                request, quiz, current_question),
+            'deadline': deadline,
         }
         retval = render(request, cls.TEMPLATE_QUESTION, context)
         return retval
@@ -66,65 +254,148 @@ class QuizView(GenericQuizView):
             correct_questions_amount,
             incorrect_questions_amount,
             percentage_correct,
-        ) = take.get_quiz_results()
+        ) = take.get_stored_results()
         context = {
             'right_answers': correct_questions_amount,
             'wrong_answers': incorrect_questions_amount,
             'right_percentage': percentage_correct,
             'total_questions': total_questions_amount,
             'quiz_id': quiz_id,
+            'attempt': take.attempt,
+            'previous_results': take.get_previous_results(),
+            'expired': (
+                take.deadline is not None
+                and take.answered_count < take.questions_count
+            ),
         }
         retval = render(request, cls.TEMPLATE_RESULTS, context)
         return retval
 
+    @classmethod
+    def process_busy_render(cls):
+        """Answer was not accepted, ingestion queue is full"""
+        retval = HttpResponse(
+            'Too many answers are being submitted, please try again.',
+            status=503,
+        )
+        retval['Retry-After'] = '1'
+        return retval
+
+    @classmethod
+    def save_answer(cls, quiz, take, current_question, response):
+        """Save graded answer, or queue it if ingestion is enabled
+
+        Returns False if the ingestion queue is full"""
+        is_correct = quiz.grade(current_question.id, response)
+        if cls.is_ingesting():
+            try:
+                ingest.answer_queue.submit(
+                    take, current_question.id, response, is_correct)
+            except ingest.QueueFull:
+                return False
+        else:
+            take.record_answers([(current_question.id, response, is_correct)])
+        return True
+
     def get(self, request, quiz_id):
         """Process get request"""
-        take = self.get_take(request, quiz_id)
+        quiz = self.get_quiz(quiz_id)
+        pending = self.get_pending(request, quiz)
+        take = self.get_take(request, quiz_id, quiz)
+        if self.finalize_if_expired(request, quiz_id, take):
+            pending = frozenset()
 
-        current_question = take.get_current_question()
+        current_question = quiz.get_question(
+            ingest.get_current_question_id(take, pending))
 
         if current_question:
             retval = self.process_question_render(
-                request, quiz_id, current_question)
+                request, quiz, current_question, take.deadline)
         else:
+            if self.sync_pending(request, quiz_id):
+                take.refresh_from_db(fields=Take.PROGRESS_FIELDS)
             retval = self.process_results_render(request, quiz_id, take)
         return retval
 
     def post(self, request, quiz_id):
         """Process post request"""
-        take = self.get_take(request, quiz_id)
+        quiz = self.get_quiz(quiz_id)
+        pending = self.get_pending(request, quiz)
+        take = self.get_take(request, quiz_id, quiz)
+        if self.finalize_if_expired(request, quiz_id, take):
+            # answer came too late, results are shown instead
+            return redirect(self.LINK_QUIZ, quiz_id=quiz_id)
 
-        current_question = take.get_current_question()
+        current_question = quiz.get_question(
+            ingest.get_current_question_id(take, pending))
         if not current_question:
             # this should not happen, unless somebody doing some hacking
             return redirect(self.LINK_QUIZ, quiz_id=quiz_id)
 
-        form = RadioQuestionForm(current_question, request.POST)
+        form = get_question_form(current_question, request.POST)
         if form.is_valid():
-            chosen_option = form.get_chosen_option()
-            answer = Answer(
-                take=take,
-                question=current_question,
-                chosen_option=chosen_option,
-            )
-            answer.save()
-            retval = redirect(self.LINK_QUIZ, quiz_id=quiz_id)
+            if self.save_answer(
+                    quiz, take, current_question, form.get_response()):
+                retval = redirect(self.LINK_QUIZ, quiz_id=quiz_id)
+            else:
+                retval = self.process_busy_render()
         else:
             context = {
                 'quiz_id': quiz_id,
                 'form': form,
+                'deadline': take.deadline,
             }
             retval = render(request, self.TEMPLATE_QUESTION, context)
         return retval
 
 
 class ClearAnswersView(GenericQuizView):
-    """Clear results/info about answered questions
+    """Start a new attempt, allowing to take quiz again
 
-    Wipes info about already answered questions, allowing to take quiz again"""
+    Previous attempt with its answers is kept for history and statistics,
+    so nothing is deleted here, see attempts module"""
     def get(self, request, quiz_id):
         """Process get request"""
-        take = self.get_take(request, quiz_id)
-        take.delete()
+        self.sync_pending(request, quiz_id)
+        quiz = self.get_quiz(quiz_id)
+        take = self.get_take(request, quiz_id, quiz)
+        take.retake(quiz)
         retval = redirect(self.LINK_QUIZ, quiz_id=quiz_id)
         return retval
+
+
+class LeaderboardView(GenericQuizView):
+    """Displays top scores of a quiz and standing of the user"""
+    TEMPLATE_LEADERBOARD = 'exam/leaderboard.html'
+    SIZE = 10
+
+    def get(self, request, quiz_id):
+        """Process get request"""
+        quiz = self.get_quiz(quiz_id)
+        context = {
+            'quiz': quiz,
+            'leaderboard': leaderboard.get_leaderboard(
+                quiz.id, request.user, self.SIZE),
+        }
+        return render(request, self.TEMPLATE_LEADERBOARD, context)
+
+
+class QuizStatsView(UserPassesTestMixin, View):
+    """Displays statistics of a quiz, for staff only
+
+    Statistics are read out of materialized aggregates and indexes, see
+    stats module"""
+    TEMPLATE_STATS = 'exam/stats.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, quiz_id):
+        """Process get request"""
+        quiz = get_compiled_quiz_or_404(quiz_id)
+        context = {
+            'quiz': quiz,
+            'stats': get_quiz_summary(quiz.id),
+            'pass_score': getattr(settings, 'EXAM_PASS_PERCENTAGE', 50),
+        }
+        return render(request, self.TEMPLATE_STATS, context)
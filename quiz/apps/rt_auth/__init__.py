@@ -1 +1,3 @@
 """This is an app that provides auth features"""
+
+default_app_config = 'quiz.apps.rt_auth.apps.AuthConfig'  # pylint: disable=C0103
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 
 class AuthConfig(AppConfig):
     """Custom auth app config"""
-    name = 'rt_auth'
+    name = 'quiz.apps.rt_auth'
+    label = 'rt_auth'
+
+    def ready(self):
+        from . import signals  # pylint: disable = unused-variable
@@ -0,0 +1,91 @@
+"""Custom auth app authentication backends
+
+AuthenticationMiddleware loads request user by id from the session on every
+request. CachedModelBackend keeps recently loaded users in a short lived
+per process cache, so together with cache or signed cookie sessions an
+authenticated request costs no auth queries at all.
+
+Cached users are dropped on logout and on any save of the user (password
+change included) by signals of this app, but only in the process where it
+happened, other processes see the change once AUTH_USER_CACHE_TTL expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import router
+
+
+class UserCache:
+    """Thread safe cache of user field values with expiration"""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """New user instance out of cached values, None if missing"""
+        with self._lock:
+            cached = self._data.get(user_id)
+            if cached is None:
+                return None
+            expires, database, values = cached
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+        user_model = get_user_model()
+        # instance per request, cached one could be modified by views
+        return user_model.from_db(database, self._get_attnames(), values)
+
+    def set(self, user):
+        """Cache user, evicting the oldest ones if full"""
+        values = tuple(getattr(user, name) for name in self._get_attnames())
+        # database the user was loaded from
+        database = router.db_for_read(type(user), instance=user)
+        cached = time.monotonic() + self.ttl, database, values
+        with self._lock:
+            self._data.pop(user.pk, None)
+            self._data[user.pk] = cached
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, user_id):
+        """Drop user from the cache"""
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        """Drop everything"""
+        with self._lock:
+            self._data.clear()
+
+    @staticmethod
+    def _get_attnames():
+        return [
+            field.attname
+            for field in get_user_model()._meta.concrete_fields
+        ]
+
+
+user_cache = UserCache(  # pylint: disable = invalid-name
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend which loads session users through user_cache"""
+
+    def get_user(self, user_id):
+        user = user_cache.get(user_id)
+        if user is None:
+            # inactive users are not returned, so never cached
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache.set(user)
+        return user
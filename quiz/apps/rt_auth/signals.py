@@ -0,0 +1,26 @@
+"""Custom auth app signals
+
+Drop users from the per process user cache once they are stale"""
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .backends import user_cache
+
+
+# pylint: disable = unused-argument
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    """User logged out, i.e. through LogoutView"""
+    if user is not None:
+        user_cache.delete(user.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """User was changed, i.e. password, permissions or active flag"""
+    user_cache.delete(instance.pk)
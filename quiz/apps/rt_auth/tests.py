@@ -0,0 +1,72 @@
+"""Custom auth app tests"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from quiz.apps.exam.models import Quiz
+
+from .backends import user_cache
+
+
+# pylint: disable = no-self-use
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cache',
+    AUTHENTICATION_BACKENDS=['quiz.apps.rt_auth.backends.CachedModelBackend'],
+)
+class FastAuthTests(TestCase):
+    """Cached session and user tests"""
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            'whatever', password='whatever_very_secure_pass')
+        self.client.force_login(self.user)
+
+    def test_no_auth_queries(self):
+        """Authenticated request costs a single query, the view's one"""
+        Quiz.objects.create(name='whatever')
+        self.client.get(reverse('exam:index'))
+        with self.assertNumQueries(1):  # progress in listed quizzes
+            response = self.client.get(reverse('exam:index'))
+        assert response.status_code == 200
+        assert response.context['user'] == self.user
+
+    def test_instances(self):
+        """Each request gets its own user instance"""
+        self.client.get(reverse('exam:index'))
+        first = user_cache.get(self.user.pk)
+        first.username = 'changed'
+        assert user_cache.get(self.user.pk).username == 'whatever'
+        assert user_cache.get(self.user.pk) is not first
+
+    def test_logout(self):
+        """User is dropped from the cache on logout"""
+        self.client.get(reverse('exam:index'))
+        assert user_cache.get(self.user.pk) is not None
+        self.client.get(reverse('logout'))
+        assert user_cache.get(self.user.pk) is None
+
+    def test_password_change(self):
+        """User is dropped from the cache on password change"""
+        self.client.get(reverse('exam:index'))
+        self.user.set_password('whatever_other_very_secure_pass')
+        self.user.save()
+        assert user_cache.get(self.user.pk) is None
+        # session of old password is not valid anymore
+        response = self.client.get(reverse('exam:index'))
+        assert response.status_code == 302
+
+    def test_expiration(self):
+        """Users are cached for a limited time"""
+        self.client.get(reverse('exam:index'))
+        ttl = user_cache.ttl
+        user_cache.ttl = -1
+        try:
+            user_cache.set(self.user)
+        finally:
+            user_cache.ttl = ttl
+        assert user_cache.get(self.user.pk) is None
@@ -0,0 +1,22 @@
+"""
+ASGI config for quiz project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+which serves the WSGI application in a thread pool of ASGI_THREADS size, see
+quiz.asgi_handler. Run with any ASGI server, i.e.:
+    uvicorn quiz.asgi:application
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from quiz.asgi_handler import WsgiToAsgi
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "quiz.settings")
+
+application = WsgiToAsgi(  # pylint: disable = invalid-name
+    get_wsgi_application(),
+    max_workers=settings.ASGI_THREADS,
+)
@@ -0,0 +1,203 @@
+"""WSGI to ASGI adapter
+
+Django 1.11 has neither an ASGI handler nor an async ORM, so the project
+is served under ASGI servers by running the regular WSGI application in a
+bounded thread pool. The event loop holds connections of all clients (slow
+uploads, keep-alive, clients waiting for a free thread) and only requests
+which are actually being processed occupy a thread and its database
+connection.
+
+Each request is processed entirely in a single pool thread, from calling
+the WSGI application to closing its response, since django database
+connections are thread local and are cleaned up on request finish.
+
+Response messages are passed from the thread to the event loop through a
+bounded queue, the thread waits for space in it, so a slow client holds
+back its response instead of it piling up in memory. Once the client
+disconnects, the response is not iterated any further and is closed.
+"""
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def build_environ(scope, body):
+    """WSGI environ out of ASGI http scope and complete request body"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI strings are latin-1 decoded bytes, ASGI paths are unicode
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = 'HTTP_' + name
+        if key in environ:
+            value = environ[key] + ',' + value
+        environ[key] = value
+    # body is already read completely
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+class ClientDisconnected(Exception):
+    """Client is gone, response is not sent anymore"""
+
+
+async def wait_disconnect(receive):
+    """Return once client disconnects, the request is read already"""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def read_body(receive):
+    """Complete request body, None if client disconnected"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+class WsgiToAsgi:
+    """ASGI 3 application serving WSGI one, see module docstring"""
+
+    def __init__(self, wsgi_application, max_workers=None, queue_size=8):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.queue_size = queue_size  # response messages, per request
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError('Unsupported scope type {}'.format(scope['type']))
+
+    async def lifespan(self, receive, send):
+        """Nothing to do on startup, thread pool is dropped on shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        """Process http request in the thread pool"""
+        body = await read_body(receive)
+        if body is None:
+            return
+        environ = build_environ(scope, body)
+        loop = asyncio.get_event_loop()
+        messages = asyncio.Queue(maxsize=self.queue_size)
+        disconnected = threading.Event()
+
+        def put(message):
+            """Queue message from the thread, waits while the queue is full
+
+            Raises ClientDisconnected once the client is gone, but the
+            final None is always queued"""
+            if message is not None and disconnected.is_set():
+                raise ClientDisconnected
+            asyncio.run_coroutine_threadsafe(
+                messages.put(message), loop).result()
+
+        job = loop.run_in_executor(self.executor, self.run, environ, put)
+        disconnect = asyncio.ensure_future(wait_disconnect(receive))
+        try:
+            while True:
+                message = asyncio.ensure_future(messages.get())
+                await asyncio.wait(
+                    (message, disconnect),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect.done():
+                    disconnected.set()
+                    if message.cancel() or message.result() is not None:
+                        # let the thread put what it waits with, till None
+                        while await messages.get() is not None:
+                            pass
+                    break
+                if message.result() is None:
+                    break
+                await send(message.result())
+        finally:
+            disconnect.cancel()
+        await job  # propagates exceptions of the application
+
+    def run(self, environ, put):
+        """Run WSGI application, put ASGI messages, None when done
+
+        Response is not iterated any further once the client is gone"""
+        response_start = {}
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            """WSGI start response, headers are sent with the first chunk"""
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start.update({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            })
+            return write
+
+        def write(chunk, more_body=True):
+            """Put response body chunk, along with headers if first one"""
+            if not started:
+                put(response_start)
+                started.append(True)
+            put({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': more_body,
+            })
+
+        try:
+            iterable = self.wsgi_application(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if chunk:
+                        write(chunk)
+                write(b'', more_body=False)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        except ClientDisconnected:
+            pass
+        finally:
+            put(None)
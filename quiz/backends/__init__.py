@@ -0,0 +1,38 @@
+"""Database backends of quiz project
+
+Django backends, extended for production use, see
+quiz.settings_production_db:
+* quiz.backends.sqlite3 - sets pragmas on every new connection
+* quiz.backends.postgresql - checks persistent connections before reuse
+"""
+
+
+class HealthChecksMixin:
+    """Checks persistent connection before its reuse by a request
+
+    With CONN_MAX_AGE connections outlive requests, and a connection broken
+    in between (database restart, pooler or firewall dropping idle ones)
+    fails the next request using it, since django checks connections only
+    after errors. With CONN_HEALTH_CHECKS enabled in database settings, a
+    reused connection is checked right before the first query of each
+    request, and replaced if it is not usable anymore. Requests not using
+    the database cost nothing."""
+    health_check_pending = False
+
+    def close_if_unusable_or_obsolete(self):
+        """Close broken or expired connection, schedule a health check
+
+        Called at start and end of every request"""
+        super().close_if_unusable_or_obsolete()
+        self.health_check_pending = (
+            self.connection is not None
+            and self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        )
+
+    def ensure_connection(self):
+        """Connect if not connected, replace connection failing the check"""
+        if self.health_check_pending:
+            self.health_check_pending = False
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,16 @@
+"""PostgreSQL backend with health checks of persistent connections
+
+See quiz.backends.HealthChecksMixin, needs psycopg2 installed.
+"""
+from django.db.backends.postgresql import base
+
+from quiz.backends import HealthChecksMixin
+
+
+class DatabaseWrapper(  # pylint: disable = abstract-method
+        HealthChecksMixin, base.DatabaseWrapper):
+    """PostgreSQL database wrapper, checks connections before reuse
+
+    Starting a transaction under autocommit is left abstract, same as by
+    django one, it is needed only by backends which can't turn autocommit
+    off (see autocommits_when_autocommit_is_off feature), like SQLite"""
@@ -0,0 +1,25 @@
+"""SQLite backend with per connection pragmas
+
+Same as django one, but executes PRAGMA statements out of 'pragmas' of
+database OPTIONS, name -> value, on every new connection. Pragmas like
+busy_timeout and mmap_size are not stored in the database file, so they
+have to be set this way.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite database wrapper, sets pragmas of new connections"""
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # not an argument of sqlite3.connect
+        kwargs.pop('pragmas', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            conn.execute('PRAGMA {} = {}'.format(name, value))
+        return conn
@@ -0,0 +1,200 @@
+"""Request level SQL and latency instrumentation
+
+RequestStatsMiddleware measures every request: amount of SQL queries,
+time spent in the database, duplicated queries (same SQL differing only by
+parameters, typical N+1 symptom) and app time. App time is the rest of
+request time, total time minus database time, so it is view logic,
+template rendering and inner middleware altogether, not rendering alone.
+Numbers are exposed as response headers and aggregated per view in
+in-process histograms, those can be dumped by staff through the request
+stats view.
+
+Instrumentation is opt-in, see REQUEST_STATS_* settings. It relies on
+django query logging, which formats every query, so on busy deployments
+REQUEST_STATS_SAMPLE_RATE should be used to measure only some requests.
+"""
+import bisect
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+HEADER_QUERIES = 'X-Query-Count'
+HEADER_DB_TIME = 'X-DB-Time-Ms'
+HEADER_APP_TIME = 'X-App-Time-Ms'  # total time minus database time
+HEADER_TOTAL_TIME = 'X-Total-Time-Ms'
+HEADER_DUPLICATES = 'X-Duplicate-Queries'
+
+# literals are replaced to find queries which differ only by parameters
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class Histogram:
+    """Histogram with fixed exponential buckets, cheap to record into"""
+    BOUNDS = (
+        1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # last one is overflow
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def record(self, value):
+        """Add value to the histogram"""
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def percentile(self, percent):
+        """Approximate percentile, upper bound of the bucket it falls in"""
+        if not self.count:
+            return 0
+        threshold = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(bound, self.maximum)
+        return self.maximum  # falls in the overflow bucket
+
+    def snapshot(self):
+        """Histogram summary as a dict"""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.maximum,
+            'buckets': dict(zip(
+                [str(bound) for bound in self.BOUNDS] + ['inf'],
+                self.counts,
+            )),
+        }
+
+
+class ViewStats:
+    """Aggregated measurements of a single view"""
+    METRICS = ('queries', 'db_time_ms', 'app_time_ms', 'total_time_ms')
+
+    def __init__(self):
+        self.histograms = {metric: Histogram() for metric in self.METRICS}
+        self.requests_with_duplicates = 0
+
+    def record(self, measurement):
+        """Add request measurement"""
+        for metric in self.METRICS:
+            self.histograms[metric].record(measurement[metric])
+        if measurement['duplicates']:
+            self.requests_with_duplicates += 1
+
+    def snapshot(self):
+        """View stats summary as a dict"""
+        retval = {
+            metric: histogram.snapshot()
+            for metric, histogram in self.histograms.items()
+        }
+        retval['requests_with_duplicates'] = self.requests_with_duplicates
+        return retval
+
+
+class StatsRegistry:
+    """Thread safe per view stats storage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, measurement):
+        """Add request measurement of a view"""
+        with self._lock:
+            if view_name not in self._views:
+                self._views[view_name] = ViewStats()
+            self._views[view_name].record(measurement)
+
+    def snapshot(self):
+        """Stats of all views as a dict"""
+        with self._lock:
+            return {
+                view_name: stats.snapshot()
+                for view_name, stats in sorted(self._views.items())
+            }
+
+    def reset(self):
+        """Drop everything collected so far"""
+        with self._lock:
+            self._views.clear()
+
+
+registry = StatsRegistry()  # pylint: disable = invalid-name
+
+
+def count_duplicates(queries):
+    """Amount of queries which repeat another one up to parameters"""
+    shapes = Counter(SQL_LITERALS.sub('?', sql) for sql in queries)
+    return sum(count - 1 for count in shapes.values())
+
+
+class RequestStatsMiddleware:  # pylint: disable = too-few-public-methods
+    """Measures requests, see module docstring"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_STATS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_STATS_SAMPLE_RATE', 1)
+        self.headers = getattr(settings, 'REQUEST_STATS_HEADERS', True)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        databases = connections.all()
+        forced = [connection.force_debug_cursor for connection in databases]
+        logged = [len(connection.queries_log) for connection in databases]
+        for connection in databases:
+            connection.force_debug_cursor = True
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            total_time = (time.perf_counter() - start) * 1000
+            queries = []
+            for connection, was_forced, already_logged in zip(
+                    databases, forced, logged):
+                connection.force_debug_cursor = was_forced
+                queries.extend(list(connection.queries_log)[already_logged:])
+
+        db_time = sum(float(query['time']) for query in queries) * 1000
+        measurement = {
+            'queries': len(queries),
+            'db_time_ms': db_time,
+            'app_time_ms': max(total_time - db_time, 0),
+            'total_time_ms': total_time,
+            'duplicates': count_duplicates(query['sql'] for query in queries),
+        }
+        registry.record(self.get_view_name(request), measurement)
+
+        if self.headers:
+            response[HEADER_QUERIES] = measurement['queries']
+            response[HEADER_DB_TIME] = '{:.2f}'.format(db_time)
+            response[HEADER_APP_TIME] = '{:.2f}'.format(
+                measurement['app_time_ms'])
+            response[HEADER_TOTAL_TIME] = '{:.2f}'.format(total_time)
+            response[HEADER_DUPLICATES] = measurement['duplicates']
+        return response
+
+    @staticmethod
+    def get_view_name(request):
+        """Name of the view which served the request, stats are kept by it"""
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else None
+        return view_name or 'unresolved'
@@ -0,0 +1,91 @@
+"""Database routers of quiz project
+
+ReplicaRouter sends reads of content models (quizzes, questions, options)
+to read replicas, listed in DATABASE_REPLICAS as aliases of DATABASES.
+Everything else (takes, answers, statistics) and all writes go to the
+primary, default database. Reads that follow writes have to see them
+(read your writes), while replicas lag behind, so:
+* once a thread writes anything, its reads go to the primary until the
+  end of the request (a management command or a background thread stays
+  pinned for good)
+* reads inside of a transaction on the primary go to the primary
+* reads of related objects go to the database their instance came from
+* reads with 'primary' hint go to the primary, e.g. those joining answers
+  or of content changed within replica lag (see quiz.apps.exam.content),
+  like Question.objects.db_manager(hints={'primary': True})
+
+With no replicas configured (the default) everything goes to the primary.
+See quiz.settings_replica for a local setup with two SQLite files.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_state = threading.local()  # pylint: disable = invalid-name
+
+
+def unpin(**kwargs):
+    """Let reads of the current thread go to replicas again"""
+    # pylint: disable = unused-argument
+    _state.pinned = False
+
+
+def is_pinned():
+    """Does the current thread read from the primary only"""
+    return getattr(_state, 'pinned', False)
+
+
+request_started.connect(unpin)
+
+
+def get_instance_db(instance):
+    """Database the model instance was read from or saved to, if any"""
+    return instance._state.db  # pylint: disable = protected-access
+
+
+class ReplicaRouter:
+    """Routes content reads to replicas, see module docstring"""
+
+    @staticmethod
+    def get_replicas():
+        """Aliases of replica databases"""
+        return getattr(settings, 'DATABASE_REPLICAS', ())
+
+    @staticmethod
+    def is_routed(model):
+        """Are reads of the model routed to replicas"""
+        return model._meta.label_lower in getattr(
+            settings, 'DATABASE_REPLICA_MODELS', ())
+
+    def db_for_read(self, model, **hints):
+        """Replica for content reads, unless primary is needed"""
+        replicas = self.get_replicas()
+        if not replicas or not self.is_routed(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and get_instance_db(instance):
+            return get_instance_db(instance)
+        if (hints.get('primary')
+                or is_pinned()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    @staticmethod
+    def db_for_write(model, **hints):
+        """Primary, reads of the thread stick to it from now on"""
+        # pylint: disable = unused-argument
+        _state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replicas contain the same data as the primary"""
+        # pylint: disable = unused-argument
+        databases = {DEFAULT_DB_ALIAS}.union(self.get_replicas())
+        if {get_instance_db(obj1), get_instance_db(obj2)} <= databases:
+            return True
+        return None
@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # opt-in, see REQUEST_STATS_ENABLED
+    'quiz.instrumentation.RequestStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,6 +57,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'quiz.urls'
 
+# No explicit 'loaders', so with DEBUG off (i.e. in production profiles)
+# templates are compiled once per process by the cached template loader
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -80,6 +84,7 @@ WSGI_APPLICATION = 'quiz.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/1.11/ref/settings/#databases
+# Development one, a connection per request, see quiz.settings_production_db
 
 DATABASES = {
     'default': {
@@ -88,6 +93,38 @@ DATABASES = {
     }
 }
 
+# Content reads go to read replicas, if there are any, see quiz.routers
+DATABASE_ROUTERS = ['quiz.routers.ReplicaRouter']
+
+# Aliases of replica databases in DATABASES
+DATABASE_REPLICAS = []
+
+# Models read from replicas, results of completed takes tolerate lag too,
+# i.e. 'exam.leaderboardentry' and 'exam.scorebucket' can be added
+DATABASE_REPLICA_MODELS = ['exam.quiz', 'exam.question', 'exam.option']
+
+# Seconds replicas may lag behind the primary, content changed more recently
+# is read from the primary, see quiz.apps.exam.content
+DATABASE_REPLICA_LAG = 60
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+# Compiled quiz content is shared between processes through this cache,
+# in production it should be a shared backend, e.g. memcached, see
+# quiz.settings_production_db
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds quiz content versions are kept for, per process cache above
+# doesn't see content changed by other processes (i.e. by management
+# commands) until they expire, see quiz.apps.exam.content
+EXAM_CONTENT_VERSION_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
@@ -131,6 +168,60 @@ LOGIN_URL = '/login/'
 
 LOGIN_REDIRECT_URL = '/'
 
+# Threads processing requests when served through quiz.asgi, each of them
+# holds its own database connection
+ASGI_THREADS = 8
+
+
+# Request instrumentation, see quiz.instrumentation
+
+# Measure queries and latency of requests, per view stats are dumped at
+# /stats/requests/ for staff
+REQUEST_STATS_ENABLED = False
+
+# Fraction of requests to measure, query logging is not free
+REQUEST_STATS_SAMPLE_RATE = 1.0
+
+# Expose measurements of each request as X-Query-Count etc. headers,
+# X-App-Time-Ms is total time minus database time, not rendering alone
+REQUEST_STATS_HEADERS = True
+
+
+# Exam app
+
+# Amount of compiled quizzes kept in each process in addition to the cache
+EXAM_CONTENT_CACHE_SIZE = 128
+
+# Amount of rendered question forms kept in each process, see
+# quiz.apps.exam.fragments
+EXAM_FRAGMENT_CACHE_SIZE = 1024
+
+# Score percentage a completed take counts as passed with in statistics
+EXAM_PASS_PERCENTAGE = 50
+
+# Latest attempts of each user and quiz kept by prune_attempts command,
+# see quiz.apps.exam.attempts
+EXAM_ATTEMPTS_KEPT = 5
+
+# Seconds after deadline of a timed take, the expire_takes command leaves
+# it alone for, answers submitted right before the deadline are in flight
+EXAM_DEADLINE_GRACE = 5
+
+# Queue answers and write them in batches by a background thread, instead
+# of a transaction per answer, see quiz.apps.exam.ingest
+EXAM_ANSWER_INGEST = False
+
+# Answers waiting to be written at most, submissions wait for space for
+# EXAM_ANSWER_INGEST_TIMEOUT seconds and are rejected with 503 after that
+EXAM_ANSWER_INGEST_QUEUE_SIZE = 10000
+EXAM_ANSWER_INGEST_TIMEOUT = 1.0
+
+# Answers written by a single transaction at most
+EXAM_ANSWER_INGEST_BATCH_SIZE = 500
+
+# Seconds flusher waits for more answers to come before writing a batch
+EXAM_ANSWER_INGEST_INTERVAL = 0.05
+
 
 try:
     from .settings_local import *  # pylint: disable = wildcard-import
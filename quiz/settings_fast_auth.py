@@ -0,0 +1,28 @@
+"""
+Fast auth profile of quiz project settings.
+
+Authenticated requests load session and user without database queries:
+sessions are kept in the cache and users in a short lived per process
+cache of CachedModelBackend, see quiz.apps.rt_auth.backends. Use with
+DJANGO_SETTINGS_MODULE=quiz.settings_fast_auth.
+
+Cache sessions need a shared cache backend (see CACHES) when served by
+several processes. Without one, switch SESSION_ENGINE to signed cookies
+('django.contrib.sessions.backends.signed_cookies'), which need no
+storage at all, but can not be revoked server side before they expire.
+"""
+
+from .settings import *  # pylint: disable = wildcard-import, unused-wildcard-import
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+
+AUTHENTICATION_BACKENDS = [
+    'quiz.apps.rt_auth.backends.CachedModelBackend',
+]
+
+# Seconds a user is cached for, user changes made by other processes are
+# not seen by this one for that long
+AUTH_USER_CACHE_TTL = 30
+
+# Users cached in each process
+AUTH_USER_CACHE_SIZE = 10000
@@ -0,0 +1,95 @@
+"""
+Production database profile of quiz project settings.
+
+DEBUG is off, so served hosts have to be listed in QUIZ_ALLOWED_HOSTS
+environment variable, separated by commas (localhost by default).
+
+Connections are persistent (CONN_MAX_AGE), instead of a new one opened by
+every request. Use with DJANGO_SETTINGS_MODULE=quiz.settings_production_db,
+database is configured by QUIZ_DB_* environment variables.
+
+SQLite is the default, its connections get pragmas (see
+quiz.backends.sqlite3):
+* journal_mode=WAL - readers don't wait for the writer and vice versa
+* synchronous=NORMAL - no fsync per commit in WAL mode, last transactions
+  can be lost on power failure (but not on a process crash)
+* busy_timeout - writers wait for the write lock instead of failing with
+  'database is locked' right away
+* mmap_size - database file is read through memory mapping
+
+Cache is memcached at QUIZ_CACHE_LOCATION (needs python-memcached), i.e.
+'127.0.0.1:11211', servers separated by commas. It is shared by all of
+processes, so quiz content changes (by the admin, import_quiz or
+rebuild_take_progress) are seen by every worker right away. Without it
+each process has its own cache, and sees content changed by others with
+a delay of up to EXAM_CONTENT_VERSION_TIMEOUT.
+
+PostgreSQL is used with QUIZ_DB_ENGINE=postgresql (needs psycopg2).
+Persistent connections are checked before reuse by a request (see
+quiz.backends.HealthChecksMixin), so connections dropped by the server
+meanwhile are replaced instead of failing requests. Django keeps a
+connection per thread rather than a pool, so total amount of connections
+is processes * threads (see ASGI_THREADS). If that's more than the server
+allows, put a pooler (i.e. PgBouncer) in front of it and set
+QUIZ_DB_POOLER=1: with transaction pooling server side cursors are
+disabled, since they don't survive between transactions.
+"""
+import os
+
+from .settings import *  # pylint: disable = wildcard-import, unused-wildcard-import
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('QUIZ_ALLOWED_HOSTS', 'localhost').split(',')
+    if host.strip()
+]
+
+if os.environ.get('QUIZ_CACHE_LOCATION'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['QUIZ_CACHE_LOCATION'].split(','),
+        }
+    }
+    EXAM_CONTENT_VERSION_TIMEOUT = None
+
+# Seconds a connection is reused for
+DB_CONN_MAX_AGE = int(os.environ.get('QUIZ_DB_CONN_MAX_AGE', 600))
+
+if os.environ.get('QUIZ_DB_ENGINE', 'sqlite3') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'quiz.backends.postgresql',
+            'NAME': os.environ.get('QUIZ_DB_NAME', 'quiz'),
+            'USER': os.environ.get('QUIZ_DB_USER', ''),
+            'PASSWORD': os.environ.get('QUIZ_DB_PASSWORD', ''),
+            'HOST': os.environ.get('QUIZ_DB_HOST', ''),
+            'PORT': os.environ.get('QUIZ_DB_PORT', ''),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': bool(
+                os.environ.get('QUIZ_DB_POOLER')),
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'quiz.backends.sqlite3',
+            'NAME': os.environ.get(
+                'QUIZ_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'pragmas': {
+                    'journal_mode': 'WAL',
+                    'synchronous': 'NORMAL',
+                    'busy_timeout': 5000,  # milliseconds
+                    'mmap_size': 256 * 1024 * 1024,
+                },
+            },
+        }
+    }
@@ -0,0 +1,26 @@
+"""
+Read replica profile of quiz project settings.
+
+Reads of quiz content go to a replica, see quiz.routers. Locally two
+SQLite files stand in for the primary and the replica, there is no
+replication between them, so the replica is a snapshot to be refreshed by
+hand, i.e.:
+    python manage.py migrate --settings quiz.settings_replica
+    cp db.sqlite3 db_replica.sqlite3
+Content changed afterwards is not seen in replica reads until the next
+copy, the way lagging replica behaves, while takes and answers are always
+read from the primary. Use with DJANGO_SETTINGS_MODULE=quiz.settings_replica,
+in tests the replica mirrors the test database.
+"""
+
+from .settings import *  # pylint: disable = wildcard-import, unused-wildcard-import
+
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+    'TEST': {
+        'MIRROR': 'default',
+    },
+}
+
+DATABASE_REPLICAS = ['replica']
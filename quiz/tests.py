@@ -0,0 +1,311 @@
+"""Quiz tests"""
+import asyncio
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.backends.sqlite3 import base as sqlite3_base
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import instrumentation, routers, settings_production_db
+from .apps.exam import content
+from .apps.exam.models import Option, Question, Quiz, Take
+from .asgi_handler import WsgiToAsgi, build_environ
+from .backends import HealthChecksMixin
+from .backends.sqlite3 import base as tuned_sqlite3_base
+
+
+# pylint: disable = no-self-use
+
+
+@override_settings(REQUEST_STATS_ENABLED=True)
+class RequestStatsTests(TestCase):
+    """Request instrumentation tests"""
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.registry.reset()
+        self.user = User.objects.create_user(
+            'whatever', password='whatever_very_secure_pass')
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+        AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.ModelBackend'],
+    )
+    def test_headers(self):
+        """Measurements are exposed as response headers
+
+        Auth is pinned to the default one, queries differ by profile"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('exam:index'))
+        # session, user and catalogue page
+        assert response[instrumentation.HEADER_QUERIES] == '3'
+        assert response[instrumentation.HEADER_DUPLICATES] == '0'
+        for header in (
+                instrumentation.HEADER_DB_TIME,
+                instrumentation.HEADER_APP_TIME,
+                instrumentation.HEADER_TOTAL_TIME):
+            assert float(response[header]) >= 0
+
+    def test_stats_view(self):
+        """Stats are aggregated per view and available to staff only"""
+        self.client.force_login(self.user)
+        self.client.get(reverse('exam:index'))
+        self.client.get(reverse('exam:index'))
+        response = self.client.get(reverse('request_stats'))
+        assert response.status_code == 302  # to admin login
+
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get(reverse('request_stats')).json()
+        assert stats['exam:index']['queries']['count'] == 2
+        assert stats['exam:index']['total_time_ms']['count'] == 2
+
+        self.client.post(reverse('request_stats'))
+        assert 'exam:index' not in instrumentation.registry.snapshot()
+
+    def test_count_duplicates(self):
+        """Queries differing only by parameters are duplicates"""
+        assert instrumentation.count_duplicates([
+            'SELECT * FROM "exam_option" WHERE "question_id" = 1',
+            'SELECT * FROM "exam_option" WHERE "question_id" = 2',
+            'SELECT * FROM "exam_quiz" WHERE "name" = \'a\'',
+            'SELECT * FROM "exam_option" WHERE "question_id" = 3',
+            'SELECT * FROM "exam_quiz" WHERE "name" = \'it\'\'s\'',
+            'SELECT * FROM "exam_question"',
+        ]) == 3
+
+    def test_histogram(self):
+        """Histogram percentiles are bucket bounds"""
+        histogram = instrumentation.Histogram()
+        for value in range(1, 101):
+            histogram.record(value)
+        assert histogram.percentile(50) == 50
+        assert histogram.percentile(95) == 100
+        assert histogram.snapshot()['count'] == 100
+        assert histogram.snapshot()['buckets']['50'] == 30
+        histogram.record(10 ** 6)
+        assert histogram.percentile(100) == 10 ** 6
+
+
+def call_asgi(application, scope, body=b'', disconnect=False):
+    """Perform ASGI request, returns sent messages
+
+    Client waits for the whole response, unless it disconnects right after
+    sending the request"""
+    received = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        """Request, then disconnect once the client is gone"""
+        if received:
+            return received.pop()
+        if not disconnect:
+            await asyncio.Event().wait()  # till the request is done
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        """Collect sent message"""
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(application(scope, receive, send))
+    finally:
+        loop.close()
+    return sent
+
+
+def get_scope(method, path, headers=(), query_string=b''):
+    """ASGI http scope"""
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+    }
+
+
+class AsgiHandlerTests(TestCase):
+    """WSGI to ASGI adapter tests"""
+
+    def test_environ(self):
+        """Request is translated to WSGI environ"""
+        environ = build_environ(get_scope(
+            'POST', '/\u00e9/',
+            headers=[
+                (b'content-type', b'text/plain'),
+                (b'x-thing', b'a'),
+                (b'x-thing', b'b'),
+            ],
+            query_string=b'q=1',
+        ), b'body')
+        assert environ['REQUEST_METHOD'] == 'POST'
+        assert environ['PATH_INFO'] == '/\u00e9/'.encode().decode('latin1')
+        assert environ['QUERY_STRING'] == 'q=1'
+        assert environ['CONTENT_TYPE'] == 'text/plain'
+        assert environ['CONTENT_LENGTH'] == '4'
+        assert environ['HTTP_X_THING'] == 'a,b'
+        assert environ['wsgi.input'].read() == b'body'
+
+    def test_streaming(self):
+        """Response chunks are sent as they are produced"""
+        def application(environ, start_response):
+            """Echo request body back"""
+            start_response('201 Created', [('X-Thing', 'a')])
+            yield environ['wsgi.input'].read()
+            yield b''
+            yield b'!'
+
+        sent = call_asgi(
+            WsgiToAsgi(application), get_scope('POST', '/'), b'body')
+        assert sent[0] == {
+            'type': 'http.response.start',
+            'status': 201,
+            'headers': [(b'x-thing', b'a')],
+        }
+        assert [message['body'] for message in sent[1:]] == [
+            b'body', b'!', b'']
+        assert not sent[-1]['more_body']
+
+    def test_disconnect(self):
+        """Response is not iterated any further once the client is gone"""
+        produced = []
+        closed = []
+
+        def application(environ, start_response):
+            """Endless response, records produced chunks and closing"""
+            # pylint: disable = unused-argument
+            start_response('200 OK', [])
+            try:
+                while True:
+                    produced.append(b'.')
+                    yield b'.'
+            finally:
+                closed.append(True)
+
+        sent = call_asgi(
+            WsgiToAsgi(application, queue_size=2), get_scope('GET', '/'),
+            disconnect=True)
+        assert closed == [True]
+        assert len(sent) <= len(produced) < 10
+
+    def test_django(self):
+        """Django application is served"""
+        application = WsgiToAsgi(get_wsgi_application(), max_workers=1)
+        sent = call_asgi(application, get_scope('GET', reverse('exam:index')))
+        assert sent[0]['status'] == 302
+        location = dict(sent[0]['headers'])[b'location'].decode()
+        assert location.startswith(reverse('login'))
+
+
+class DatabaseBackendTests(TestCase):
+    """Production database profile backends tests"""
+
+    def setUp(self):
+        handle, self.database_file = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.database_file + suffix):
+                os.remove(self.database_file + suffix)
+
+    def _get_settings(self, **settings):
+        """Database settings of the profile, for a throwaway file"""
+        retval = dict(connection.settings_dict)
+        retval.update(settings_production_db.DATABASES['default'])
+        retval.update(NAME=self.database_file, **settings)
+        return retval
+
+    def test_sqlite_pragmas(self):
+        """Pragmas of the profile are set on every new connection"""
+        wrapper = tuned_sqlite3_base.DatabaseWrapper(
+            self._get_settings(), 'pragmas')
+        for _ in range(2):
+            with wrapper.cursor() as cursor:
+                values = []
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                    cursor.execute('PRAGMA {}'.format(pragma))
+                    values.append(cursor.fetchone()[0])
+            wrapper.close()
+            assert values == ['wal', 1, 5000]
+
+    def test_health_checks(self):
+        """Reused connection is checked once per request, before a query"""
+        class DatabaseWrapper(HealthChecksMixin, sqlite3_base.DatabaseWrapper):
+            """SQLite database wrapper with health checks"""
+
+        wrapper = DatabaseWrapper(
+            self._get_settings(
+                CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=None, OPTIONS={}),
+            'health_checks',
+        )
+        wrapper.ensure_connection()
+        first = wrapper.connection
+        usable = mock.patch.object(wrapper, 'is_usable', return_value=True)
+        with usable as is_usable:
+            wrapper.close_if_unusable_or_obsolete()  # request started
+            wrapper.ensure_connection()
+            wrapper.ensure_connection()
+        assert is_usable.call_count == 1
+        assert wrapper.connection is first
+
+        with mock.patch.object(wrapper, 'is_usable', return_value=False):
+            wrapper.close_if_unusable_or_obsolete()
+            wrapper.ensure_connection()
+        assert wrapper.connection is not first
+        wrapper.close()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Read replica router tests"""
+
+    def setUp(self):
+        routers.unpin()
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self):
+        routers.unpin()
+
+    def test_content_reads(self):
+        """Only content reads go to replicas"""
+        for model in (Quiz, Question, Option):
+            assert self.router.db_for_read(model) == 'replica'
+        assert self.router.db_for_read(Take) is None
+        with override_settings(DATABASE_REPLICAS=[]):
+            assert self.router.db_for_read(Quiz) is None
+        assert self.router.db_for_write(Quiz) == 'default'
+        assert self.router.allow_relation(
+            Quiz(), Question(quiz_id=1)) is None  # unsaved
+        quiz = Quiz.from_db('replica', ['id'], [1])
+        assert routers.get_instance_db(quiz) == 'replica'
+        assert self.router.db_for_read(Question, instance=quiz) == 'replica'
+        take = Take.from_db('default', ['id'], [1])
+        assert self.router.allow_relation(quiz, take)
+
+    def test_primary(self):
+        """Reads go to primary after writes, in transactions, by hint"""
+        assert self.router.db_for_read(Quiz, primary=True) == 'default'
+        assert Question.objects.db_manager(
+            hints=content.PRIMARY).all().db == 'default'
+        atomic = mock.patch.object(
+            connections['default'], 'in_atomic_block', True)
+        with atomic:
+            assert self.router.db_for_read(Quiz) == 'default'
+
+        assert Quiz.objects.all().db == 'replica'
+        self.router.db_for_write(Take)
+        assert Quiz.objects.all().db == 'default'
+        request_started.send(sender=self.__class__)
+        assert Quiz.objects.all().db == 'replica'
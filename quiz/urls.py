@@ -26,5 +26,6 @@ urlpatterns = [
     url(r'^exam/', include('quiz.apps.exam.urls')),
     url('^', include('quiz.apps.rt_auth.urls')),
     url(r'^$', views.index, name='index'),
+    url(r'^stats/requests/$', views.request_stats, name='request_stats'),
     url(r'^nested_admin/', include('nested_admin.urls')),
 ]
@@ -1,6 +1,10 @@
 """Quiz views"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from .instrumentation import registry
+
 
 def index(request):
     """Humble index view"""
@@ -9,3 +13,12 @@ def index(request):
                         'Feel free to click the buttons above!'
     }
     return render(request, 'index.html', context)
+
+
+@staff_member_required
+def request_stats(request):
+    """Dump request stats collected by this process, reset on POST"""
+    stats = registry.snapshot()
+    if request.method == 'POST':
+        registry.reset()
+    return JsonResponse(stats)